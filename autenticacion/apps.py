@@ -4,5 +4,9 @@ from django.apps import AppConfig
 
 class AutenticacionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'autenticacion'  
+    name = 'autenticacion'
+
+    def ready(self):
+        # Registra la invalidación de request.empleado al guardar un Empleado
+        from . import middleware  # noqa: F401
 
@@ -1,41 +1,115 @@
 # autenticacion/backends.py
+import logging
+import time
+
+from django.conf import settings
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import AnonymousUser, User
 from django.contrib.auth.hashers import check_password, make_password
+from django.db import transaction
 from django.utils import timezone
 
-from autenticacion.models import Empleado
+from autenticacion.models import Empleado, sincronizar_grupo
+
+logger = logging.getLogger(__name__)
+
+# Logins que superan este tiempo total se registran como WARNING
+LOGIN_LENTO_MS = getattr(settings, "LOGIN_LENTO_MS", 800)
+
+
+class _Cronometro:
+    """Acumula la duración (ms) de cada etapa del login."""
+
+    def __init__(self):
+        self.etapas = {}
+        self._inicio = self._marca = time.perf_counter()
+
+    def marcar(self, etapa):
+        ahora = time.perf_counter()
+        self.etapas[etapa] = round((ahora - self._marca) * 1000, 2)
+        self._marca = ahora
+
+    @property
+    def total(self):
+        return round((time.perf_counter() - self._inicio) * 1000, 2)
 
 
 class EmpleadosBackend(BaseBackend):
     """
     Autentica contra la tabla 'empleados' y crea/actualiza un usuario 'sombra'
     en auth_user para poder usar sesiones/permisos/admin sin reemplazar AUTH_USER_MODEL.
+
+    Camino rápido: en un login normal (nada cambió desde el anterior) solo se
+    lee el Empleado y el User, y se escribe last_login con un UPDATE directo.
+    Flags, email y grupos se sincronizan únicamente cuando difieren, y todas
+    las escrituras van en una sola transacción.
+
+    Los tiempos por etapa quedan en `request.tiempos_login` y en el log
+    (DEBUG siempre, WARNING si el total supera LOGIN_LENTO_MS).
     """
 
     def authenticate(self, request, username=None, password=None, **kwargs):
         if not username or not password:
             return None
 
+        crono = _Cronometro()
+        try:
+            return self._autenticar(username, password, crono)
+        finally:
+            total = crono.total
+            if request is not None:
+                request.tiempos_login = dict(crono.etapas, total=total)
+            nivel = logging.WARNING if total > LOGIN_LENTO_MS else logging.DEBUG
+            logger.log(nivel, "login %s: %.1f ms %s", username, total, crono.etapas)
+
+    def _autenticar(self, username, password, crono):
         try:
             emp = Empleado.objects.get(usuario=username, is_active=True)
         except Empleado.DoesNotExist:
+            crono.marcar("empleado")
             return None
+        crono.marcar("empleado")
+
+        # Campos del Empleado a escribir al final (un solo UPDATE)
+        cambios_emp = {}
 
         # Promoción a hash en primer login si aún estuviera en texto plano (MVP)
         if len(emp.password) < 50 or emp.password.count('$') < 2:
             # Asumimos que el valor actual es texto plano
-            if password == emp.password:
-                emp.password = make_password(password)
-                emp.save(update_fields=['password'])
-            else:
+            if password != emp.password:
+                crono.marcar("password")
                 return None
+            cambios_emp['password'] = make_password(password)
+        else:
+            # Validación de contraseña hasheada (re-hash si cambió el algoritmo)
+            def _rehash(raw):
+                cambios_emp['password'] = make_password(raw)
 
-        # Validación de contraseña hasheada
-        if not check_password(password, emp.password):
-            return None
+            if not check_password(password, emp.password, setter=_rehash):
+                crono.marcar("password")
+                return None
+        crono.marcar("password")
+
+        with transaction.atomic():
+            dj_user = self._usuario_sombra(emp)
+            crono.marcar("usuario")
 
-        # Usuario "sombra" en auth_user
+            # Grupos / is_staff: solo escribe si el cargo no calza con lo actual
+            campos_user = sincronizar_grupo(emp, dj_user, guardar=False)
+            if campos_user:
+                dj_user.save(update_fields=campos_user)
+            crono.marcar("grupos")
+
+            # last_login (y password promovida) sin pasar por save(): no hay
+            # nada que sincronizar y se evitan las señales de Empleado.
+            cambios_emp['last_login'] = timezone.now()
+            Empleado.objects.filter(pk=emp.pk).update(**cambios_emp)
+            crono.marcar("last_login")
+
+        return dj_user
+
+    def _usuario_sombra(self, emp):
+        """User vinculado al Empleado; lo crea o corrige flags/email solo si difieren."""
         expected_email = emp.email  # usuario + "@pepsico.cl"
 
         dj_user, created = User.objects.get_or_create(
@@ -47,24 +121,22 @@ class EmpleadosBackend(BaseBackend):
                 'email': expected_email,
             }
         )
+        if created:
+            return dj_user
 
-        # Sincroniza flags y email
-        changed = False
-        for f in ('is_staff', 'is_superuser', 'is_active'):
+        # Sincroniza flags y email. is_staff lo define el cargo (sincronizar_grupo).
+        cambiados = []
+        for f in ('is_superuser', 'is_active'):
             if getattr(dj_user, f) != getattr(emp, f):
                 setattr(dj_user, f, getattr(emp, f))
-                changed = True
+                cambiados.append(f)
 
         if dj_user.email != expected_email:
             dj_user.email = expected_email
-            changed = True
-
-        if changed:
-            dj_user.save()
+            cambiados.append('email')
 
-        # Actualiza last_login en Empleado (dispara señal y sincroniza grupos)
-        emp.last_login = timezone.now()
-        emp.save(update_fields=['last_login'])
+        if cambiados:
+            dj_user.save(update_fields=cambiados)
 
         return dj_user
 
@@ -0,0 +1,124 @@
+# autenticacion/management/commands/bench_sesiones.py
+"""
+Benchmark de carga del subsistema de sesiones.
+
+Uso:
+    python manage.py bench_sesiones
+    python manage.py bench_sesiones --requests 500 --url /autenticacion/dashboard-stats/
+    python manage.py bench_sesiones --usuario jperez
+
+Simula el polling del dashboard con un usuario autenticado y compara:
+
+  - antes   : sesiones en BD + SESSION_SAVE_EVERY_REQUEST=True
+  - después : configuración actual (cached_db + SesionDeslizanteMiddleware)
+
+Para cada escenario cuenta las consultas a django_session (lecturas y
+escrituras) y el tiempo promedio por request. Termina con error si la
+configuración actual sigue escribiendo la sesión en más de un request
+(solo puede renovarse una vez dentro de SESSION_REFRESH_WINDOW).
+
+Inicia y cierra sesiones de un usuario real en la base configurada: solo
+corre contra SQLite o MySQL en localhost (salvo --forzar).
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from utils.base_local import verificar_base_local
+
+MIDDLEWARE_DESLIZANTE = "autenticacion.middleware.SesionDeslizanteMiddleware"
+
+
+class Command(BaseCommand):
+    help = "Compara escrituras de sesión en BD: sesiones en BD vs cached_db con renovación throttled."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Requests por escenario (default 200).")
+        parser.add_argument("--url", default="/autenticacion/dashboard-stats/",
+                            help="Endpoint a consultar (default: KPIs del dashboard).")
+        parser.add_argument("--usuario", default=None,
+                            help="username a usar (default: primer usuario activo).")
+        parser.add_argument("--forzar", action="store_true",
+                            help="Permite una base MySQL que no está en localhost.")
+
+    def handle(self, *args, **options):
+        verificar_base_local(options["forzar"])
+        n = max(1, options["requests"])
+        url = options["url"]
+
+        qs = User.objects.filter(is_active=True)
+        if options["usuario"]:
+            qs = qs.filter(username=options["usuario"])
+        user = qs.order_by("pk").first()
+        if not user:
+            raise CommandError("No hay usuario activo para el benchmark.")
+
+        escenarios = [
+            ("antes", {
+                "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+                "SESSION_SAVE_EVERY_REQUEST": True,
+                "MIDDLEWARE": [m for m in settings.MIDDLEWARE if m != MIDDLEWARE_DESLIZANTE],
+            }),
+            ("después", {}),
+        ]
+
+        self.stdout.write(
+            f"{n} requests a {url} como '{user.username}' "
+            f"(SESSION_ENGINE actual: {settings.SESSION_ENGINE}, "
+            f"ventana: {getattr(settings, 'SESSION_REFRESH_WINDOW', '-')} s)"
+        )
+
+        resultados = {}
+        for nombre, ajustes in escenarios:
+            with override_settings(**ajustes):
+                resultados[nombre] = self._medir(user, url, n)
+
+            r = resultados[nombre]
+            self.stdout.write(
+                f"  {nombre:<8} escrituras_sesion={r['escrituras']:<5} "
+                f"lecturas_sesion={r['lecturas']:<5} consultas_totales={r['consultas']:<6} "
+                f"promedio={r['ms']:7.2f} ms  status={r['status']}"
+            )
+
+        ahorro = resultados["antes"]["escrituras"] - resultados["después"]["escrituras"]
+        self.stdout.write(f"Escrituras a django_session evitadas: {ahorro}")
+
+        if resultados["después"]["escrituras"] > 1:
+            raise CommandError(
+                "La configuración actual sigue escribiendo la sesión "
+                f"{resultados['después']['escrituras']} veces."
+            )
+
+        self.stdout.write(self.style.SUCCESS("Sesión sin escrituras por request."))
+
+    def _medir(self, user, url, n):
+        client = Client()
+        client.force_login(user)
+
+        status = set()
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            for _ in range(n):
+                status.add(client.get(url).status_code)
+            ms = (time.perf_counter() - inicio) * 1000 / n
+
+        sesion = [q["sql"] for q in ctx.captured_queries if "django_session" in q["sql"]]
+        escrituras = sum(
+            1 for sql in sesion
+            if sql.lstrip().upper().startswith(("UPDATE", "INSERT", "DELETE"))
+        )
+
+        client.logout()
+        return {
+            "escrituras": escrituras,
+            "lecturas": len(sesion) - escrituras,
+            "consultas": len(ctx.captured_queries),
+            "ms": ms,
+            "status": ",".join(str(s) for s in sorted(status)),
+        }
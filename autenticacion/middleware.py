@@ -0,0 +1,145 @@
+# autenticacion/middleware.py
+"""
+Resolución del Empleado asociado al usuario autenticado, una vez por request.
+
+EmpleadoMiddleware deja `request.empleado` como objeto perezoso: la consulta
+(Empleado + recinto) solo ocurre si alguien lo usa, y el resultado se
+memoriza en el request. Entre requests se guarda en caché con TTL corto,
+con clave por sesión; al guardar/borrar un Empleado se incrementa la
+"generación" de su usuario y las entradas anteriores dejan de ser válidas.
+
+En vistas usar `get_empleado(request)`, que devuelve el Empleado o None.
+
+SesionDeslizanteMiddleware reemplaza a SESSION_SAVE_EVERY_REQUEST: renueva
+la expiración de la sesión como máximo una vez cada SESSION_REFRESH_WINDOW
+segundos, en vez de escribir la sesión en cada request.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+from .models import Empleado
+
+EMPLEADO_CACHE_TTL = getattr(settings, "EMPLEADO_CACHE_TTL", 60)
+
+_SIN_EMPLEADO = "-"  # marca en caché: usuario sin Empleado vinculado
+
+
+def _clave_sesion(session_key):
+    return f"empleado:sesion:{session_key}"
+
+
+def _clave_generacion(usuario):
+    return f"empleado:gen:{usuario}"
+
+
+def _cargar(usuario):
+    return (
+        Empleado.objects
+        .select_related("recinto")
+        .filter(usuario=usuario)
+        .first()
+    )
+
+
+def _resolver(request):
+    user = getattr(request, "user", None)
+    if not user or not user.is_authenticated:
+        return None
+
+    usuario = user.get_username()
+    session_key = getattr(getattr(request, "session", None), "session_key", None)
+    if not session_key:
+        return _cargar(usuario)
+
+    # Entrada de la sesión + generación vigente del usuario: un solo viaje a la caché
+    clave = _clave_sesion(session_key)
+    clave_gen = _clave_generacion(usuario)
+    valores = cache.get_many([clave, clave_gen])
+    generacion = valores.get(clave_gen, 0)
+
+    entrada = valores.get(clave)
+    if entrada and entrada[0] == usuario and entrada[1] == generacion:
+        return None if entrada[2] == _SIN_EMPLEADO else entrada[2]
+
+    empleado = _cargar(usuario)
+    cache.set(
+        clave,
+        (usuario, generacion, empleado if empleado is not None else _SIN_EMPLEADO),
+        EMPLEADO_CACHE_TTL,
+    )
+    return empleado
+
+
+def get_empleado(request):
+    """Empleado (con recinto) del usuario del request, o None. Memorizado por request."""
+    if not hasattr(request, "_empleado_cache"):
+        request._empleado_cache = _resolver(request)
+    return request._empleado_cache
+
+
+class EmpleadoMiddleware:
+    """Agrega `request.empleado` (perezoso). Debe ir después de AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.empleado = SimpleLazyObject(lambda: get_empleado(request))
+        return self.get_response(request)
+
+
+class SesionDeslizanteMiddleware:
+    """
+    Expiración deslizante con throttle. Debe ir después de SessionMiddleware.
+
+    Guarda en la sesión la marca de la última renovación; si pasó la ventana
+    la actualiza, lo que marca la sesión como modificada y hace que
+    SessionMiddleware la guarde con un nuevo vencimiento. Dentro de la
+    ventana no se escribe nada (ni en Redis ni en django_session).
+    """
+
+    CLAVE = "_renovada_en"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        session = getattr(request, "session", None)
+        if session is None or session.modified or not session.session_key:
+            return response
+        if session.is_empty():
+            return response
+        # Solo sesiones autenticadas: una cookie vencida no debe crear sesión nueva
+        user = getattr(request, "user", None)
+        if not user or not user.is_authenticated:
+            return response
+
+        ventana = getattr(settings, "SESSION_REFRESH_WINDOW", 300)
+        ahora = int(time.time())
+        if ahora - session.get(self.CLAVE, 0) >= ventana:
+            session[self.CLAVE] = ahora
+
+        return response
+
+
+# ===========================================
+# INVALIDACIÓN
+# ===========================================
+@receiver(post_save, sender=Empleado)
+@receiver(post_delete, sender=Empleado)
+def invalidar_empleado(sender, instance, **kwargs):
+    """Nueva generación para el usuario: descarta lo cacheado en todas sus sesiones."""
+    if not instance.usuario:
+        return
+    clave = _clave_generacion(instance.usuario)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, 1, None)
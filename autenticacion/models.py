@@ -5,6 +5,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from talleres.models import Recinto  # usamos Recinto (FK recinto_id)
+from autenticacion.roles import get_role_names, invalidar_roles
 
 # Grupos base asociados a cargos operativos
 BASE_ROLE_GROUPS = ['CHOFER', 'SUPERVISOR', 'MECANICO', 'ADMINISTRATIVO', 'GUARDIA']
@@ -121,39 +122,72 @@ class Empleado(models.Model):
         user = self.linked_user
         if not user:
             return False
-        return user.groups.filter(name='ADMIN_WEB').exists()
+        return 'ADMIN_WEB' in get_role_names(user)
 
 
 # ===========================================
 # SINCRONIZACIÓN AUTOMÁTICA DE GRUPOS
 # ===========================================
+def sincronizar_grupo(empleado, user, guardar=True):
+    """
+    Alinea el grupo base y el flag is_staff del User vinculado con el cargo.
+
+    - Quita los grupos base (BASE_ROLE_GROUPS) distintos del cargo y agrega
+      el del cargo. NO toca ADMIN_WEB ni otros grupos custom.
+    - is_staff = SUPERVISOR o ADMIN_WEB.
+
+    Compara contra los roles en caché y no escribe nada si ya está alineado.
+    Con guardar=False el flag solo se ajusta en memoria y se devuelve la
+    lista de campos del User a guardar (el llamador los persiste).
+    """
+    group_name = (empleado.cargo or '').upper().strip()
+    if not user or not group_name:
+        return []
+
+    actuales = get_role_names(user)
+    esperados = (actuales - set(BASE_ROLE_GROUPS)) | {group_name}
+
+    if esperados != actuales:
+        # grupo asociado al cargo
+        role_group, _ = Group.objects.get_or_create(name=group_name)
+
+        # quitar solo grupos base (no tocamos ADMIN_WEB ni otros custom)
+        sobrantes = (actuales & set(BASE_ROLE_GROUPS)) - {group_name}
+        if sobrantes:
+            user.groups.remove(*Group.objects.filter(name__in=sobrantes))
+
+        # agregar grupo del cargo
+        if group_name not in actuales:
+            user.groups.add(role_group)
+
+    # staff si es SUPERVISOR o si además tiene ADMIN_WEB
+    is_staff = group_name == 'SUPERVISOR' or 'ADMIN_WEB' in esperados
+    if user.is_staff == is_staff:
+        return []
+
+    user.is_staff = is_staff
+    if guardar:
+        User.objects.filter(pk=user.pk).update(is_staff=is_staff)
+        return []
+    return ['is_staff']
+
+
 @receiver(post_save, sender=Empleado)
-def sync_user_group(sender, instance: Empleado, **kwargs):
+def sync_user_group(sender, instance: Empleado, update_fields=None, **kwargs):
     """
     Sincroniza automáticamente el grupo del usuario Django según el cargo.
     - Usa el campo `usuario` para enlazar, sin modificar la tabla MySQL.
     - NO toca el grupo ADMIN_WEB (eso lo maneja el formulario con un flag).
+    - Guardados parciales que no tocan cargo/usuario (last_login, password)
+      no sincronizan nada.
     """
+    if update_fields is not None and not {'cargo', 'usuario'} & set(update_fields):
+        return
+
     user = instance.linked_user
     if not user:
         return  # no hay usuario Django vinculado
 
-    group_name = (instance.cargo or '').upper().strip()
-    if not group_name:
-        return
-
-    # grupo asociado al cargo
-    role_group, _ = Group.objects.get_or_create(name=group_name)
-
-    # quitar solo grupos base (no tocamos ADMIN_WEB ni otros custom)
-    base_groups = Group.objects.filter(name__in=BASE_ROLE_GROUPS)
-    user.groups.remove(*base_groups)
-
-    # agregar grupo del cargo
-    user.groups.add(role_group)
-
-    # staff si es SUPERVISOR o si además tiene ADMIN_WEB
-    has_admin_web = user.groups.filter(name='ADMIN_WEB').exists()
-    is_supervisor = (group_name == 'SUPERVISOR')
-    user.is_staff = is_supervisor or has_admin_web
-    user.save()
+    # Cambios de cargo son raros: se compara contra los grupos reales, no la caché
+    invalidar_roles(user)
+    sincronizar_grupo(instance, user)
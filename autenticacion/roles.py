@@ -1,6 +1,78 @@
 # autenticacion/roles.py
+from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
-from autenticacion.models import Empleado
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+# Segundos que el set de grupos de un usuario vive en la caché compartida
+ROLES_CACHE_TTL = getattr(settings, "ROLES_CACHE_TTL", 300)
+
+
+# ===========================================
+# CACHÉ DE ROLES (grupos del usuario)
+# ===========================================
+def _cache_key(user_id):
+    return f"roles:user:{user_id}"
+
+
+def get_role_names(user):
+    """
+    frozenset con los nombres de grupo del usuario.
+
+    Se resuelve UNA vez por request (queda memorizado en el propio objeto
+    user, que vive lo que dura el request) y entre requests se guarda en la
+    caché de Django. La caché se invalida cuando cambian los grupos del
+    usuario (m2m_changed) o al sincronizar el cargo (sync_user_group).
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    nombres = getattr(user, "_role_names", None)
+    if nombres is not None:
+        return nombres
+
+    key = _cache_key(user.pk)
+    nombres = cache.get(key)
+    if nombres is None:
+        nombres = frozenset(user.groups.values_list("name", flat=True))
+        cache.set(key, nombres, ROLES_CACHE_TTL)
+
+    user._role_names = nombres
+    return nombres
+
+
+def invalidar_roles(user):
+    """Descarta los roles memorizados de un usuario (User o su pk)."""
+    if isinstance(user, User):
+        user.__dict__.pop("_role_names", None)
+        user = user.pk
+    if user is not None:
+        cache.delete(_cache_key(user))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _grupos_usuario_cambiaron(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # user.groups.add/remove/clear(...)
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidar_roles(instance)
+        return
+
+    # group.user_set.add/remove(...) -> pk_set son ids de usuario
+    if action in ("post_add", "post_remove"):
+        for user_id in pk_set or ():
+            invalidar_roles(user_id)
+    elif action == "pre_clear":
+        for user_id in instance.user_set.values_list("pk", flat=True):
+            invalidar_roles(user_id)
+
+
+@receiver(pre_delete, sender=Group)
+def _grupo_eliminado(sender, instance, **kwargs):
+    for user_id in instance.user_set.values_list("pk", flat=True):
+        invalidar_roles(user_id)
 
 
 def has_role(user, roles):
@@ -8,9 +80,7 @@ def has_role(user, roles):
     Verifica si el usuario autenticado pertenece a alguno de los grupos indicados.
     `roles` es una lista de nombres de grupos, ej: ['CHOFER', 'SUPERVISOR'].
     """
-    if not user or not user.is_authenticated:
-        return False
-    return user.groups.filter(name__in=roles).exists()
+    return not get_role_names(user).isdisjoint(roles)
 
 
 # ---- Roles de acuerdo a Casos de Uso ----
@@ -21,18 +91,9 @@ guardia_only     = user_passes_test(lambda u: has_role(u, ['GUARDIA']))
 
 # 👇 NUEVO: sólo Administrador Web
 def _is_admin_web(user):
-    if not user or not user.is_authenticated:
-        return False
-
-    # 1) Si pertenece al grupo ADMIN_WEB → ok
-    if user.groups.filter(name='ADMIN_WEB').exists():
-        return True
-
-    # 2) O si tiene el flag es_admin_web en Empleado
-    return Empleado.objects.filter(
-        usuario=user.username,
-        es_admin_web=True
-    ).exists()
+    # Empleado no tiene columna propia de admin web: Empleado.is_admin_web
+    # se deriva del mismo grupo ADMIN_WEB del usuario vinculado.
+    return has_role(user, ['ADMIN_WEB'])
 
 admin_web_only = user_passes_test(_is_admin_web)
 
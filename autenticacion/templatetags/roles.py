@@ -1,9 +1,16 @@
 # autenticacion/templatetags/roles.py
 from django import template
 
+from autenticacion.roles import get_role_names
+
 register = template.Library()
 
 
+def _nombres_normalizados(user):
+    """Grupos del usuario en mayúsculas (comparación sin distinguir caso)."""
+    return {n.upper() for n in get_role_names(user)}
+
+
 @register.filter
 def has_group(user, group_name):
     """
@@ -15,7 +22,7 @@ def has_group(user, group_name):
         return False
     if not group_name:
         return False
-    return user.groups.filter(name__iexact=group_name.strip()).exists()
+    return group_name.strip().upper() in _nombres_normalizados(user)
 
 
 @register.filter
@@ -35,7 +42,7 @@ def has_any_group(user, group_names):
     if not names:
         return False
 
-    return user.groups.filter(name__in=names).exists()
+    return not get_role_names(user).isdisjoint(names)
 
 
 @register.filter
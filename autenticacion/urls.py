@@ -128,4 +128,18 @@ urlpatterns = [
         views_pages.admin_web_taller_delete,
         name='admin-web-taller-eliminar',
     ),
+
+    # ==========================================================
+    # 🔹 ADMIN WEB – PERFILES DE REQUESTS
+    # ==========================================================
+    path(
+        'admin-web/perfiles/',
+        views_pages.admin_web_perfiles_page,
+        name='admin-web-perfiles',
+    ),
+    path(
+        'admin-web/perfiles/<str:perfil_id>.<str:extension>',
+        views_pages.admin_web_perfil_descargar,
+        name='admin-web-perfil-descargar',
+    ),
 ]
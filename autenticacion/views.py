@@ -7,12 +7,11 @@ from django.shortcuts import redirect
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST
 from django.db import connection, OperationalError
-from django.db.models import Q
 from django.contrib.auth import authenticate, login, logout
 
 from autenticacion.models import Empleado
-from vehiculos.models import Vehiculo
-from ordenestrabajo.models import OrdenTrabajo
+from reportes import kpis as kpi_snapshot
+from utils import versiones
 
 logger = logging.getLogger(__name__)
 
@@ -154,23 +153,28 @@ def logout_web_view(request):
 # DASHBOARD STATS
 # ==========================================================
 @require_GET
+@versiones.condicional(
+    versiones.globales(versiones.OTS, versiones.VEHICULOS, versiones.EMPLEADOS)
+)
 def dashboard_stats_view(request):
-    """Indicadores del dashboard (Inicio)."""
+    """
+    Indicadores del dashboard (Inicio).
+    Se leen del snapshot materializado de KPIs (1 consulta por PK),
+    no se recuentan las tablas en cada poll; si nada cambió desde el
+    poll anterior se responde 304 sin leerlo.
+    """
     try:
-        total_vehiculos = Vehiculo.objects.count()
-        total_empleados = Empleado.objects.filter(is_active=True).count()
-
-        qs_abiertas = OrdenTrabajo.objects.filter(fecha_salida__isnull=True)
+        kpis = kpi_snapshot.leer_kpis()
 
         return JsonResponse({
             'success': True,
             'kpis': {
-                'total_vehiculos': total_vehiculos,
-                'en_taller': qs_abiertas.count(),
-                'en_proceso': qs_abiertas.filter(
-                    Q(estado__iexact='En proceso') | Q(estado__iexact='Pendiente')
-                ).count(),
-                'total_empleados': total_empleados,
+                'total_vehiculos': kpis.get(kpi_snapshot.VEHICULOS_TOTAL, 0),
+                'en_taller': kpi_snapshot.suma(kpis, kpi_snapshot.OTS_ABIERTAS),
+                'en_proceso': kpi_snapshot.suma(
+                    kpis, kpi_snapshot.OTS_ABIERTAS, ['En Proceso', 'Pendiente']
+                ),
+                'total_empleados': kpis.get(kpi_snapshot.EMPLEADOS_ACTIVOS, 0),
             }
         })
 
@@ -4,7 +4,7 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.conf import settings
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.utils import timezone
 from django.contrib.auth import authenticate, login, logout
 from django.db.models import Q
@@ -13,6 +13,7 @@ from vehiculos.models import Vehiculo
 from vehiculos.forms import VehiculoForm  # ModelForm oficial de Vehiculo
 from autenticacion.forms import EmpleadoForm
 from autenticacion.models import Empleado
+from autenticacion.middleware import get_empleado
 from ordenestrabajo.models import (
     OrdenTrabajo,
     SolicitudIngresoVehiculo,
@@ -21,6 +22,8 @@ from ordenestrabajo.models import (
 )
 from talleres.models import Taller, Recinto          # 👈 agrega Recinto aquí
 from talleres.forms import RecintoForm, TallerForm  # 👈 NUEVO
+from reportes import kpis as kpi_snapshot
+from utils import perfilador
 
 from autenticacion.roles import (
     chofer_only,
@@ -35,6 +38,7 @@ from autenticacion.roles import (
 
 # Vista canónica del guardia
 from ordenestrabajo.views_control_acceso import control_acceso_guardia
+from ordenestrabajo.tablero import publicar_solicitud
 
 
 # ==========================================================
@@ -74,27 +78,20 @@ def logout_web(request):
 # ==========================================================
 @login_required(login_url="inicio-sesion")
 def inicio_page(request):
-    user = request.user
+    empleado = get_empleado(request)
 
-    empleado = (
-        Empleado.objects
-        .select_related('recinto')
-        .filter(usuario=user.username)
-        .first()
-    )
-
-    total_vehiculos = Vehiculo.objects.count()
-    en_taller = OrdenTrabajo.objects.filter(estado='En Taller').count()
-    en_proceso = OrdenTrabajo.objects.filter(
-        estado__in=['En Proceso', 'Pendiente']
-    ).count()
-    empleados_activos = Empleado.objects.filter(is_active=True).count()
+    # KPIs desde el snapshot materializado (sin recorrer tablas)
+    snapshot = kpi_snapshot.leer_kpis()
+    empleados_activos = snapshot.get(kpi_snapshot.EMPLEADOS_ACTIVOS, 0)
 
     kpis = {
-        'total_vehiculos': total_vehiculos,
-        'en_taller': en_taller,
-        'en_proceso': en_proceso,
+        'total_vehiculos': snapshot.get(kpi_snapshot.VEHICULOS_TOTAL, 0),
+        'en_taller': kpi_snapshot.suma(snapshot, kpi_snapshot.OTS_ESTADO, ['En Taller']),
+        'en_proceso': kpi_snapshot.suma(
+            snapshot, kpi_snapshot.OTS_ESTADO, ['En Proceso', 'Pendiente']
+        ),
         'empleados_activos': empleados_activos,
+        'total_empleados': empleados_activos,  # clave usada por inicio.html
     }
 
     return render(request, 'inicio.html', {
@@ -111,14 +108,7 @@ def inicio_page(request):
 @chofer_or_supervisor
 def ingreso_vehiculos_page(request):
 
-    user = request.user
-
-    empleado = (
-        Empleado.objects
-        .select_related('recinto')
-        .filter(usuario=user.username)
-        .first()
-    )
+    empleado = get_empleado(request)
 
     # Lista de talleres: dejamos 1 por recinto (evitar duplicados "Santa rosa")
     qs_talleres = (
@@ -192,7 +182,7 @@ def ingreso_vehiculos_page(request):
         ahora = timezone.now()
 
         # ✅ NUEVO FLUJO:
-        SolicitudIngresoVehiculo.objects.create(
+        solicitud = SolicitudIngresoVehiculo.objects.create(
             vehiculo=vehiculo,
             chofer=empleado,
             taller=taller,
@@ -200,6 +190,7 @@ def ingreso_vehiculos_page(request):
             estado="PENDIENTE",
             # descripcion=descripcion,  # si tu modelo lo tiene
         )
+        publicar_solicitud(solicitud, taller.recinto_id)
 
         messages.success(
             request,
@@ -223,12 +214,7 @@ def ingreso_vehiculos_page(request):
 @login_required(login_url="inicio-sesion")
 @supervisor_only
 def asignacion_taller_page(request):
-    supervisor = (
-        Empleado.objects
-        .select_related("recinto")
-        .filter(usuario=request.user.username)
-        .first()
-    )
+    supervisor = get_empleado(request)
 
     if not supervisor or not supervisor.recinto:
         return render(request, "asignacion-taller.html", {
@@ -664,4 +650,36 @@ def admin_web_taller_delete(request, pk):
     return render(request, "admin_taller_confirm_delete.html", {
         "menu_active": "admin-web",
         "taller": taller,
-    })
\ No newline at end of file
+    })
+
+
+# ==========================================================
+# 🧩 ADMIN WEB — PERFILES DE REQUESTS (utils/perfilador.py)
+# ==========================================================
+@login_required(login_url="inicio-sesion")
+@admin_web_only
+def admin_web_perfiles_page(request):
+    perfil = None
+    perfil_id = request.GET.get("id") or ""
+    if perfil_id:
+        perfil = perfilador.leer(perfil_id)
+        if perfil is None:
+            messages.error(request, "El perfil ya no existe (se descartó del anillo).")
+
+    return render(request, "admin_perfiles.html", {
+        "menu_active": "admin-web",
+        "perfiles": perfilador.listar(),
+        "perfil": perfil,
+        "parametro": perfilador.PARAMETRO,
+        "header": perfilador.HEADER,
+        "maximo": settings.PERFILES_MAX,
+    })
+
+
+@login_required(login_url="inicio-sesion")
+@admin_web_only
+def admin_web_perfil_descargar(request, perfil_id, extension):
+    ruta = perfilador.ruta_archivo(perfil_id, extension)
+    if not ruta:
+        raise Http404("Perfil no encontrado.")
+    return FileResponse(open(ruta, "rb"), as_attachment=True, filename=f"{perfil_id}.{extension}")
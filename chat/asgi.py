@@ -2,13 +2,20 @@ import os
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 from channels.auth import AuthMiddlewareStack
-import chat.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pepsico_taller.settings')
 
+django_asgi_app = get_asgi_application()
+
+import chat.routing  # noqa: E402
+import ordenestrabajo.routing  # noqa: E402
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(chat.routing.websocket_urlpatterns)
+        URLRouter(
+            chat.routing.websocket_urlpatterns
+            + ordenestrabajo.routing.websocket_urlpatterns
+        )
     ),
 })
@@ -1,11 +1,26 @@
 import json
+
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.utils import timezone
+
+from . import historial
+from .models import ChatLog
+
+# Largo máximo de sala / usuario (columnas de chat_logs)
+MAX_SALA = ChatLog._meta.get_field("sala").max_length
+MAX_USUARIO = ChatLog._meta.get_field("usuario").max_length
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope["url_route"]["kwargs"]["room_name"]
         self.room_group_name = f"chat_{self.room_name}"
 
+        # la sala se guarda en chat_logs.sala
+        if len(self.room_name) > MAX_SALA:
+            await self.close()
+            return
+
         # unir al grupo
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -14,25 +29,38 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
+        # últimos mensajes de la sala (réplica en Redis, sin tocar la BD)
+        for item in await historial.ultimos(self.room_name):
+            await self.send(text_data=json.dumps({**item, "historial": True}))
+
     async def disconnect(self, close_code):
         # salir del grupo
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
+        # no dejar mensajes pendientes si el proceso se está cerrando
+        await historial.buffer_chat.vaciar()
 
     async def receive(self, text_data):
         data = json.loads(text_data)
         mensaje = data["message"]
-        usuario = data["usuario"]
+
+        # el usuario autenticado manda sobre lo que diga el cliente
+        user = self.scope.get("user")
+        usuario = user.username if user and user.is_authenticated else data["usuario"]
+
+        # se guarda por lotes (no espera a la BD)
+        item = await historial.registrar(
+            self.room_name, usuario[:MAX_USUARIO], mensaje, timezone.now(),
+        )
 
         # broadcast al grupo
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 "type": "chat_message",
-                "message": mensaje,
-                "usuario": usuario,
+                **item,
             }
         )
 
@@ -40,4 +68,5 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             "message": event["message"],
             "usuario": event["usuario"],
+            "timestamp": event.get("timestamp"),
         }))
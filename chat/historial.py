@@ -0,0 +1,234 @@
+# chat/historial.py
+"""
+Historial del chat: escritura por lotes, réplica reciente en Redis y
+paginación por cursor.
+
+- El consumer no escribe en la BD por cada mensaje (bloquearía al
+  receptor mientras espera a MySQL). `BufferChat` acumula los mensajes del
+  proceso y los guarda con un solo bulk_create cada CHAT_BUFFER_MAX
+  mensajes o CHAT_BUFFER_MS milisegundos. El INSERT corre en el pool de
+  hilos de Channels, fuera del event loop.
+- Cada sala tiene una lista en Redis con sus últimos CHAT_REPLAY mensajes
+  (LPUSH + LTRIM): al conectarse, el cliente los recibe sin tocar la BD.
+  Si Redis no responde o la lista está vacía se leen de chat_logs.
+- `pagina` recorre chat_logs de la sala del más nuevo al más antiguo con
+  cursor (timestamp, id) sobre el índice ix_chat_sala_ts, sin OFFSET.
+
+Lo que está en el buffer se pierde si el proceso muere antes de vaciarlo
+(a lo más CHAT_BUFFER_MS); un cierre ordenado desconecta los sockets y cada
+desconexión vacía el buffer.
+"""
+import asyncio
+import base64
+import json
+import logging
+import time
+from datetime import datetime
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db.models import Q
+
+from .models import ChatLog
+
+logger = logging.getLogger(__name__)
+
+# Segundos que se conserva la réplica de una sala sin actividad
+REPLAY_TTL = 7 * 24 * 3600
+
+# Si la BD falla, cuántos mensajes se guardan para el siguiente intento
+MAX_REINTENTO = 1000
+
+# Tras un error de Redis no se reintenta durante estos segundos (cada
+# mensaje esperaría el timeout de conexión)
+REDIS_PAUSA = 30
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def serializar(log):
+    return {
+        "usuario": log.usuario,
+        "message": log.mensaje,
+        "timestamp": log.timestamp.isoformat(),
+    }
+
+
+# ==========================================================
+# BUFFER DE ESCRITURA
+# ==========================================================
+@database_sync_to_async
+def _guardar(lote):
+    ChatLog.objects.bulk_create(lote, batch_size=500)
+
+
+class BufferChat:
+    """
+    Mensajes pendientes de guardar en chat_logs (uno por proceso).
+
+    Todo ocurre en el event loop del proceso, así que agregar y tomar el
+    lote no necesitan candado: entre dos `await` nadie más toca la lista.
+    """
+
+    def __init__(self, maximo=None, intervalo_ms=None):
+        self.maximo = maximo or settings.CHAT_BUFFER_MAX
+        self.intervalo = (intervalo_ms or settings.CHAT_BUFFER_MS) / 1000
+        self._pendientes = []
+        self._temporizador = None
+        self._tareas = set()
+
+    def __len__(self):
+        return len(self._pendientes)
+
+    def agregar(self, log):
+        """Encola un ChatLog; no espera a la BD."""
+        self._pendientes.append(log)
+        if len(self._pendientes) >= self.maximo:
+            self._lanzar(self.vaciar())
+        else:
+            self._programar()
+
+    def _lanzar(self, corrutina):
+        tarea = asyncio.ensure_future(corrutina)
+        # Referencia fuerte hasta que termine (si no, el GC puede cortarla)
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+    def _programar(self):
+        if self._temporizador is None or self._temporizador.done():
+            self._temporizador = asyncio.ensure_future(self._vaciar_luego())
+
+    async def _vaciar_luego(self):
+        await asyncio.sleep(self.intervalo)
+        # Lo que llegue mientras se guarda este lote programa otro vaciado
+        self._temporizador = None
+        await self.vaciar()
+
+    async def vaciar(self):
+        """Guarda lo pendiente en un bulk_create. Devuelve cuántos mensajes."""
+        lote, self._pendientes = self._pendientes, []
+        if not lote:
+            return 0
+        try:
+            await _guardar(lote)
+        except Exception:
+            logger.exception("No se pudieron guardar %s mensajes de chat", len(lote))
+            self._pendientes[:0] = lote[-MAX_REINTENTO:]
+            self._programar()
+            return 0
+        return len(lote)
+
+
+buffer_chat = BufferChat()
+
+
+# ==========================================================
+# RÉPLICA EN REDIS
+# ==========================================================
+_redis = None
+_redis_caido_hasta = 0.0
+
+
+def _redis_disponible():
+    return time.monotonic() >= _redis_caido_hasta
+
+
+def _redis_fallo(accion, sala, error):
+    global _redis_caido_hasta
+    _redis_caido_hasta = time.monotonic() + REDIS_PAUSA
+    logger.warning("Réplica del chat sin Redis (%s, sala=%s): %s", accion, sala, error)
+
+
+def _cliente():
+    global _redis
+    if _redis is None:
+        from redis import asyncio as aioredis
+
+        _redis = aioredis.from_url(
+            settings.CHAT_REDIS_URL,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+        )
+    return _redis
+
+
+def _clave(sala):
+    return f"chat:replay:{sala}"
+
+
+async def recordar(sala, item):
+    """Agrega `item` a la réplica de la sala (una ida y vuelta a Redis)."""
+    if not _redis_disponible():
+        return
+    clave = _clave(sala)
+    try:
+        async with _cliente().pipeline(transaction=False) as pipe:
+            pipe.lpush(clave, json.dumps(item))
+            pipe.ltrim(clave, 0, settings.CHAT_REPLAY - 1)
+            pipe.expire(clave, REPLAY_TTL)
+            await pipe.execute()
+    except Exception as e:
+        _redis_fallo("escritura", sala, e)
+
+
+async def ultimos(sala):
+    """Últimos CHAT_REPLAY mensajes de la sala, del más antiguo al más nuevo."""
+    crudos = []
+    if _redis_disponible():
+        try:
+            crudos = await _cliente().lrange(_clave(sala), 0, settings.CHAT_REPLAY - 1)
+        except Exception as e:
+            _redis_fallo("lectura", sala, e)
+
+    if crudos:
+        return [json.loads(c) for c in reversed(crudos)]
+
+    items, _ = await database_sync_to_async(pagina)(sala, None, settings.CHAT_REPLAY)
+    return list(reversed(items))
+
+
+async def registrar(sala, usuario, mensaje, timestamp):
+    """Encola el mensaje para la BD, lo agrega a la réplica y lo devuelve serializado."""
+    log = ChatLog(sala=sala, usuario=usuario, mensaje=mensaje, timestamp=timestamp)
+    buffer_chat.agregar(log)
+    item = serializar(log)
+    await recordar(sala, item)
+    return item
+
+
+# ==========================================================
+# PAGINACIÓN
+# ==========================================================
+def codificar_cursor(log):
+    datos = [log.timestamp.isoformat(), log.id]
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(texto):
+    try:
+        relleno = "=" * (-len(texto) % 4)
+        timestamp, log_id = json.loads(base64.urlsafe_b64decode(texto + relleno))
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise CursorInvalido("Cursor inválido.")
+
+
+def pagina(sala, cursor=None, limite=50):
+    """
+    Mensajes de la sala del más nuevo al más antiguo, de a `limite`.
+    Devuelve (items, next_cursor|None).
+    """
+    qs = ChatLog.objects.filter(sala=sala)
+    if cursor is not None:
+        timestamp, log_id = cursor
+        qs = qs.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=log_id))
+    filas = list(qs.order_by("-timestamp", "-id")[: limite + 1])
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1])
+
+    return [serializar(f) for f in filas], siguiente
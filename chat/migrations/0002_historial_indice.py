@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:21
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='chatlog',
+            index=models.Index(fields=['sala', 'timestamp'], name='ix_chat_sala_ts'),
+        ),
+    ]
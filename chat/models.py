@@ -1,16 +1,22 @@
 from django.db import models
+from django.utils import timezone
 
-# MVP Nivel 2 → sin persistencia todavía
-# Más adelante agregamos historial por empleado.
+
+# Historial del chat. Se escribe por lotes desde el consumer (ver
+# chat/historial.py): el timestamp es la hora del mensaje, no la del INSERT.
 class ChatLog(models.Model):
     usuario = models.CharField(max_length=50)
     mensaje = models.TextField()
     sala = models.CharField(max_length=50)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = "chat_logs"
         ordering = ["-timestamp"]
+        indexes = [
+            # Historial paginado por sala: (sala, timestamp DESC, id DESC)
+            models.Index(fields=["sala", "timestamp"], name="ix_chat_sala_ts"),
+        ]
 
     def __str__(self):
         return f"[{self.sala}] {self.usuario}: {self.mensaje[:20]}"
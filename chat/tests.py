@@ -1,3 +1,79 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from . import historial
+from .models import ChatLog
+
+
+def mensaje(texto):
+    return ChatLog(sala="general", usuario="mec", mensaje=texto, timestamp=timezone.now())
+
+
+# ==========================================================
+# BUFFER DE ESCRITURA
+# ==========================================================
+class BufferChatTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("chat.historial._guardar", new_callable=mock.AsyncMock)
+        self.guardar = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def lotes(self):
+        return [[log.mensaje for log in llamada.args[0]] for llamada in self.guardar.await_args_list]
+
+    async def esperar_tareas(self, buffer):
+        # Deja correr los vaciados lanzados en segundo plano
+        for _ in range(5):
+            await asyncio.sleep(0)
+        if buffer._temporizador is not None:
+            buffer._temporizador.cancel()
+
+    async def test_vacia_al_llegar_al_maximo(self):
+        buffer = historial.BufferChat(maximo=3, intervalo_ms=60_000)
+        for texto in ("a", "b", "c"):
+            buffer.agregar(mensaje(texto))
+        await self.esperar_tareas(buffer)
+
+        self.assertEqual(self.lotes(), [["a", "b", "c"]])
+        self.assertEqual(len(buffer), 0)
+
+    async def test_vacia_por_intervalo(self):
+        buffer = historial.BufferChat(maximo=100, intervalo_ms=20)
+        buffer.agregar(mensaje("a"))
+        buffer.agregar(mensaje("b"))
+        await asyncio.sleep(0)
+        self.assertEqual(self.lotes(), [])
+
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.lotes(), [["a", "b"]])
+        self.assertEqual(len(buffer), 0)
+
+    async def test_reencola_si_falla_la_bd(self):
+        self.guardar.side_effect = [RuntimeError("sin conexión"), None]
+        buffer = historial.BufferChat(maximo=100, intervalo_ms=20)
+        buffer.agregar(mensaje("a"))
+
+        with self.assertLogs("chat.historial", "ERROR"):
+            self.assertEqual(await buffer.vaciar(), 0)
+        self.assertEqual(len(buffer), 1)
+
+        # El reintento queda programado con el mismo intervalo
+        buffer.agregar(mensaje("b"))
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.lotes(), [["a"], ["a", "b"]])
+        self.assertEqual(len(buffer), 0)
+
+    async def test_reintento_acotado(self):
+        self.guardar.side_effect = RuntimeError("sin conexión")
+        buffer = historial.BufferChat(maximo=100, intervalo_ms=60_000)
+        for texto in ("a", "b", "c"):
+            buffer.agregar(mensaje(texto))
+
+        with mock.patch("chat.historial.MAX_REINTENTO", 2), self.assertLogs("chat.historial", "ERROR"):
+            await buffer.vaciar()
+        await self.esperar_tareas(buffer)
+
+        self.assertEqual([log.mensaje for log in buffer._pendientes], ["b", "c"])
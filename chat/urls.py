@@ -5,4 +5,5 @@ app_name = "chat"
 
 urlpatterns = [
     path("", views.chat_page, name="chat"),
+    path("api/historial/", views.api_historial, name="api_historial"),
 ]
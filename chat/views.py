@@ -1,5 +1,10 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import historial
+
 
 @login_required(login_url="/inicio-sesion/")
 def chat_page(request):
@@ -9,3 +14,40 @@ def chat_page(request):
     return render(request, "chat.html", {
         "usuario": request.user.username
     })
+
+
+# ==========================================================
+# 📜 API Historial de una sala (paginado, más nuevos primero)
+# GET /chat/api/historial/?sala=&cursor=&limit=
+# ==========================================================
+@login_required(login_url="/inicio-sesion/")
+@require_GET
+def api_historial(request):
+    """
+    Los mensajes recién enviados pueden tardar hasta CHAT_BUFFER_MS en
+    aparecer acá (se guardan por lotes, ver chat/historial.py).
+    """
+    sala = (request.GET.get("sala") or "").strip()
+    if not sala:
+        return JsonResponse(
+            {"success": False, "message": "Parámetro sala requerido."},
+            status=400,
+        )
+
+    try:
+        limite = min(max(int(request.GET.get("limit", 50)), 1), 200)
+        cursor = request.GET.get("cursor")
+        cursor = historial.decodificar_cursor(cursor) if cursor else None
+    except ValueError:
+        return JsonResponse(
+            {"success": False, "message": "Parámetros de paginación inválidos."},
+            status=400,
+        )
+
+    items, siguiente = historial.pagina(sala, cursor, limite)
+    return JsonResponse({
+        "success": True,
+        "sala": sala,
+        "items": items,
+        "next_cursor": siguiente,
+    })
@@ -2,6 +2,8 @@
 from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import redirect
 
+from autenticacion.roles import get_role_names
+
 def role_required(roles_permitidos):
     """
     Decorador que restringe acceso a usuarios que NO pertenezcan
@@ -10,8 +12,7 @@ def role_required(roles_permitidos):
     def check_role(user):
         if not user.is_authenticated:
             return False
-        user_groups = user.groups.values_list('name', flat=True)
-        return any(role in user_groups for role in roles_permitidos)
+        return not get_role_names(user).isdisjoint(roles_permitidos)
 
     return user_passes_test(
         check_role,
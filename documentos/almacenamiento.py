@@ -0,0 +1,149 @@
+# documentos/almacenamiento.py
+"""
+Almacenamiento de documentos por contenido (SHA-256).
+
+Cada archivo subido se copia por bloques a un temporal dentro de
+MEDIA_ROOT/blobs/tmp/ mientras se calcula su SHA-256, y luego se mueve a
+
+    blobs/<aa>/<bb>/<sha256>.<ext>
+
+Si ese blob ya existe (la misma foto o PDF subida en otra OT) el temporal
+se descarta y el Documento nuevo apunta al mismo archivo: los bytes
+idénticos se guardan una sola vez y varias filas de `documentos` comparten
+el nombre en `archivo`. El nombre depende solo del contenido, así que no
+hay choques ni sufijos aleatorios.
+
+Límites de tamaño (DOCUMENTOS_MAX_MB):
+  - `LimiteTamanoUploadHandler` corta la subida apenas se pasa del límite,
+    antes de que el archivo termine de llegar al disco.
+  - `guardar_blob` lo vuelve a verificar mientras copia (por si el archivo
+    no vino de una subida HTTP).
+
+Con TemporaryFileUploadHandler (settings.FILE_UPLOAD_HANDLERS) la subida
+nunca queda completa en memoria.
+
+Los blobs que ningún Documento referencia se borran con
+`python manage.py gc_blobs`.
+"""
+import hashlib
+import logging
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "blobs"
+DIR_TEMPORAL = "tmp"
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class ArchivoDemasiadoGrande(ValueError):
+    """El archivo supera DOCUMENTOS_MAX_MB."""
+
+    def __init__(self, limite=None):
+        self.limite = limite or max_bytes()
+        super().__init__(
+            f"El archivo supera el máximo permitido de {self.limite // (1024 * 1024)} MB."
+        )
+
+
+def max_bytes():
+    return settings.DOCUMENTOS_MAX_MB * 1024 * 1024
+
+
+def es_blob(nombre):
+    return bool(nombre) and nombre.startswith(PREFIJO + "/")
+
+
+def nombre_blob(sha256, extension=""):
+    """Ruta relativa a MEDIA_ROOT del blob con ese hash."""
+    extension = extension.lower().lstrip(".")
+    archivo = f"{sha256}.{extension}" if extension else sha256
+    return f"{PREFIJO}/{sha256[:2]}/{sha256[2:4]}/{archivo}"
+
+
+def _extension(nombre_original):
+    extension = os.path.splitext(nombre_original or "")[1].lower().lstrip(".")
+    # Solo extensiones razonables (se usan para el Content-Type al servir)
+    return extension if extension.isalnum() and len(extension) <= 10 else ""
+
+
+def guardar_blob(archivo, storage):
+    """
+    Guarda el contenido de `archivo` (File/UploadedFile) en `storage` por su
+    SHA-256 y devuelve (nombre, sha256, tamaño, nuevo).
+
+    `nuevo` es False cuando los mismos bytes ya estaban guardados.
+    Lanza ArchivoDemasiadoGrande sin dejar nada en disco.
+    """
+    limite = max_bytes()
+    if archivo.size is not None and archivo.size > limite:
+        raise ArchivoDemasiadoGrande(limite)
+
+    dir_temporal = storage.path(f"{PREFIJO}/{DIR_TEMPORAL}")
+    os.makedirs(dir_temporal, exist_ok=True)
+    temporal = os.path.join(dir_temporal, uuid.uuid4().hex)
+
+    sha = hashlib.sha256()
+    tamano = 0
+    try:
+        with open(temporal, "wb") as destino:
+            for bloque in archivo.chunks(TAMANO_BLOQUE):
+                tamano += len(bloque)
+                if tamano > limite:
+                    raise ArchivoDemasiadoGrande(limite)
+                sha.update(bloque)
+                destino.write(bloque)
+
+        digest = sha.hexdigest()
+        nombre = nombre_blob(digest, _extension(archivo.name))
+        final = storage.path(nombre)
+
+        if os.path.exists(final):
+            # Ya estaba: se renueva la fecha para que gc_blobs no lo borre
+            # mientras se inserta el Documento que lo va a referenciar
+            os.utime(final)
+            return nombre, digest, tamano, False
+
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        # Mismo sistema de archivos: el blob aparece completo o no aparece
+        os.replace(temporal, final)
+        return nombre, digest, tamano, True
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+# ==========================================================
+# UPLOAD HANDLER
+# ==========================================================
+class LimiteTamanoUploadHandler(FileUploadHandler):
+    """
+    Primer handler de FILE_UPLOAD_HANDLERS: deja pasar los bloques al
+    siguiente (TemporaryFileUploadHandler) y corta la subida si un archivo
+    pasa de DOCUMENTOS_MAX_MB. Marca `request.upload_excedido` para que la
+    vista responda con el motivo en vez de "falta el archivo".
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.recibidos = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.recibidos += len(raw_data)
+        if self.recibidos > max_bytes():
+            self.request.upload_excedido = True
+            logger.warning(
+                "Subida cortada por tamaño: %s (%s bytes recibidos)",
+                self.file_name, self.recibidos,
+            )
+            # connection_reset=False: se descarta el resto sin escribirlo y el
+            # cliente alcanza a recibir la respuesta JSON
+            raise StopUpload(connection_reset=False)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -1,8 +1,10 @@
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET, require_POST
 from django.contrib.auth.decorators import login_required
+from .almacenamiento import ArchivoDemasiadoGrande
+from .miniaturas import url_miniatura
 from .models import Documento
-from ordenestrabajo.models import OrdenTrabajo
+from .servicios import documentos_agrupados
 
 
 # ==========================================================
@@ -28,83 +30,19 @@ def api_documentos_list(request):
         )
 
     # -------------------------------------------
-    # 1) DOCUMENTOS OT ACTUAL
+    # OT actual, OTs finalizadas (agrupadas) y documentos del vehículo,
+    # en una sola consulta
     # -------------------------------------------
-    docs_actual = []
-    if ot_id_actual is not None:
-        qs_actual = Documento.objects.filter(ot_id=ot_id_actual).order_by("-creado_en")
-        docs_actual = [
-            {
-                "id": d.id,
-                "titulo": d.titulo,
-                "tipo": d.tipo,
-                "archivo": d.archivo.url if d.archivo else "",
-                "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M"),
-                "ot_id": d.ot_id,
-            }
-            for d in qs_actual
-        ]
-
-    # -------------------------------------------
-    # 2) DOCUMENTOS OTs FINALIZADAS (agrupados)
-    # -------------------------------------------
-    ots_finalizadas_qs = OrdenTrabajo.objects.filter(
-        patente_id=patente,
-        estado="Finalizado"
-    ).order_by("-fecha_ingreso", "-ot_id")
-
-    # Si hay OT actual, la excluimos
-    if ot_id_actual is not None:
-        ots_finalizadas_qs = ots_finalizadas_qs.exclude(ot_id=ot_id_actual)
-
-    grupos_finalizadas = []
-
-    for ot in ots_finalizadas_qs:
-        docs_ot = Documento.objects.filter(ot_id=ot.ot_id).order_by("-creado_en")
-
-        if docs_ot.exists():
-            grupos_finalizadas.append({
-                "ot_id": ot.ot_id,
-                "fecha": ot.fecha_ingreso.strftime("%Y-%m-%d"),
-                "docs": [
-                    {
-                        "id": d.id,
-                        "titulo": d.titulo,
-                        "tipo": d.tipo,
-                        "archivo": d.archivo.url if d.archivo else "",
-                        "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M"),
-                    }
-                    for d in docs_ot
-                ]
-            })
-
-    # -------------------------------------------
-    # 3) DOCUMENTOS DEL VEHÍCULO (sin OT)
-    # -------------------------------------------
-    docs_vehiculo = Documento.objects.filter(
-        patente_id=patente,
-        ot_id__isnull=True
-    ).order_by("-creado_en")
-
-    lista_docs_vehiculo = [
-        {
-            "id": d.id,
-            "titulo": d.titulo,
-            "tipo": d.tipo,
-            "archivo": d.archivo.url if d.archivo else "",
-            "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M"),
-        }
-        for d in docs_vehiculo
-    ]
+    docs = documentos_agrupados(patente, ot_actual_id=ot_id_actual)
 
     # -------------------------------------------
     # RESPUESTA FINAL (formato que consume ficha_vehiculo.js)
     # -------------------------------------------
     return JsonResponse({
         "success": True,
-        "actual": docs_actual,
-        "finalizadas": grupos_finalizadas,
-        "vehiculo": lista_docs_vehiculo,
+        "actual": docs["actual"],
+        "finalizadas": docs["finalizadas"],
+        "vehiculo": docs["vehiculo"],
     })
 
 
@@ -128,6 +66,12 @@ def api_documentos_upload(request):
 
     patente = request.POST.get("patente")
 
+    if getattr(request, "upload_excedido", False):
+        return JsonResponse(
+            {"success": False, "message": str(ArchivoDemasiadoGrande())},
+            status=413,
+        )
+
     if not archivo:
         return JsonResponse(
             {"success": False, "message": "Debe seleccionar un archivo."}
@@ -138,13 +82,21 @@ def api_documentos_upload(request):
             {"success": False, "message": "Debe ingresar un título."}
         )
 
-    doc = Documento.objects.create(
-        archivo=archivo,
-        titulo=titulo,
-        tipo=tipo,
-        ot_id=ot_id,
-        patente_id=patente or None,
-    )
+    # Documento.save guarda el archivo por contenido (SHA-256): si los mismos
+    # bytes ya se subieron antes, se reutiliza ese archivo
+    try:
+        doc = Documento.objects.create(
+            archivo=archivo,
+            titulo=titulo,
+            tipo=tipo,
+            ot_id=ot_id,
+            patente_id=patente or None,
+        )
+    except ArchivoDemasiadoGrande as e:
+        return JsonResponse(
+            {"success": False, "message": str(e)},
+            status=413,
+        )
 
     return JsonResponse({
         "success": True,
@@ -153,6 +105,8 @@ def api_documentos_upload(request):
             "titulo": doc.titulo,
             "tipo": doc.tipo,
             "archivo": doc.archivo.url if doc.archivo else "",
+            # "" mientras se genera (la foto idéntica ya subida puede tenerla)
+            "miniatura": url_miniatura(doc.archivo.name, doc.tipo),
             "creado_en": doc.creado_en.strftime("%Y-%m-%d %H:%M"),
             "ot_id": doc.ot_id,
             "patente": doc.patente_id,
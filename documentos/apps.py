@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class DocumentosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'documentos'
+
+    def ready(self):
+        # Generación de miniaturas al subir fotos
+        from . import miniaturas  # noqa: F401
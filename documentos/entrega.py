@@ -0,0 +1,179 @@
+# documentos/entrega.py
+"""
+Entrega de archivos de MEDIA_ROOT ya autorizados (ver documentos.views.servir_media).
+
+Según settings.MEDIA_ENTREGA:
+
+  - "x-accel"    : responde vacío con `X-Accel-Redirect: MEDIA_INTERNAL_URL<nombre>`
+                   y nginx envía el archivo (sendfile, Range y ETag propios).
+  - "x-sendfile" : responde vacío con `X-Sendfile: <ruta absoluta>` (Apache
+                   mod_xsendfile, lighttpd).
+  - "python"     : Django envía el archivo (desarrollo o sin proxy), con
+                   ETag / If-None-Match (304), Last-Modified /
+                   If-Modified-Since y Range / If-Range (206, un rango).
+
+Configuración de nginx para "x-accel" (la ubicación interna no es
+accesible desde fuera; /media/ se pasa a Django como cualquier URL):
+
+    location /protegido/ {
+        internal;
+        alias /ruta/a/media/;
+    }
+
+Los blobs (blobs/...) tienen el SHA-256 en el nombre: su ETag es el hash y
+se cachean como inmutables en el navegador del usuario.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+from .almacenamiento import es_blob
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Tipos que se pueden mostrar en el navegador; el resto se descarga
+# (un HTML o SVG subido no debe ejecutarse en nuestro dominio)
+TIPOS_INLINE = {
+    "image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp",
+    "application/pdf", "text/plain",
+}
+
+_RE_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag(nombre, info):
+    if es_blob(nombre):
+        sha = os.path.splitext(os.path.basename(nombre))[0]
+        return f'"{sha}"'
+    return f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+
+
+def _cache_control(nombre):
+    if es_blob(nombre):
+        # El contenido nunca cambia para ese nombre
+        return "private, max-age=31536000, immutable"
+    return "private, no-cache"
+
+
+def _coincide_etag(cabecera, etag):
+    if not cabecera:
+        return False
+    if cabecera.strip() == "*":
+        return True
+    etiquetas = [e.strip() for e in cabecera.split(",")]
+    return etag in etiquetas or f"W/{etag}" in etiquetas
+
+
+def _rango(cabecera, tamano):
+    """
+    (inicio, fin) inclusivo del header Range, None si no aplica (se envía
+    completo) o "invalido" si no se puede satisfacer (416).
+    Solo se atiende un rango; varios rangos se responden completos.
+    """
+    if not cabecera or tamano == 0:
+        return None
+    m = _RE_RANGO.match(cabecera.strip())
+    if not m:
+        return None
+    desde, hasta = m.groups()
+    if not desde and not hasta:
+        return None
+    if not desde:
+        # bytes=-N : los últimos N bytes
+        largo = int(hasta)
+        if largo == 0:
+            return "invalido"
+        return max(0, tamano - largo), tamano - 1
+    inicio = int(desde)
+    fin = int(hasta) if hasta else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return "invalido"
+    return inicio, min(fin, tamano - 1)
+
+
+def _leer(ruta, inicio, largo):
+    with open(ruta, "rb") as f:
+        f.seek(inicio)
+        while largo > 0:
+            bloque = f.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def _cabeceras_comunes(response, nombre, content_type, etag=None, modificado=None):
+    response["Content-Type"] = content_type
+    response["Cache-Control"] = _cache_control(nombre)
+    response["X-Content-Type-Options"] = "nosniff"
+    disposicion = "inline" if content_type.split(";")[0] in TIPOS_INLINE else "attachment"
+    response["Content-Disposition"] = (
+        f"{disposicion}; filename*=UTF-8''{quote(os.path.basename(nombre))}"
+    )
+    if etag:
+        response["ETag"] = etag
+    if modificado:
+        response["Last-Modified"] = http_date(modificado)
+    return response
+
+
+def responder_archivo(request, nombre, ruta):
+    """Respuesta para el archivo `nombre` (relativo a MEDIA_ROOT) en `ruta`."""
+    content_type = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+    modo = settings.MEDIA_ENTREGA
+
+    if modo == "x-accel":
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = quote(f"{settings.MEDIA_INTERNAL_URL}{nombre}")
+        return _cabeceras_comunes(response, nombre, content_type)
+    if modo == "x-sendfile":
+        response = HttpResponse()
+        response["X-Sendfile"] = ruta
+        return _cabeceras_comunes(response, nombre, content_type)
+
+    info = os.stat(ruta)
+    etag = _etag(nombre, info)
+    modificado = int(info.st_mtime)
+
+    # 304: el cliente ya tiene esta versión
+    inm = request.META.get("HTTP_IF_NONE_MATCH")
+    if inm is not None:
+        no_modificado = _coincide_etag(inm, etag)
+    else:
+        desde = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE") or "")
+        no_modificado = desde is not None and modificado <= desde
+    if no_modificado:
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        response["Cache-Control"] = _cache_control(nombre)
+        return response
+
+    rango = _rango(request.META.get("HTTP_RANGE"), info.st_size)
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if rango and if_range and if_range.strip() != etag:
+        # El archivo cambió desde la descarga parcial: va completo
+        rango = None
+
+    if rango == "invalido":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{info.st_size}"
+        return response
+
+    if rango:
+        inicio, fin = rango
+        largo = fin - inicio + 1
+        response = StreamingHttpResponse(_leer(ruta, inicio, largo), status=206)
+        response["Content-Range"] = f"bytes {inicio}-{fin}/{info.st_size}"
+        response["Content-Length"] = str(largo)
+    else:
+        # FileResponse usa wsgi.file_wrapper (sendfile) cuando el servidor lo ofrece
+        response = FileResponse(open(ruta, "rb"))
+        response["Content-Length"] = str(info.st_size)
+
+    response["Accept-Ranges"] = "bytes"
+    return _cabeceras_comunes(response, nombre, content_type, etag, modificado)
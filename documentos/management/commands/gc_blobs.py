@@ -0,0 +1,98 @@
+# documentos/management/commands/gc_blobs.py
+"""
+Borra los blobs de documentos que ninguna fila de `documentos` referencia.
+
+Uso:
+    python manage.py gc_blobs               # borra huérfanos con más de 60 min
+    python manage.py gc_blobs --gracia 1440 # solo los de más de un día
+    python manage.py gc_blobs --dry-run     # informa sin borrar
+
+Los blobs (MEDIA_ROOT/blobs/, ver documentos/almacenamiento.py) se
+comparten entre documentos con el mismo contenido, así que borrar un
+Documento nunca borra su archivo; eso lo hace este comando.
+
+El período de gracia protege las subidas en curso: el blob se escribe (o se
+"toca", si ya existía) antes de insertar la fila que lo referencia. También
+se borran los temporales de subidas interrumpidas (blobs/tmp/) y la
+miniatura de cada blob borrado.
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from documentos.almacenamiento import DIR_TEMPORAL, PREFIJO
+from documentos.miniaturas import nombre_miniatura
+from documentos.models import Documento
+
+
+class Command(BaseCommand):
+    help = "Elimina los blobs de documentos sin referencias."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gracia", type=int, default=60,
+                            help="Minutos de antigüedad mínima para borrar (default 60).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Muestra lo que haría sin borrar.")
+
+    def handle(self, *args, **options):
+        dry = options["dry_run"]
+        limite = time.time() - max(0, options["gracia"]) * 60
+
+        storage = Documento._meta.get_field("archivo").storage
+        raiz = storage.path(PREFIJO)
+        if not os.path.isdir(raiz):
+            self.stdout.write("No hay blobs.")
+            return
+
+        referenciados = set(
+            Documento.objects
+            .filter(archivo__startswith=f"{PREFIJO}/")
+            .values_list("archivo", flat=True)
+            .iterator(chunk_size=5000)
+        )
+
+        revisados = borrados = liberados = 0
+        for carpeta, subcarpetas, archivos in os.walk(raiz, topdown=False):
+            relativa = os.path.relpath(carpeta, storage.path(""))
+            temporal = os.path.relpath(carpeta, raiz).split(os.sep)[0] == DIR_TEMPORAL
+
+            for archivo in archivos:
+                ruta = os.path.join(carpeta, archivo)
+                nombre = f"{relativa}/{archivo}".replace(os.sep, "/")
+                revisados += 1
+                try:
+                    info = os.stat(ruta)
+                except FileNotFoundError:
+                    continue
+                if info.st_mtime > limite:
+                    continue
+                if not temporal and nombre in referenciados:
+                    continue
+
+                borrados += 1
+                liberados += info.st_size
+                if dry:
+                    self.stdout.write(f"  huérfano: {nombre}")
+                    continue
+                rutas = [ruta]
+                if not temporal:
+                    rutas.append(storage.path(nombre_miniatura(nombre)))
+                for r in rutas:
+                    try:
+                        os.remove(r)
+                    except FileNotFoundError:
+                        pass
+
+            # Carpetas de hash vacías
+            if not dry and carpeta != raiz and not os.listdir(carpeta):
+                try:
+                    os.rmdir(carpeta)
+                except OSError:
+                    pass
+
+        prefijo = "[dry-run] " if dry else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}{revisados} archivos revisados, {borrados} borrados "
+            f"({liberados / (1024 * 1024):.1f} MB)."
+        ))
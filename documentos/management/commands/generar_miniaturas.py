@@ -0,0 +1,68 @@
+# documentos/management/commands/generar_miniaturas.py
+"""
+Genera las miniaturas que faltan de los documentos tipo FOTO.
+
+Uso:
+    python manage.py generar_miniaturas             # solo las que faltan
+    python manage.py generar_miniaturas --forzar    # regenera todas (p.ej. tras cambiar MINIATURA_LADO)
+    python manage.py generar_miniaturas --hilos 8
+    python manage.py generar_miniaturas --dry-run   # cuenta sin generar
+
+Se corre una vez al desplegar (las fotos subidas antes no tienen
+miniatura) y es seguro repetirlo. Cada archivo se procesa una vez aunque
+varios documentos lo compartan.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documentos import miniaturas
+from documentos.models import Documento
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas de los documentos FOTO."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forzar", action="store_true",
+                            help="Regenera aunque la miniatura exista.")
+        parser.add_argument("--hilos", type=int, default=4,
+                            help="Hilos de trabajo (default 4).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Solo cuenta las miniaturas pendientes.")
+
+    def handle(self, *args, **options):
+        if not miniaturas.disponible():
+            raise CommandError("Pillow no está instalado (pip install Pillow).")
+
+        forzar = options["forzar"]
+        storage = Documento._meta.get_field("archivo").storage
+
+        archivos = (
+            Documento.objects
+            .filter(tipo=miniaturas.TIPO_FOTO)
+            .exclude(archivo="")
+            .order_by()
+            .values_list("archivo", flat=True)
+            .distinct()
+        )
+        pendientes = [
+            nombre for nombre in archivos.iterator(chunk_size=2000)
+            if forzar or not os.path.exists(storage.path(miniaturas.nombre_miniatura(nombre)))
+        ]
+        self.stdout.write(f"Miniaturas por generar: {len(pendientes)}")
+        if options["dry_run"] or not pendientes:
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, options["hilos"])) as pool:
+            resultados = list(pool.map(
+                lambda nombre: miniaturas.generar(nombre, forzar=forzar),
+                pendientes,
+            ))
+
+        generadas = sum(resultados)
+        self.stdout.write(self.style.SUCCESS(
+            f"{generadas} miniaturas generadas, {len(pendientes) - generadas} omitidas "
+            "(ver log: archivo faltante o no es imagen)."
+        ))
@@ -0,0 +1,176 @@
+# documentos/miniaturas.py
+"""
+Miniaturas de los documentos tipo FOTO.
+
+La ficha del vehículo lista todas sus fotos; con miniaturas la página baja
+unos pocos KB por foto y el archivo original solo se pide al abrirlo.
+
+- Al guardar un Documento FOTO (post_save, tras el COMMIT) se encola la
+  generación en un ThreadPoolExecutor del proceso: la subida no espera a
+  Pillow.
+- La miniatura es un JPEG de a lo más MINIATURA_LADO px por lado en
+  MEDIA_ROOT/miniaturas/. El nombre sale del blob (SHA-256, ver
+  documentos/almacenamiento.py), así que fotos idénticas comparten
+  miniatura; para archivos antiguos se usa su misma ruta bajo
+  miniaturas/rutas/.
+- Las APIs de listado exponen `miniatura` (URL o "") solo si el archivo
+  ya existe; mientras se genera, el cliente muestra el ícono genérico.
+- `python manage.py generar_miniaturas` genera las que falten.
+
+Pillow es opcional: sin él no se generan miniaturas (se registra una vez
+en el log) y todo lo demás funciona igual.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .almacenamiento import es_blob, nombre_blob
+from .models import Documento
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depende del entorno
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "miniaturas"
+# Miniaturas de archivos anteriores a los blobs: miniaturas/rutas/<archivo>.jpg
+PREFIJO_RUTAS = "rutas"
+TIPO_FOTO = "FOTO"
+
+_pool = None
+_pool_lock = threading.Lock()
+_en_curso = set()
+_aviso_sin_pillow = False
+
+
+def disponible():
+    return Image is not None
+
+
+def nombre_miniatura(nombre_archivo):
+    """Ruta relativa a MEDIA_ROOT de la miniatura de `nombre_archivo`."""
+    if es_blob(nombre_archivo):
+        clave = os.path.splitext(os.path.basename(nombre_archivo))[0]
+        return f"{PREFIJO}/{clave[:2]}/{clave}.jpg"
+    return f"{PREFIJO}/{PREFIJO_RUTAS}/{nombre_archivo}.jpg"
+
+
+def origen_miniatura(nombre):
+    """
+    Q sobre Documento.archivo con los documentos de los que sale la
+    miniatura `nombre` (para revisar permisos al servirla), o None.
+    """
+    partes = nombre.split("/")
+    if len(partes) > 2 and partes[1] == PREFIJO_RUTAS and nombre.endswith(".jpg"):
+        return Q(archivo=nombre[len(f"{PREFIJO}/{PREFIJO_RUTAS}/"):-len(".jpg")])
+    if len(partes) == 3 and partes[2].endswith(".jpg"):
+        sha = partes[2][:-len(".jpg")]
+        if len(sha) == 64:
+            return Q(archivo__startswith=nombre_blob(sha))
+    return None
+
+
+def _storage():
+    return Documento._meta.get_field("archivo").storage
+
+
+def url_miniatura(nombre_archivo, tipo, storage=None):
+    """URL de la miniatura si ya fue generada; "" si no corresponde o falta."""
+    if tipo != TIPO_FOTO or not nombre_archivo:
+        return ""
+    storage = storage or _storage()
+    nombre = nombre_miniatura(nombre_archivo)
+    return storage.url(nombre) if storage.exists(nombre) else ""
+
+
+# ==========================================================
+# GENERACIÓN
+# ==========================================================
+def generar(nombre_archivo, forzar=False):
+    """
+    Genera la miniatura de `nombre_archivo`. Devuelve True si la escribió,
+    False si ya existía, faltaba Pillow o el archivo no es una imagen.
+    """
+    global _aviso_sin_pillow
+    if Image is None:
+        if not _aviso_sin_pillow:
+            logger.warning("Pillow no está instalado: no se generan miniaturas.")
+            _aviso_sin_pillow = True
+        return False
+
+    storage = _storage()
+    destino = storage.path(nombre_miniatura(nombre_archivo))
+    if not forzar and os.path.exists(destino):
+        return False
+
+    origen = storage.path(nombre_archivo)
+    lado = settings.MINIATURA_LADO
+    temporal = f"{destino}.{threading.get_ident()}.tmp"
+    try:
+        with Image.open(origen) as img:
+            # Respeta la orientación EXIF de las fotos de celular
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((lado, lado))
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            img.save(temporal, "JPEG", quality=80, optimize=True)
+        os.replace(temporal, destino)
+    except FileNotFoundError:
+        logger.warning("Miniatura: no existe el archivo %s", nombre_archivo)
+        return False
+    except Exception as e:
+        logger.warning("Miniatura: no se pudo procesar %s: %s", nombre_archivo, e)
+        return False
+    finally:
+        # Un save() a medias no deja el .tmp (gc_blobs solo recorre blobs/)
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return True
+
+
+def _pool_miniaturas():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.MINIATURAS_HILOS,
+                thread_name_prefix="miniaturas",
+            )
+        return _pool
+
+
+def _tarea(nombre_archivo):
+    try:
+        generar(nombre_archivo)
+    finally:
+        with _pool_lock:
+            _en_curso.discard(nombre_archivo)
+
+
+def encolar(nombre_archivo):
+    """Encola la miniatura en el pool (una sola vez por archivo a la vez)."""
+    with _pool_lock:
+        if nombre_archivo in _en_curso:
+            return None
+        _en_curso.add(nombre_archivo)
+    return _pool_miniaturas().submit(_tarea, nombre_archivo)
+
+
+@receiver(post_save, sender=Documento)
+def _documento_guardado(sender, instance, **kwargs):
+    if instance.tipo != TIPO_FOTO or not instance.archivo or not disponible():
+        return
+    nombre = instance.archivo.name
+    # Tras el COMMIT: el archivo ya está en su lugar y la subida no espera
+    transaction.on_commit(lambda: encolar(nombre))
@@ -53,7 +53,16 @@ class Documento(models.Model):
         managed = False   
 
     def save(self, *args, **kwargs):
-        if self.ot:
+        if self.archivo and not self.archivo._committed:
+            # Archivo nuevo: se guarda por contenido (SHA-256) y, si los
+            # mismos bytes ya existen, se reutiliza ese blob.
+            # Ver documentos/almacenamiento.py
+            from .almacenamiento import guardar_blob
+
+            nombre, _, _, _ = guardar_blob(self.archivo, self.archivo.storage)
+            self.archivo.name = nombre
+            self.archivo._committed = True
+        elif self.ot:
             self.archivo.field.upload_to = upload_to_ot
         else:
             self.archivo.field.upload_to = upload_to_vehiculo
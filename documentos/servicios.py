@@ -0,0 +1,108 @@
+# documentos/servicios.py
+"""
+Servicio compartido para listar documentos de un vehículo agrupados:
+
+  - actual      : documentos de la OT en curso (ot_id indicado).
+  - finalizadas : documentos de las OTs "Finalizado" del vehículo, agrupados
+                  por OT (más reciente primero).
+  - vehiculo    : documentos sueltos del vehículo (sin OT).
+
+Todo se resuelve en UNA consulta (UNION de los tres orígenes, cada rama
+apoyada en su índice) y se agrupa en Python por ot_id. Antes cada OT
+finalizada costaba dos consultas (exists() + filas).
+
+Lo usan documentos.api_views.api_documentos_list, documentos.views.document_list
+y vehiculos.views.api_ficha.
+"""
+from collections import OrderedDict
+
+from .miniaturas import url_miniatura
+from .models import Documento
+
+ESTADO_FINALIZADO = "Finalizado"
+
+_CAMPOS = (
+    "id", "titulo", "tipo", "archivo", "creado_en",
+    "ot_id", "ot__estado", "ot__fecha_ingreso",
+)
+
+
+def _serializar(fila, storage):
+    return {
+        "id": fila["id"],
+        "titulo": fila["titulo"],
+        "tipo": fila["tipo"],
+        "archivo": storage.url(fila["archivo"]) if fila["archivo"] else "",
+        "miniatura": url_miniatura(fila["archivo"], fila["tipo"], storage),
+        "creado_en": fila["creado_en"].strftime("%Y-%m-%d %H:%M"),
+        "ot_id": fila["ot_id"],
+    }
+
+
+def documentos_agrupados(patente=None, ot_actual_id=None):
+    """
+    Devuelve {"actual": [...], "finalizadas": [{"ot_id", "fecha", "docs"}], "vehiculo": [...]}.
+
+    Cada documento trae id, titulo, tipo, archivo (URL), miniatura (URL o
+    "", solo FOTO), creado_en y ot_id.
+    Con solo `ot_actual_id` (sin patente) se listan únicamente los
+    documentos de esa OT.
+    """
+    ramas = []
+    if patente:
+        # Documentos de cualquier OT del vehículo
+        ramas.append(Documento.objects.filter(ot__patente_id=patente))
+        # Documentos sueltos del vehículo
+        ramas.append(Documento.objects.filter(patente_id=patente, ot__isnull=True))
+    if ot_actual_id is not None:
+        ramas.append(Documento.objects.filter(ot_id=ot_actual_id))
+
+    resultado = {"actual": [], "finalizadas": [], "vehiculo": []}
+    if not ramas:
+        return resultado
+
+    # Sin el ordering del Meta en cada rama: el ORDER BY va sobre la UNION
+    ramas = [qs.order_by().values(*_CAMPOS) for qs in ramas]
+    qs = ramas[0].union(*ramas[1:]) if len(ramas) > 1 else ramas[0]
+
+    storage = Documento._meta.get_field("archivo").storage
+    grupos = OrderedDict()
+
+    for fila in qs.order_by("-creado_en", "-id"):
+        doc = _serializar(fila, storage)
+        ot_id = fila["ot_id"]
+
+        if ot_id is None:
+            resultado["vehiculo"].append(doc)
+        elif ot_actual_id is not None and ot_id == ot_actual_id:
+            resultado["actual"].append(doc)
+        elif fila["ot__estado"] == ESTADO_FINALIZADO:
+            grupo = grupos.get(ot_id)
+            if grupo is None:
+                fecha = fila["ot__fecha_ingreso"]
+                grupo = grupos[ot_id] = {
+                    "ot_id": ot_id,
+                    "fecha": fecha.strftime("%Y-%m-%d") if fecha else "",
+                    "docs": [],
+                    "_orden": (fecha, ot_id),
+                }
+            grupo["docs"].append(doc)
+
+    # OTs más recientes primero (fecha de ingreso, luego ot_id)
+    finalizadas = sorted(
+        grupos.values(),
+        key=lambda g: (g["_orden"][0] is not None, g["_orden"]),
+        reverse=True,
+    )
+    for grupo in finalizadas:
+        del grupo["_orden"]
+    resultado["finalizadas"] = finalizadas
+
+    return resultado
+
+
+def aplanar_finalizadas(finalizadas):
+    """Lista plana (con ot_id) de los documentos de las OTs finalizadas."""
+    docs = [d for grupo in finalizadas for d in grupo["docs"]]
+    docs.sort(key=lambda d: (d["creado_en"], d["id"]), reverse=True)
+    return docs
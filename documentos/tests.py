@@ -1,3 +1,255 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from autenticacion.models import Empleado, sincronizar_grupo
+from talleres.models import Recinto
+from vehiculos.models import Vehiculo
+
+from .almacenamiento import DIR_TEMPORAL, PREFIJO, ArchivoDemasiadoGrande, guardar_blob, nombre_blob
+from .entrega import _coincide_etag, _rango
+from .miniaturas import nombre_miniatura
+from .models import Documento
+
+
+class MediaTemporal:
+    """MEDIA_ROOT en un directorio temporal que se borra al terminar."""
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp(prefix="pruebas-media-")
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def ruta(self, nombre):
+        return os.path.join(self.media, *nombre.split("/"))
+
+    def temporales(self):
+        carpeta = self.ruta(f"{PREFIJO}/{DIR_TEMPORAL}")
+        return os.listdir(carpeta) if os.path.isdir(carpeta) else []
+
+
+# ==========================================================
+# BLOBS POR CONTENIDO
+# ==========================================================
+class GuardarBlobTests(MediaTemporal, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = FileSystemStorage(location=self.media)
+
+    def test_mismo_contenido_un_solo_blob(self):
+        primero = guardar_blob(ContentFile(b"foto", name="a.JPG"), self.storage)
+        segundo = guardar_blob(ContentFile(b"foto", name="otra.jpg"), self.storage)
+
+        nombre, sha, tamano, nuevo = primero
+        self.assertEqual(nombre, nombre_blob(sha, "jpg"))
+        self.assertEqual((tamano, nuevo), (4, True))
+        self.assertEqual(segundo, (nombre, sha, 4, False))
+        with open(self.ruta(nombre), "rb") as f:
+            self.assertEqual(f.read(), b"foto")
+        self.assertEqual(self.temporales(), [])
+
+    def test_contenido_distinto_blob_distinto(self):
+        a = guardar_blob(ContentFile(b"uno", name="a.pdf"), self.storage)
+        b = guardar_blob(ContentFile(b"dos", name="a.pdf"), self.storage)
+        self.assertNotEqual(a[0], b[0])
+
+    @override_settings(DOCUMENTOS_MAX_MB=1)
+    def test_rechaza_por_tamano_declarado(self):
+        with self.assertRaises(ArchivoDemasiadoGrande):
+            guardar_blob(ContentFile(b"x" * (1024 * 1024 + 1), name="a.pdf"), self.storage)
+        self.assertFalse(os.path.exists(self.ruta(PREFIJO)))
+
+    @override_settings(DOCUMENTOS_MAX_MB=1)
+    def test_corta_mientras_copia(self):
+        # Sin tamaño conocido: el límite se controla bloque a bloque
+        archivo = ContentFile(b"x" * (3 * 1024 * 1024), name="a.pdf")
+        archivo.size = None
+
+        with self.assertRaises(ArchivoDemasiadoGrande):
+            guardar_blob(archivo, self.storage)
+        self.assertEqual(self.temporales(), [])
+        self.assertEqual(os.listdir(self.ruta(PREFIJO)), [DIR_TEMPORAL])
+
+
+# ==========================================================
+# GC DE BLOBS
+# ==========================================================
+class GcBlobsTests(MediaTemporal, TestCase):
+    def crear(self, nombre, minutos):
+        """Archivo con fecha de modificación de hace `minutos`."""
+        ruta = self.ruta(nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as f:
+            f.write(nombre.encode())
+        antes = time.time() - minutos * 60
+        os.utime(ruta, (antes, antes))
+        return nombre
+
+    def gc(self, *args):
+        call_command("gc_blobs", *args, stdout=StringIO())
+
+    def existe(self, nombre):
+        return os.path.exists(self.ruta(nombre))
+
+    def setUp(self):
+        super().setUp()
+        self.referenciado = self.crear(nombre_blob("a" * 64, "jpg"), 120)
+        Documento.objects.create(titulo="Foto", archivo=self.referenciado)
+        self.huerfano = self.crear(nombre_blob("b" * 64, "jpg"), 120)
+        self.miniatura = self.crear(nombre_miniatura(self.huerfano), 120)
+        self.reciente = self.crear(nombre_blob("c" * 64, "pdf"), 30)
+        self.temporal = self.crear(f"{PREFIJO}/{DIR_TEMPORAL}/subida-cortada", 120)
+
+    def test_borra_huerfanos_fuera_del_periodo_de_gracia(self):
+        self.gc()
+
+        self.assertTrue(self.existe(self.referenciado))
+        self.assertTrue(self.existe(self.reciente))
+        self.assertFalse(self.existe(self.huerfano))
+        self.assertFalse(self.existe(self.miniatura))
+        self.assertFalse(self.existe(self.temporal))
+        # Carpetas de hash vacías
+        self.assertFalse(os.path.isdir(os.path.dirname(self.ruta(self.huerfano))))
+
+    def test_gracia_configurable(self):
+        self.gc("--gracia", "10")
+
+        self.assertFalse(self.existe(self.reciente))
+        self.assertTrue(self.existe(self.referenciado))
+
+    def test_dry_run_no_borra(self):
+        self.gc("--dry-run", "--gracia", "0")
+
+        for nombre in (self.referenciado, self.huerfano, self.miniatura, self.reciente, self.temporal):
+            self.assertTrue(self.existe(nombre), nombre)
+
+
+# ==========================================================
+# MEDIA PROTEGIDA
+# ==========================================================
+class EntregaTests(SimpleTestCase):
+    def test_rango(self):
+        for cabecera, esperado in [
+            (None, None),
+            ("bytes=0-9", (0, 9)),
+            ("bytes=90-", (90, 99)),
+            ("bytes=-10", (90, 99)),
+            ("bytes=-500", (0, 99)),
+            ("bytes=50-500", (50, 99)),
+            ("bytes=100-", "invalido"),
+            ("bytes=9-0", "invalido"),
+            ("bytes=-0", "invalido"),
+            ("bytes=-", None),
+            ("bytes=0-1,5-6", None),
+            ("items=0-9", None),
+        ]:
+            with self.subTest(cabecera=cabecera):
+                self.assertEqual(_rango(cabecera, 100), esperado)
+
+    def test_rango_de_archivo_vacio(self):
+        self.assertIsNone(_rango("bytes=0-9", 0))
+
+    def test_coincide_etag(self):
+        etag = '"abc"'
+        self.assertTrue(_coincide_etag('"abc"', etag))
+        self.assertTrue(_coincide_etag('"x", "abc"', etag))
+        self.assertTrue(_coincide_etag('W/"abc"', etag))
+        self.assertTrue(_coincide_etag("*", etag))
+        self.assertFalse(_coincide_etag('"abcd"', etag))
+        self.assertFalse(_coincide_etag("", etag))
+        self.assertFalse(_coincide_etag(None, etag))
+
+
+@override_settings(MEDIA_ENTREGA="python")
+class ServirMediaTests(MediaTemporal, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        recinto = Recinto.objects.create(nombre="Renca", ubicacion="Renca", jefe_recinto="Jefe")
+        cls.mecanico = Empleado.objects.create(
+            rut="22222222-2", nombre="Mario", cargo="MECANICO", usuario="mec",
+            password="-", recinto=recinto,
+        )
+        cls.vehiculo = Vehiculo.objects.create(patente="AB1234", marca="Volvo", modelo="FH")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.nombre = nombre_blob("a" * 64, "pdf")
+        ruta = self.ruta(self.nombre)
+        os.makedirs(os.path.dirname(ruta))
+        with open(ruta, "wb") as f:
+            f.write(b"0123456789")
+        Documento.objects.create(titulo="Informe", archivo=self.nombre, patente=self.vehiculo)
+
+    def entrar(self, empleado=None):
+        user = User.objects.create(username=empleado.usuario if empleado else "sin_rol")
+        if empleado:
+            sincronizar_grupo(empleado, user)
+        self.client.force_login(user)
+
+    def get(self, nombre, **cabeceras):
+        return self.client.get(f"/media/{nombre}", **cabeceras)
+
+    def test_sirve_el_archivo_del_documento(self):
+        self.entrar(self.mecanico)
+        response = self.get(self.nombre)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertEqual(response["ETag"], f'"{"a" * 64}"')
+
+        self.assertEqual(self.get(self.nombre, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        parcial = self.get(self.nombre, HTTP_RANGE="bytes=2-4")
+        self.assertEqual(parcial.status_code, 206)
+        self.assertEqual(b"".join(parcial.streaming_content), b"234")
+
+    def test_sin_rol_403(self):
+        self.entrar()
+        response = self.get(self.nombre)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.json()["success"])
+
+    def test_sin_sesion_redirige_al_login(self):
+        self.assertEqual(self.get(self.nombre).status_code, 302)
+
+    def escribir(self, nombre, contenido=b"x"):
+        ruta = self.ruta(nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+
+    def test_404(self):
+        self.entrar(self.mecanico)
+        huerfano = nombre_blob("b" * 64, "pdf")
+        self.escribir(huerfano)
+        sin_archivo = nombre_blob("c" * 64, "pdf")
+        Documento.objects.create(titulo="Perdido", archivo=sin_archivo, patente=self.vehiculo)
+
+        for nombre in (huerfano, sin_archivo):
+            with self.subTest(nombre=nombre):
+                self.assertEqual(self.get(nombre).status_code, 404)
+
+    def test_404_fuera_de_los_documentos(self):
+        # Aunque una fila apunte ahí: temporales de subidas y rutas fuera de MEDIA_ROOT
+        self.entrar(self.mecanico)
+        temporal = f"{PREFIJO}/{DIR_TEMPORAL}/subida"
+        self.escribir(temporal)
+        for nombre in (temporal, "../fuera.pdf"):
+            Documento.objects.create(titulo="Raro", archivo=nombre, patente=self.vehiculo)
+
+        for url in (temporal, "otra/../../fuera.pdf"):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url).status_code, 404)
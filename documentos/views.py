@@ -1,10 +1,20 @@
 # documentos/views.py
-from django.http import JsonResponse
+import os
+import posixpath
+
+from django.db.models import Q
+from django.http import Http404, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
-from ordenestrabajo.models import OrdenTrabajo
-from vehiculos.models import Vehiculo
+
+from autenticacion.roles import has_role
+from . import miniaturas
+from .entrega import responder_archivo
 from .models import Documento
+from .servicios import documentos_agrupados
+
+# Los mismos roles que ven la ficha del vehículo, donde se listan los documentos
+ROLES_DOCUMENTOS = ['CHOFER', 'MECANICO', 'SUPERVISOR', 'ADMINISTRATIVO', 'GUARDIA', 'ADMIN_WEB']
 
 
 # ================================================================
@@ -20,76 +30,69 @@ def document_list(request):
     if not ot_id and not patente:
         return JsonResponse({"success": False, "message": "Debe indicar ot_id o patente"}, status=400)
 
-    # ----------------------------------------------------------------------------
-    # A) DOCUMENTOS DE LA OT ACTUAL
-    # ----------------------------------------------------------------------------
-    docs_actual = []
-    if ot_id:
-        qs_actual = Documento.objects.filter(ot_id=ot_id).order_by("-creado_en")
-        docs_actual = [
-            {
-                "id": d.id,
-                "titulo": d.titulo,
-                "tipo": d.tipo,
-                "archivo": d.archivo.url if d.archivo else "",
-                "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M"),
-            }
-            for d in qs_actual
-        ]
-
-    # ----------------------------------------------------------------------------
-    # B) DOCUMENTOS DE OTs FINALIZADAS (distintas de la OT actual)
-    # ----------------------------------------------------------------------------
-    docs_finalizadas = []
-    if patente:
-        # OTs finalizadas del vehículo
-        finalizadas = (
-            OrdenTrabajo.objects
-            .filter(patente_id=patente, estado="Finalizado")
-            .exclude(ot_id=ot_id)
-            .order_by("-ot_id")
-        )
-
-        for ot in finalizadas:
-            qs_docs = Documento.objects.filter(ot_id=ot.ot_id).order_by("-creado_en")
-            items = [
-                {
-                    "id": d.id,
-                    "titulo": d.titulo,
-                    "tipo": d.tipo,
-                    "archivo": d.archivo.url if d.archivo else "",
-                    "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M"),
-                }
-                for d in qs_docs
-            ]
-
-            if items:
-                docs_finalizadas.append({
-                    "ot_id": ot.ot_id,
-                    "fecha": ot.fecha_ingreso.strftime("%Y-%m-%d"),
-                    "docs": items
-                })
+    try:
+        ot_id = int(ot_id) if ot_id else None
+    except (TypeError, ValueError):
+        ot_id = None
 
     # ----------------------------------------------------------------------------
-    # C) DOCUMENTOS DEL VEHÍCULO (sin OT)
+    # A) OT actual  B) OTs finalizadas (distintas de la actual)  C) vehículo sin OT
     # ----------------------------------------------------------------------------
-    docs_vehiculo = []
-    if patente:
-        qs_veh = Documento.objects.filter(ot_id__isnull=True, patente_id=patente).order_by("-creado_en")
-        docs_vehiculo = [
-            {
-                "id": d.id,
-                "titulo": d.titulo,
-                "tipo": d.tipo,
-                "archivo": d.archivo.url if d.archivo else "",
-                "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M"),
-            }
-            for d in qs_veh
-        ]
+    docs = documentos_agrupados(patente, ot_actual_id=ot_id)
 
     return JsonResponse({
         "success": True,
-        "actual": docs_actual,
-        "finalizadas": docs_finalizadas,
-        "vehiculo": docs_vehiculo,
+        "actual": docs["actual"],
+        "finalizadas": docs["finalizadas"],
+        "vehiculo": docs["vehiculo"],
     })
+
+
+# ================================================================
+# 📎 MEDIA PROTEGIDA
+# GET /media/<nombre>
+# ================================================================
+def _documentos_del_archivo(nombre):
+    """Documentos (con OT o vehículo) a los que pertenece el archivo `nombre`."""
+    if nombre.startswith(miniaturas.PREFIJO + "/"):
+        filtro = miniaturas.origen_miniatura(nombre)
+        if filtro is None:
+            return Documento.objects.none()
+    else:
+        filtro = Q(archivo=nombre)
+    return (
+        Documento.objects
+        .filter(filtro)
+        .filter(Q(ot__isnull=False) | Q(patente__isnull=False))
+    )
+
+
+@login_required
+@require_http_methods(["GET", "HEAD"])
+def servir_media(request, nombre):
+    """
+    Sirve un archivo de MEDIA_ROOT solo si pertenece a un documento de una
+    OT o de un vehículo y el usuario puede ver la ficha del vehículo (donde
+    se listan esos documentos). La transferencia la hace el proxy o
+    documentos/entrega.py según MEDIA_ENTREGA.
+    """
+    nombre = posixpath.normpath(nombre).lstrip("/")
+    if nombre.startswith("..") or nombre.startswith("blobs/tmp/"):
+        raise Http404
+
+    user = request.user
+    if not (user.is_superuser or has_role(user, ROLES_DOCUMENTOS)):
+        return JsonResponse(
+            {"success": False, "message": "No tiene permisos para ver este archivo."},
+            status=403,
+        )
+
+    if not _documentos_del_archivo(nombre).exists():
+        raise Http404
+
+    ruta = Documento._meta.get_field("archivo").storage.path(nombre)
+    if not os.path.isfile(ruta):
+        raise Http404
+
+    return responder_archivo(request, nombre, ruta)
+
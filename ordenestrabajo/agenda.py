@@ -0,0 +1,219 @@
+# ordenestrabajo/agenda.py
+"""
+Motor de disponibilidad de la agenda de ingresos.
+
+- La grilla de cada taller (hora de inicio, hora de fin, largo del bloque y
+  cupos por bloque; por defecto, los andenes del recinto) sale de settings:
+  AGENDA_DEFAULT y, por taller, AGENDA_POR_TALLER = {taller_id: {...}} con
+  las claves que cambien. ordenestrabajo/reservas.py reserva sobre la misma
+  grilla (`bloque`) y con los mismos cupos (`cupos`).
+- La ocupación se guarda por (recinto, día) como {minuto_del_día: n_OTs}
+  activas, en una clave que incluye la versión del día (utils.versiones,
+  recurso AGENDA). Los días que faltan en caché se leen con UNA consulta
+  agrupada (fecha, hora) sobre todo el rango, cubierta por ix_ot_agenda.
+- La grilla se aplica sobre la ocupación al responder, así que cambiar el
+  horario de un taller no requiere invalidar nada.
+- Crear/borrar una OT o cambiar su estado, fecha, hora o recinto
+  incrementa la versión del día afectado (señales, al confirmar la
+  transacción; las transiciones de ordenestrabajo.estados vía
+  `ot_estado_cambiado`). Una lectura que consultó antes del cambio guarda
+  su resultado bajo la versión anterior, que ya nadie lee: no puede pisar
+  el día recién invalidado. Otras actualizaciones masivas (QuerySet.update)
+  no disparan señales: quien las haga debe llamar a `invalidar_dia`.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from utils import versiones
+
+from . import originales, reservas
+from .estados import ESTADOS_ACTIVOS, ot_estado_cambiado
+from .models import OrdenTrabajo
+
+# capacidad None = tantos cupos por bloque como andenes tenga el recinto
+AGENDA_DEFAULT = {"inicio": "09:00", "fin": "18:00", "slot_min": 60, "capacidad": None}
+
+AGENDA_CACHE_TTL = getattr(settings, "AGENDA_CACHE_TTL", 600)
+
+# Rango máximo (días) que se puede pedir en una sola matriz
+MAX_DIAS = 62
+
+
+# ==========================================================
+# GRILLA POR TALLER
+# ==========================================================
+def _minutos(hhmm):
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def _hhmm(minutos):
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def configuracion(taller_id):
+    """Horario del taller: AGENDA_DEFAULT con lo que defina AGENDA_POR_TALLER."""
+    conf = dict(AGENDA_DEFAULT)
+    conf.update(getattr(settings, "AGENDA_DEFAULT", {}))
+    por_taller = getattr(settings, "AGENDA_POR_TALLER", {})
+    conf.update(por_taller.get(taller_id) or por_taller.get(str(taller_id)) or {})
+    return conf
+
+
+def grilla(taller_id):
+    """Lista de minutos del día en que empieza cada bloque (fin incluido)."""
+    conf = configuracion(taller_id)
+    paso = max(int(conf["slot_min"]), 1)
+    return list(range(_minutos(conf["inicio"]), _minutos(conf["fin"]) + 1, paso))
+
+
+def cupos(taller):
+    """OTs por bloque: la capacidad del taller o, sin ella, los andenes del recinto."""
+    conf = configuracion(taller.taller_id)
+    return max(int(conf["capacidad"] or reservas.capacidad(taller.recinto_id)), 1)
+
+
+def bloque(taller_id, hora):
+    """Hora de inicio del bloque de la grilla que contiene `hora` (None si queda fuera)."""
+    conf = configuracion(taller_id)
+    paso = max(int(conf["slot_min"]), 1)
+    bloques = grilla(taller_id)
+    minuto = hora.hour * 60 + hora.minute
+    if not bloques or not bloques[0] <= minuto < bloques[-1] + paso:
+        return None
+    inicio = bloques[0] + (minuto - bloques[0]) // paso * paso
+    return time(inicio // 60, inicio % 60)
+
+
+# ==========================================================
+# OCUPACIÓN POR (RECINTO, DÍA)
+# ==========================================================
+def _clave(recinto_id, fecha, epoca, version):
+    return f"agenda:ocupacion:{recinto_id}:{fecha.isoformat()}:{epoca}:{version}"
+
+
+def _consultar(recinto_id, desde, hasta):
+    """{fecha: {minuto: n}} del rango, en una consulta agrupada."""
+    filas = (
+        OrdenTrabajo.objects
+        .filter(
+            recinto_id=recinto_id,
+            fecha_ingreso__gte=desde,
+            fecha_ingreso__lte=hasta,
+            estado__in=ESTADOS_ACTIVOS,
+            hora_ingreso__isnull=False,
+        )
+        .order_by()
+        .values("fecha_ingreso", "hora_ingreso")
+        .annotate(n=Count("ot_id"))
+    )
+    ocupacion = {}
+    for f in filas:
+        hora = f["hora_ingreso"]
+        minuto = hora.hour * 60 + hora.minute
+        dia = ocupacion.setdefault(f["fecha_ingreso"], {})
+        dia[minuto] = dia.get(minuto, 0) + f["n"]
+    return ocupacion
+
+
+def ocupacion(recinto_id, desde, hasta):
+    """
+    {fecha: {minuto: n}} para cada día del rango (días vacíos incluidos).
+    Lee las versiones de los días y luego la caché de todos de una vez, y
+    consulta solo el tramo que falta.
+    """
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    # Versiones ANTES de consultar: si una OT cambia entre medio, lo leído
+    # queda bajo la versión vieja
+    epoca, *por_dia = versiones.versiones(
+        [(versiones.AGENDA, versiones.ambito_dia(recinto_id, d)) for d in dias]
+    )
+    claves = {d: _clave(recinto_id, d, epoca, v) for d, v in zip(dias, por_dia)}
+    en_cache = cache.get_many(list(claves.values()))
+
+    resultado = {d: en_cache[k] for d, k in claves.items() if k in en_cache}
+    faltan = [d for d in dias if d not in resultado]
+    if faltan:
+        leidos = _consultar(recinto_id, faltan[0], faltan[-1])
+        nuevos = {}
+        for d in faltan:
+            resultado[d] = leidos.get(d, {})
+            nuevos[claves[d]] = resultado[d]
+        cache.set_many(nuevos, AGENDA_CACHE_TTL)
+
+    return resultado
+
+
+def matriz(taller, desde, hasta):
+    """
+    Disponibilidad del taller día por día:
+        [{"fecha", "slots": [{"hora", "ocupados", "ocupado"}]}]
+    Una OT cuenta en el bloque que contiene su hora de ingreso.
+    """
+    conf = configuracion(taller.taller_id)
+    paso = max(int(conf["slot_min"]), 1)
+    capacidad = cupos(taller)
+    bloques = grilla(taller.taller_id)
+
+    por_dia = ocupacion(taller.recinto_id, desde, hasta)
+
+    dias = []
+    for fecha in sorted(por_dia):
+        ocupados = por_dia[fecha]
+        slots = []
+        for inicio in bloques:
+            n = sum(v for m, v in ocupados.items() if inicio <= m < inicio + paso)
+            slots.append({"hora": _hhmm(inicio), "ocupados": n, "ocupado": n >= capacidad})
+        dias.append({"fecha": fecha.isoformat(), "slots": slots})
+    return dias
+
+
+def parsear_fecha(valor):
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+# ==========================================================
+# INVALIDACIÓN
+# ==========================================================
+def invalidar_dia(recinto_id, fecha):
+    if recinto_id and fecha:
+        versiones.incrementar(versiones.AGENDA, versiones.ambito_dia(recinto_id, fecha))
+
+
+def _huella(instance):
+    return (instance.recinto_id, instance.fecha_ingreso, instance.hora_ingreso, instance.estado)
+
+
+def _huella_original(instance):
+    o = originales.de(instance)
+    return (o["recinto_id"], o["fecha_ingreso"], o["hora_ingreso"], o["estado"]) if o else None
+
+
+def _invalidar_despues(*huellas):
+    ambitos = {versiones.ambito_dia(h[0], h[1]) for h in huellas if h and h[0] and h[1]}
+    if ambitos:
+        versiones.incrementar_despues(versiones.AGENDA, *ambitos)
+
+
+@receiver(post_save, sender=OrdenTrabajo)
+def _ot_post_save(sender, instance, created, **kwargs):
+    antes = None if created else _huella_original(instance)
+    despues = _huella(instance)
+    if created or antes != despues:
+        # Sin huella original se invalida solo el día actual
+        _invalidar_despues(antes, despues)
+
+
+@receiver(post_delete, sender=OrdenTrabajo)
+def _ot_post_delete(sender, instance, **kwargs):
+    _invalidar_despues(_huella_original(instance), _huella(instance))
+
+
+@receiver(ot_estado_cambiado)
+def _ot_transicion(sender, recinto_id, fecha_ingreso, **kwargs):
+    _invalidar_despues((recinto_id, fecha_ingreso))
@@ -1,27 +1,34 @@
 # ordenestrabajo/api_views.py
-from datetime import datetime, timedelta, time as dtime
+from datetime import datetime, timedelta
 import logging
 import re
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import Max
+from django.db import transaction
 from django.http import JsonResponse
 from django.template.loader import render_to_string
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST
 
 from autenticacion.models import Empleado
+from autenticacion.middleware import get_empleado
 from autenticacion.roles import supervisor_only
 from talleres.models import Taller
+from utils import fragmentos, versiones
 from vehiculos.models import Vehiculo
+from . import agenda, punteros
+from .bitacora import cargo_legible, pagina_eventos, registrar_evento
+from .estados import ESTADOS_ACTIVOS, TransicionConflicto, aplicar_transicion
+from .reservas import SlotOcupado, asignar_ot, reservar
 from .models import OrdenTrabajo, SolicitudIngresoVehiculo
+from .tablero import publicar_ot, publicar_solicitud
 
 
 logger = logging.getLogger(__name__)
 
 # Estados considerados como "activos" para una OT (se muestran en Registro Taller
 # y bloquean nuevos horarios para el mismo vehículo/hora/recinto).
-ACTIVE_STATES = ["Pendiente", "Recibida", "En Taller", "En Proceso", "Pausado"]
+ACTIVE_STATES = ESTADOS_ACTIVOS
 
 
 # ==========================================================
@@ -30,27 +37,18 @@ ACTIVE_STATES = ["Pendiente", "Recibida", "En Taller", "En Proceso", "Pausado"]
 def _get_supervisor(request):
     """
     Devuelve el Empleado que corresponde al usuario autenticado
-    con su RECINTO pre-cargado (select_related('recinto')).
+    con su RECINTO pre-cargado (resuelto una vez por request, ver
+    autenticacion.middleware).
     """
-    return (
-        Empleado.objects
-        .select_related("recinto")
-        .filter(usuario=request.user.username)
-        .first()
-    )
+    return get_empleado(request)
 
 
 def _ot_activa_para_vehiculo(vehiculo):
     """
-    Retorna la OT activa más reciente para un vehículo, si existe.
-    Una OT se considera activa si su estado está en ACTIVE_STATES.
+    Retorna la OT activa del vehículo, si existe (lectura por PK del
+    puntero vehiculo_ot_actual, ver ordenestrabajo/punteros.py).
     """
-    return (
-        OrdenTrabajo.objects
-        .filter(patente=vehiculo, estado__in=ACTIVE_STATES)
-        .order_by("-fecha_ingreso", "-hora_ingreso")
-        .first()
-    )
+    return punteros.ot_activa(vehiculo.pk).defer("descripcion").first()
 
 
 def _get_mecanico_en_recinto(mecanico_rut, recinto_id):
@@ -71,9 +69,76 @@ def _get_mecanico_en_recinto(mecanico_rut, recinto_id):
 
 
 # ==========================================================
-# 📅 API Agenda (slots por hora en un día/taller)
+# VERSIONES (ETag de los paneles con polling y caché de sus tablas,
+# ver utils/versiones.py y utils/fragmentos.py)
+# ==========================================================
+def _deps_ots_recinto(recinto_id):
+    return [
+        (versiones.OTS, recinto_id),
+        (versiones.VEHICULOS, versiones.GLOBAL),
+        (versiones.EMPLEADOS, versiones.GLOBAL),
+    ]
+
+
+def _deps_ots_mecanico(rut):
+    return [
+        (versiones.OTS, versiones.ambito_mecanico(rut)),
+        (versiones.VEHICULOS, versiones.GLOBAL),
+    ]
+
+
+def _deps_solicitudes_recinto(recinto_id):
+    return [
+        (versiones.SOLICITUDES, recinto_id),
+        (versiones.VEHICULOS, versiones.GLOBAL),
+        (versiones.EMPLEADOS, versiones.GLOBAL),
+    ]
+
+
+def _versiones_supervisor_ots(request):
+    supervisor = _get_supervisor(request)
+    if not supervisor or not supervisor.recinto_id:
+        return None
+    return _deps_ots_recinto(supervisor.recinto_id)
+
+
+def _versiones_mecanico_vehiculos(request):
+    empleado = get_empleado(request)
+    if not empleado:
+        return None
+    return _deps_ots_mecanico(empleado.rut)
+
+
+def _versiones_supervisor_solicitudes(request):
+    supervisor = _get_supervisor(request)
+    if not supervisor or not supervisor.recinto_id:
+        return None
+    return _deps_solicitudes_recinto(supervisor.recinto_id)
+
+
+# ==========================================================
+# 📅 API Agenda (slots de un día/taller)
 # GET /api/ordenestrabajo/agenda/slots/
 # ==========================================================
+def _taller_desde_request(request):
+    """(taller, None) o (None, JsonResponse de error) según ?taller_id=."""
+    try:
+        taller_id = int(request.GET.get("taller_id", ""))
+    except ValueError:
+        return None, JsonResponse(
+            {"success": False, "message": "Taller inválido."},
+            status=400,
+        )
+
+    taller = Taller.objects.filter(taller_id=taller_id).first()
+    if not taller:
+        return None, JsonResponse(
+            {"success": False, "message": "Taller no encontrado."},
+            status=404,
+        )
+    return taller, None
+
+
 @login_required
 @require_GET
 def api_agenda_slots(request):
@@ -88,58 +153,69 @@ def api_agenda_slots(request):
 
     # Parseo de fecha
     try:
-        fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
+        fecha = agenda.parsear_fecha(fecha_str)
     except ValueError:
         return JsonResponse(
             {"success": False, "message": "Fecha inválida."},
             status=400,
         )
 
-    # Parseo de ID de taller
+    taller, error = _taller_desde_request(request)
+    if error:
+        return error
+
+    # Ocupación del RECINTO del taller sobre la grilla configurada del taller
+    dia = agenda.matriz(taller, fecha, fecha)[0]
+    slots = [{"hora": s["hora"], "ocupado": s["ocupado"]} for s in dia["slots"]]
+
+    return JsonResponse({"success": True, "slots": slots})
+
+
+# ==========================================================
+# 📅 API Agenda (matriz de ocupación de un rango de días)
+# GET /api/ordenestrabajo/agenda/matriz/?taller_id=&desde=&hasta=
+# ==========================================================
+@login_required
+@require_GET
+def api_agenda_matriz(request):
+    """
+    Ocupación de una semana / mes en una sola llamada.
+    Sin `hasta` se devuelven 7 días desde `desde`.
+    """
     try:
-        taller_id_int = int(taller_id)
+        desde = agenda.parsear_fecha(request.GET.get("desde", ""))
+        hasta_str = request.GET.get("hasta")
+        hasta = agenda.parsear_fecha(hasta_str) if hasta_str else desde + timedelta(days=6)
     except ValueError:
         return JsonResponse(
-            {"success": False, "message": "Taller inválido."},
+            {"success": False, "message": "Rango de fechas inválido."},
             status=400,
         )
 
-    taller = Taller.objects.filter(taller_id=taller_id_int).first()
-    if not taller:
+    if hasta < desde:
         return JsonResponse(
-            {"success": False, "message": "Taller no encontrado."},
-            status=404,
+            {"success": False, "message": "La fecha final es anterior a la inicial."},
+            status=400,
         )
-
-    # Usamos el RECINTO del taller para buscar las OTs de ese lugar
-    recinto_id = taller.recinto_id
-
-    # Rango horario fijo 09:00–18:00
-    start_dt = datetime.combine(fecha, dtime(9, 0))
-    end_dt = datetime.combine(fecha, dtime(18, 0))
-
-    # Horarios ya ocupados por OTs activas en ese RECINTO
-    ots = (
-        OrdenTrabajo.objects
-        .filter(
-            fecha_ingreso=fecha,
-            recinto_id=recinto_id,
-            estado__in=ACTIVE_STATES,
+    if (hasta - desde).days + 1 > agenda.MAX_DIAS:
+        return JsonResponse(
+            {"success": False, "message": f"El rango no puede superar {agenda.MAX_DIAS} días."},
+            status=400,
         )
-        .values_list("hora_ingreso", flat=True)
-    )
 
-    ocupados = {h.strftime("%H:%M") for h in ots if h}
+    taller, error = _taller_desde_request(request)
+    if error:
+        return error
 
-    # Generar slots de 1 hora
-    slots = []
-    current = start_dt
-    while current <= end_dt:
-        hora = current.strftime("%H:%M")
-        slots.append({"hora": hora, "ocupado": hora in ocupados})
-        current += timedelta(minutes=60)
-
-    return JsonResponse({"success": True, "slots": slots})
+    conf = agenda.configuracion(taller.taller_id)
+    grilla = {k: conf[k] for k in ("inicio", "fin", "slot_min", "capacidad")}
+    grilla["capacidad"] = agenda.cupos(taller)
+    return JsonResponse({
+        "success": True,
+        "taller_id": taller.taller_id,
+        "grilla": grilla,
+        "dias": agenda.matriz(taller, desde, hasta),
+    })
 
 
 # ==========================================================
@@ -156,14 +232,7 @@ def api_crear_ingreso(request):
     - NO se crea OT en esta etapa.
     - NO se modifica el estado del vehículo.
     """
-    user = request.user
-
-    empleado = (
-        Empleado.objects
-        .select_related("recinto")
-        .filter(usuario=user.username)
-        .first()
-    )
+    empleado = get_empleado(request)
     if not empleado:
         return JsonResponse(
             {"success": False, "message": "Empleado no encontrado."},
@@ -254,6 +323,7 @@ def api_crear_ingreso(request):
         descripcion=descripcion,
         # estado por defecto: PENDIENTE
     )
+    publicar_solicitud(solicitud, taller.recinto_id)
 
     # Si por pruebas anteriores el vehículo quedó "En Taller" pero ahora no tiene OT activa,
     # lo devolvemos a "Disponible".
@@ -281,30 +351,25 @@ def api_ultimas_ot(request):
     """
     Devuelve las últimas OTs finalizadas para cada vehículo
     cuya unidad se encuentra actualmente disponible.
-    """
-    # 1️⃣ Subquery: obtener la última OT por vehículo (patente_id)
-    subquery = (
-        OrdenTrabajo.objects
-        .values("patente_id")
-        .annotate(ultima_ot=Max("ot_id"))
-        .values_list("ultima_ot", flat=True)
-    )
 
-    # 2️⃣ Filtrar últimas OT finalizadas + vehículo disponible
+    La última OT de cada vehículo viene del puntero vehiculo_ot_actual
+    (antes: GROUP BY patente MAX(ot_id) sobre toda la tabla).
+    """
     ots = (
         OrdenTrabajo.objects
         .select_related("patente", "recinto")
         .filter(
-            ot_id__in=subquery,            # solo la última OT del vehículo
+            puntero_ultima__isnull=False,  # solo la última OT del vehículo
             estado="Finalizado",           # esa OT debe estar finalizada
             patente__estado="Disponible",  # vehículo debe estar disponible
         )
         .order_by("-ot_id")[:15]
     )
 
-    html = render_to_string(
-        "partials/tabla_ultimos_ingresos.html",
-        {"ots": ots},
+    html = fragmentos.fragmento(
+        "ultimas_ot", versiones.GLOBAL,
+        [(versiones.OTS, versiones.GLOBAL), (versiones.VEHICULOS, versiones.GLOBAL)],
+        lambda: render_to_string("partials/tabla_ultimos_ingresos.html", {"ots": ots}),
     )
     return JsonResponse({"success": True, "html": html})
 
@@ -343,7 +408,7 @@ def api_asignar_ot(request):
             estado="Pendiente",
             recinto_id=supervisor.recinto_id,
         )
-        .select_related("patente", "recinto")
+        .defer("descripcion")
         .first()
     )
     if not ot:
@@ -357,48 +422,64 @@ def api_asignar_ot(request):
             {"success": False, "message": "Mecánico inválido."}
         )
 
-    # 🔹 nombre y cargo legible del supervisor
-    display_nombre = supervisor.nombre or supervisor.usuario
-    if supervisor.cargo:
-        cargo_raw = supervisor.cargo.upper()
-        if cargo_raw == "SUPERVISOR":
-            cargo_label = "Supervisor"
-        elif cargo_raw == "MECANICO":
-            cargo_label = "Mecánico"
-        else:
-            cargo_label = supervisor.cargo.title()
-    else:
-        cargo_label = "Usuario"
-
-    autor_tag = f"[{cargo_label} {display_nombre}]"
-
-    ot.estado = "En Taller"
-    ot.rut = mec
-
-    base = (ot.descripcion or "").rstrip()
-    prefix = "\n" if base else ""
-    ot.descripcion = f"{base}{prefix}{autor_tag} {comentario}"
-
-    ot.save()
-
-    veh = ot.patente
-    veh.estado = "En Taller"
-    # Ubicación: nombre del recinto del supervisor
+    # Flujo antiguo: el supervisor recibe el vehículo directamente (sin
+    # exigir el ingreso del guardia) y asigna el mecánico en el mismo UPDATE.
+    campos_vehiculo = {}
     if supervisor.recinto:
-        veh.ubicacion = supervisor.recinto.nombre
-    veh.save()
+        # Ubicación: nombre del recinto del supervisor
+        campos_vehiculo["ubicacion"] = supervisor.recinto.nombre
+    try:
+        aplicar_transicion(
+            ot, "En Taller", supervisor, comentario, nombre=supervisor.usuario,
+            reglas=False, campos={"rut": mec}, campos_vehiculo=campos_vehiculo,
+        )
+    except TransicionConflicto as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=409)
 
     return JsonResponse({"success": True})
 
 
+# ==========================================================
+# 📜 API Bitácora de la OT (paginada)
+# GET /api/ordenestrabajo/<ot_id>/eventos/?cursor=&limit=
+# ==========================================================
+@login_required
+@require_GET
+def api_ot_eventos(request, ot_id):
+    try:
+        limite = min(max(int(request.GET.get("limit", 50)), 1), 200)
+        cursor = request.GET.get("cursor")
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return JsonResponse(
+            {"success": False, "message": "Parámetros de paginación inválidos."},
+            status=400,
+        )
+
+    if not OrdenTrabajo.objects.filter(ot_id=ot_id).exists():
+        return JsonResponse(
+            {"success": False, "message": "OT no encontrada."},
+            status=404,
+        )
+
+    items, siguiente = pagina_eventos(ot_id, cursor, limite)
+    return JsonResponse({
+        "success": True,
+        "ot_id": ot_id,
+        "items": items,
+        "next_cursor": siguiente,
+    })
+
+
 # ==========================================================
 # 🧰 API — MECÁNICO: vehículos asignados
 # GET /api/ordenestrabajo/mecanico/vehiculos/
 # ==========================================================
 @login_required
 @require_GET
+@versiones.condicional(_versiones_mecanico_vehiculos)
 def api_mecanico_vehiculos(request):
-    empleado = Empleado.objects.filter(usuario=request.user.username).first()
+    empleado = get_empleado(request)
     if not empleado:
         return JsonResponse(
             {"success": False, "message": "Empleado no encontrado."}
@@ -414,9 +495,9 @@ def api_mecanico_vehiculos(request):
         .order_by("-ot_id")
     )
 
-    html = render_to_string(
-        "partials/tabla_vehiculos_taller.html",
-        {"ots": ots},
+    html = fragmentos.fragmento(
+        "mecanico_vehiculos", empleado.rut, _deps_ots_mecanico(empleado.rut),
+        lambda: render_to_string("partials/tabla_vehiculos_taller.html", {"ots": ots}),
     )
 
     return JsonResponse({"success": True, "html": html})
@@ -429,6 +510,7 @@ def api_mecanico_vehiculos(request):
 @login_required
 @supervisor_only
 @require_GET
+@versiones.condicional(_versiones_supervisor_ots)
 def api_supervisor_vehiculos(request):
     supervisor = _get_supervisor(request)
 
@@ -451,9 +533,10 @@ def api_supervisor_vehiculos(request):
         .order_by("-fecha_ingreso", "-hora_ingreso")
     )
 
-    html = render_to_string(
-        "partials/tabla_vehiculos_taller.html",
-        {"ots": ots},
+    html = fragmentos.fragmento(
+        "supervisor_vehiculos", supervisor.recinto_id,
+        _deps_ots_recinto(supervisor.recinto_id),
+        lambda: render_to_string("partials/tabla_vehiculos_taller.html", {"ots": ots}),
     )
 
     return JsonResponse({"success": True, "html": html})
@@ -492,9 +575,10 @@ def api_supervisor_pendientes(request):
         .order_by("fecha_ingreso", "hora_ingreso")
     )
 
-    html = render_to_string(
-        "partials/tabla_asignacion_pendientes.html",
-        {"ots": ots},
+    html = fragmentos.fragmento(
+        "supervisor_pendientes", supervisor.recinto_id,
+        _deps_ots_recinto(supervisor.recinto_id),
+        lambda: render_to_string("partials/tabla_asignacion_pendientes.html", {"ots": ots}),
     )
 
     return JsonResponse({"success": True, "html": html})
@@ -507,6 +591,7 @@ def api_supervisor_pendientes(request):
 @login_required
 @supervisor_only
 @require_GET
+@versiones.condicional(_versiones_supervisor_solicitudes)
 def api_supervisor_solicitudes(request):
     """
     Devuelve las solicitudes de ingreso PENDIENTES
@@ -533,9 +618,12 @@ def api_supervisor_solicitudes(request):
         .order_by("fecha_solicitada", "creado_en")
     )
 
-    html = render_to_string(
-        "partials/tabla_solicitudes_ingreso.html",
-        {"solicitudes": solicitudes},
+    html = fragmentos.fragmento(
+        "supervisor_solicitudes", supervisor.recinto_id,
+        _deps_solicitudes_recinto(supervisor.recinto_id),
+        lambda: render_to_string(
+            "partials/tabla_solicitudes_ingreso.html", {"solicitudes": solicitudes},
+        ),
     )
 
     return JsonResponse({"success": True, "html": html})
@@ -620,76 +708,82 @@ def api_supervisor_aprobar_solicitud(request):
 
     vehiculo = solicitud.vehiculo
 
-    # Regla de negocio: no permitir OT activa para ese vehículo
-    ot_activa = _ot_activa_para_vehiculo(vehiculo)
-    if ot_activa:
-        logger.warning(
-            "Intento de aprobar solicitud con OT activa. Patente=%s OT=%s Supervisor=%s",
-            vehiculo.patente,
-            ot_activa.ot_id,
-            request.user.username,
-        )
-        return JsonResponse(
-            {
-                "success": False,
-                "message": f"Ya existe una OT activa #{ot_activa.ot_id} para {vehiculo.patente}.",
-            },
-            status=409,
-        )
-
-    # Evitar doble horario en mismo RECINTO
-    slot_ocupado = (
-        OrdenTrabajo.objects
-        .filter(
-            fecha_ingreso=fecha,
-            hora_ingreso=hora,
-            recinto_id=supervisor.recinto_id,
-            estado__in=ACTIVE_STATES,
-        )
-        .exists()
-    )
-    if slot_ocupado:
-        return JsonResponse(
-            {
-                "success": False,
-                "message": "El horario seleccionado ya está ocupado.",
-            },
-            status=409,
-        )
-
     # 🔹 nombre y cargo legible del supervisor
     display_nombre = supervisor.nombre or supervisor.usuario
-    if supervisor.cargo:
-        cargo_raw = supervisor.cargo.upper()
-        if cargo_raw == "SUPERVISOR":
-            cargo_label = "Supervisor"
-        elif cargo_raw == "MECANICO":
-            cargo_label = "Mecánico"
-        else:
-            cargo_label = supervisor.cargo.title()
-    else:
-        cargo_label = "Usuario"
-
-    autor_tag = f"[{cargo_label} {display_nombre}]"
+    autor_tag = f"[{cargo_legible(supervisor)} {display_nombre}]"
 
     # Armar descripción final incorporando AUTOR + MÓDULO/PASILLO
     descripcion_ot = f"{autor_tag} [{modulo}] {comentario}"
 
-    # Crear OT — ahora ligada al RECINTO del supervisor
-    ot = OrdenTrabajo.objects.create(
-        fecha_ingreso=fecha,
-        hora_ingreso=hora,
-        descripcion=descripcion_ot,
-        estado="Pendiente",
-        patente=vehiculo,
-        recinto_id=supervisor.recinto_id,
-        rut=mec,
-        rut_creador=supervisor,
-    )
+    # Todo o nada: si el horario está completo no queda OT ni solicitud aprobada
+    try:
+        with transaction.atomic():
+            # Serializa aprobaciones concurrentes del mismo vehículo
+            Vehiculo.objects.select_for_update().only("patente").get(pk=vehiculo.pk)
+
+            # Regla de negocio: no permitir OT activa para ese vehículo
+            # (aviso temprano; la garantía la da punteros.tomar más abajo)
+            ot_activa = _ot_activa_para_vehiculo(vehiculo)
+            if ot_activa:
+                logger.warning(
+                    "Intento de aprobar solicitud con OT activa. Patente=%s OT=%s Supervisor=%s",
+                    vehiculo.patente,
+                    ot_activa.ot_id,
+                    request.user.username,
+                )
+                return JsonResponse(
+                    {
+                        "success": False,
+                        "message": f"Ya existe una OT activa #{ot_activa.ot_id} para {vehiculo.patente}.",
+                    },
+                    status=409,
+                )
+
+            # Marcar solicitud como aprobada (solo si nadie la procesó antes)
+            aprobada = (
+                SolicitudIngresoVehiculo.objects
+                .filter(id=solicitud.id, estado="PENDIENTE")
+                .update(estado="APROBADA")
+            )
+            if not aprobada:
+                return JsonResponse(
+                    {"success": False, "message": "La solicitud ya fue procesada."},
+                    status=409,
+                )
+            solicitud.estado = "APROBADA"
+            # El UPDATE no dispara post_save
+            versiones.incrementar_despues(versiones.SOLICITUDES, supervisor.recinto_id)
+
+            # Cupo en el bloque de la agenda del taller de la solicitud
+            reserva = reservar(solicitud.taller, fecha, hora)
+
+            # Crear OT — ahora ligada al RECINTO del supervisor
+            ot = OrdenTrabajo.objects.create(
+                fecha_ingreso=fecha,
+                hora_ingreso=hora,
+                descripcion=descripcion_ot,
+                estado="Pendiente",
+                patente=vehiculo,
+                recinto_id=supervisor.recinto_id,
+                rut=mec,
+                rut_creador=supervisor,
+            )
+            asignar_ot(reserva, ot)
+            # Una sola OT activa por vehículo: lo resuelve el UPDATE condicional
+            punteros.tomar(ot)
+            registrar_evento(
+                ot, supervisor, f"[{modulo}] {comentario}",
+                hasta="Pendiente", nombre=supervisor.usuario,
+            )
+    except (SlotOcupado, punteros.OTActivaExistente) as e:
+        return JsonResponse(
+            {"success": False, "message": str(e)},
+            status=409,
+        )
 
-    # Marcar solicitud como aprobada
-    solicitud.estado = "APROBADA"
-    solicitud.save()
+    # Deltas al tablero en vivo: nueva OT + solicitud que sale de pendientes
+    publicar_ot(ot)
+    publicar_solicitud(solicitud, supervisor.recinto_id)
 
     return JsonResponse(
         {
@@ -5,3 +5,9 @@ from django.apps import AppConfig
 class OrdenestrabajoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ordenestrabajo'
+
+    def ready(self):
+        # Invalidación de la caché de la agenda, liberación de cupos,
+        # puntero a la OT actual de cada vehículo y versiones de los ETag
+        from . import agenda, punteros, reservas  # noqa: F401
+        from utils import versiones  # noqa: F401
@@ -0,0 +1,159 @@
+# ordenestrabajo/bitacora.py
+"""
+Bitácora de la OT sobre la tabla ot_eventos (solo inserciones).
+
+Antes cada comentario se concatenaba en ordenestrabajo.descripcion: había
+que leer y reescribir la columna completa en cada transición y, al llegar
+a los 2000 caracteres, la historia se truncaba sin aviso. Ahora cada cambio
+es un INSERT de tamaño fijo y `descripcion` conserva solo el texto con que
+se creó la OT.
+
+Lectura: `pagina_eventos` (keyset sobre ix_evento_ot) y `bitacoras`, que
+arma el texto "[Cargo Nombre] comentario" de varias OTs en una consulta,
+con el mismo formato que mostraba la ficha del vehículo.
+
+Los eventos sin `estado_desde` son el de creación de la OT o las líneas de
+la bitácora antigua importadas por backfill_eventos. Una OT que no tiene
+ninguno todavía guarda su historia previa solo en `descripcion`.
+"""
+import re
+
+from django.utils import timezone
+
+from autenticacion.models import Empleado
+
+from .models import OTEvento
+
+# Línea de la bitácora antigua: "[Cargo Nombre] comentario"
+_LINEA = re.compile(r"^\[(?P<etiqueta>[^\]]+)\]\s?(?P<comentario>.*)$")
+
+CARGOS_LEGIBLES = {"SUPERVISOR": "Supervisor", "MECANICO": "Mecánico"}
+
+
+def cargo_legible(empleado):
+    if empleado and empleado.cargo:
+        return CARGOS_LEGIBLES.get(empleado.cargo.upper(), empleado.cargo.title())
+    return "Usuario"
+
+
+def registrar_evento(ot, empleado=None, comentario="", desde=None, hasta=None, nombre=None):
+    """
+    Agrega un evento a la bitácora de la OT.
+    `nombre` se usa cuando no hay Empleado (p.ej. el username).
+    """
+    return OTEvento.objects.create(
+        ot_id=ot.ot_id,
+        autor=empleado,
+        autor_nombre=(empleado.nombre if empleado and empleado.nombre else nombre) or "",
+        cargo=cargo_legible(empleado),
+        estado_desde=desde,
+        estado_hasta=hasta,
+        comentario=comentario or "",
+        creado_en=timezone.now(),
+    )
+
+
+# ==========================================================
+# LECTURA
+# ==========================================================
+def serializar(evento):
+    return {
+        "id": evento.evento_id,
+        "fecha": timezone.localtime(evento.creado_en).isoformat() if evento.creado_en else None,
+        "autor": evento.autor_nombre,
+        "rut_autor": evento.autor_id,
+        "cargo": evento.cargo,
+        "estado_desde": evento.estado_desde,
+        "estado_hasta": evento.estado_hasta,
+        "comentario": evento.comentario,
+    }
+
+
+def pagina_eventos(ot_id, despues_de=None, limite=50):
+    """
+    Eventos de la OT en orden cronológico, de a `limite`.
+    Devuelve (items, next_cursor|None); el cursor es el último evento_id.
+    """
+    qs = OTEvento.objects.filter(ot_id=ot_id)
+    if despues_de is not None:
+        qs = qs.filter(evento_id__gt=despues_de)
+    eventos = list(qs.order_by("evento_id")[: limite + 1])
+
+    siguiente = None
+    if len(eventos) > limite:
+        eventos = eventos[:limite]
+        siguiente = eventos[-1].evento_id
+
+    return [serializar(e) for e in eventos], siguiente
+
+
+def linea(evento):
+    etiqueta = " ".join(x for x in (evento.cargo, evento.autor_nombre) if x)
+    return f"[{etiqueta}] {evento.comentario}" if etiqueta else evento.comentario
+
+
+def bitacoras(ots):
+    """
+    {ot_id: texto} de la bitácora de cada OT (una consulta de eventos).
+
+    Si la OT no tiene evento de creación ni bitácora importada (ningún
+    evento sin estado_desde), el texto parte con su `descripcion` y sigue
+    con los eventos, para no esconder la historia antigua.
+    """
+    ots = list(ots)
+    lineas, con_origen = {}, set()
+    eventos = (
+        OTEvento.objects
+        .filter(ot_id__in=[ot.ot_id for ot in ots])
+        .only("ot_id", "cargo", "autor_nombre", "comentario", "estado_desde")
+        # creado_en primero: la bitácora importada tarde queda antes de los
+        # eventos nuevos (tiene la fecha de ingreso de la OT)
+        .order_by("ot_id", "creado_en", "evento_id")
+    )
+    for e in eventos:
+        lineas.setdefault(e.ot_id, []).append(linea(e))
+        if e.estado_desde is None:
+            con_origen.add(e.ot_id)
+
+    textos = {}
+    for ot in ots:
+        partes = lineas.get(ot.ot_id, [])
+        if ot.ot_id not in con_origen and ot.descripcion:
+            partes = [ot.descripcion, *partes]
+        textos[ot.ot_id] = "\n".join(partes)
+    return textos
+
+
+# ==========================================================
+# BITÁCORA ANTIGUA (descripcion)
+# ==========================================================
+def parsear_bitacora(texto):
+    """
+    Separa el texto de `descripcion` en [(cargo, nombre, comentario)].
+
+    "[Mecánico Juan Pérez] cambio de aceite" -> ("Mecánico", "Juan Pérez", ...)
+    "[jperez] ok" (formato de registro_taller) -> ("", "jperez", "ok")
+    Las líneas sin etiqueta continúan el comentario anterior; si el texto
+    empieza sin etiqueta, esa parte queda como evento sin autor.
+    """
+    eventos = []
+    for raw in (texto or "").splitlines():
+        m = _LINEA.match(raw.strip())
+        if m:
+            etiqueta = m.group("etiqueta").strip()
+            cargo, _, nombre = etiqueta.partition(" ")
+            if not _es_cargo(cargo):
+                cargo, nombre = "", etiqueta
+            eventos.append([cargo, nombre.strip(), m.group("comentario").strip()])
+        elif raw.strip():
+            if eventos:
+                eventos[-1][2] = f"{eventos[-1][2]}\n{raw.strip()}".strip()
+            else:
+                eventos.append(["", "", raw.strip()])
+    return [tuple(e) for e in eventos]
+
+
+def _es_cargo(palabra):
+    if palabra in CARGOS_LEGIBLES.values() or palabra == "Usuario":
+        return True
+    return palabra.upper() in {c for c, _ in Empleado.CARGOS}
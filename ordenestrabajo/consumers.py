@@ -0,0 +1,49 @@
+# ordenestrabajo/consumers.py
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from autenticacion.models import Empleado
+from .tablero import grupo_recinto
+
+
+class TableroRecintoConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Tablero en vivo del recinto del usuario autenticado.
+
+    El recinto se toma del Empleado (no de la URL), así un usuario solo
+    recibe los cambios de su propio recinto. Los mensajes son deltas:
+      {"tipo": "ot", "ot_id", "patente", "estado", "estado_anterior", "rut_mecanico"}
+      {"tipo": "solicitud", "solicitud_id", "patente", "estado"}
+      {"tipo": "vehiculo", "patente", "estado"}
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated:
+            await self.close()
+            return
+
+        recinto_id = await self._recinto_de(user.username)
+        if not recinto_id:
+            await self.close()
+            return
+
+        self.group_name = grupo_recinto(recinto_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if getattr(self, "group_name", None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def tablero_evento(self, event):
+        await self.send_json(event["data"])
+
+    @database_sync_to_async
+    def _recinto_de(self, username):
+        return (
+            Empleado.objects
+            .filter(usuario=username)
+            .values_list("recinto_id", flat=True)
+            .first()
+        )
@@ -0,0 +1,205 @@
+# ordenestrabajo/estados.py
+"""
+Máquina de estados de la OT (única fuente de las transiciones válidas).
+
+`aplicar_transicion` cambia el estado con compare-and-swap dentro de una
+transacción:
+
+    UPDATE ordenestrabajo SET estado=?, ... WHERE ot_id=? AND estado=?
+    UPDATE vehiculos SET estado=? WHERE patente=?      (solo si cambia)
+    INSERT ot_eventos (...)
+
+Si otro usuario cambió la OT entre la lectura y el UPDATE, la condición
+`estado=?` no calza, no se escribe nada y se lanza TransicionConflicto con
+el estado actual: nunca se pisa un cambio ajeno. Solo se escriben las
+columnas que cambian (no se reescribe la fila completa con save()).
+
+Los UPDATE directos no disparan las señales de modelo, así que se emite
+`ot_estado_cambiado`; la conectan los KPIs (reportes.kpis), la caché de la
+agenda, la liberación de cupos y las versiones de los ETag (utils.versiones).
+El delta al tablero en vivo se publica acá.
+
+Dentro de la transacción (con el vehículo y la OT bloqueados) solo quedan
+los UPDATE, el puntero a la OT activa (ordenestrabajo.punteros) y el evento
+de bitácora, que deben confirmarse juntos. La señal se envía tras el
+COMMIT: sus receptores no alargan los bloqueos y un error en ellos se
+registra en el log sin deshacer el cambio de estado (los contadores se
+reparan con reconstruir_kpis).
+"""
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.dispatch import Signal
+
+from vehiculos.models import Vehiculo
+
+from . import originales
+from .bitacora import registrar_evento
+from .models import OrdenTrabajo
+from .tablero import publicar_ot
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_ACTIVOS = ["Pendiente", "Recibida", "En Taller", "En Proceso", "Pausado"]
+ESTADOS_TALLER = ["Recibida", "En Taller", "En Proceso", "Pausado"]
+# Cierran la OT: se registra fecha_salida
+ESTADOS_FINALES = ["Finalizado", "No Reparable", "Sin Repuestos"]
+
+TRANSICIONES = {
+    # Pendiente -> En Taller = RECIBIR; requiere el vehículo dentro del recinto
+    "Pendiente": ["En Taller"],
+    "Recibida": ["En Proceso", "Pausado"],
+    "En Taller": ["En Proceso", "Pausado"],
+    "En Proceso": ["Pausado", "Finalizado", "No Reparable", "Sin Repuestos"],
+    # Pausado NO puede ir directo a Finalizado
+    "Pausado": ["En Taller", "En Proceso", "No Reparable", "Sin Repuestos"],
+}
+
+# Enviada tras el COMMIT (fuera de los bloqueos) con:
+#   ot_id, recinto_id, fecha_ingreso, desde, hasta, abierta_antes, abierta_despues,
+#   patente, vehiculo_desde, vehiculo_hasta
+ot_estado_cambiado = Signal()
+
+
+class TransicionInvalida(ValueError):
+    """La transición no está permitida (matriz o regla de negocio)."""
+
+
+class TransicionConflicto(Exception):
+    """La OT cambió de estado mientras se procesaba la solicitud."""
+
+    def __init__(self, ot_id, esperado, actual):
+        self.ot_id, self.esperado, self.actual = ot_id, esperado, actual
+        super().__init__(
+            f"La OT #{ot_id} ya no está en {esperado} (estado actual: {actual or 'eliminada'}). "
+            "Recargue e intente nuevamente."
+        )
+
+
+def transiciones_desde(estado):
+    return TRANSICIONES.get(estado, [])
+
+
+def validar(desde, hasta):
+    if hasta not in transiciones_desde(desde):
+        raise TransicionInvalida(f"No se puede cambiar de {desde} a {hasta}")
+
+
+def estado_vehiculo(estado_ot):
+    """Estado que debe tener el vehículo cuando su OT pasa a `estado_ot`."""
+    if estado_ot in ESTADOS_TALLER:
+        return "En Taller"
+    return "Disponible"
+
+
+def _validar_reglas(desde, hasta, estado_veh):
+    if desde == "Pendiente" and hasta == "En Taller" and estado_veh not in ("En Recinto", "En Taller"):
+        raise TransicionInvalida(
+            "No se puede recibir el vehículo en taller porque aún no ha sido "
+            "ingresado al recinto por el guardia (estado del vehículo: "
+            f"{estado_veh})."
+        )
+
+
+def _notificar(datos):
+    for receptor, resultado in ot_estado_cambiado.send_robust(sender=OrdenTrabajo, **datos):
+        if isinstance(resultado, Exception):
+            logger.error(
+                "Falló %s tras la transición de la OT #%s (%s -> %s)",
+                getattr(receptor, "__qualname__", receptor), datos["ot_id"],
+                datos["desde"], datos["hasta"], exc_info=resultado,
+            )
+
+
+def aplicar_transicion(
+    ot, hasta, autor=None, comentario="", nombre=None,
+    validar_matriz=True, reglas=True, campos=None, campos_vehiculo=None,
+):
+    """
+    Lleva `ot` (instancia leída antes) de su estado actual a `hasta`.
+
+    - validar_matriz=False: omite TRANSICIONES (cierres administrativos).
+    - reglas=False: omite las reglas sobre el vehículo (flujos del supervisor).
+    - campos / campos_vehiculo: columnas extra a escribir en los mismos UPDATE.
+
+    Actualiza la instancia en memoria y devuelve el estado anterior.
+    Lanza TransicionInvalida o TransicionConflicto sin escribir nada.
+    """
+    desde = ot.estado
+    if validar_matriz:
+        validar(desde, hasta)
+
+    cambios = dict(campos or {}, estado=hasta)
+    if hasta in ESTADOS_FINALES:
+        cambios["fecha_salida"] = date.today()
+    abierta_antes = ot.fecha_salida is None
+    abierta_despues = cambios.get("fecha_salida", ot.fecha_salida) is None
+
+    with transaction.atomic():
+        # Primero la escritura condicional: el que pierde sale sin tomar más
+        # bloqueos, y la transacción parte escribiendo (en SQLite, una que
+        # parte leyendo no puede pasar a escribir si otra ya escribe).
+        actualizadas = (
+            OrdenTrabajo.objects
+            .filter(ot_id=ot.ot_id, estado=desde)
+            .update(**cambios)
+        )
+        if not actualizadas:
+            actual = (
+                OrdenTrabajo.objects.filter(ot_id=ot.ot_id)
+                .values_list("estado", flat=True).first()
+            )
+            raise TransicionConflicto(ot.ot_id, desde, actual)
+
+        # Bloquea el vehículo: serializa con otros cambios sobre la misma patente.
+        # Si la regla no se cumple, el rollback deshace el UPDATE anterior.
+        veh_desde = (
+            Vehiculo.objects.select_for_update()
+            .filter(patente=ot.patente_id)
+            .values_list("estado", flat=True)
+            .first()
+        )
+        if reglas:
+            _validar_reglas(desde, hasta, veh_desde)
+
+        veh_hasta = estado_vehiculo(hasta)
+        cambios_veh = dict(campos_vehiculo or {})
+        if veh_hasta != veh_desde:
+            cambios_veh["estado"] = veh_hasta
+        if cambios_veh:
+            Vehiculo.objects.filter(patente=ot.patente_id).update(**cambios_veh)
+
+        # El puntero se confirma junto con el estado: si quedara apuntando a
+        # una OT cerrada, punteros.tomar rechazaría la próxima OT del vehículo.
+        if hasta not in ESTADOS_ACTIVOS:
+            from . import punteros  # punteros importa este módulo
+
+            punteros.soltar(ot.ot_id, ot.patente_id)
+
+        for campo, valor in cambios.items():
+            setattr(ot, campo, valor)
+        # Nuevos originales (KPIs, agenda, versiones): un save() posterior
+        # no debe aplicar dos veces el mismo cambio
+        originales.refrescar(ot)
+
+        registrar_evento(ot, autor, comentario, desde=desde, hasta=hasta, nombre=nombre)
+
+        datos = dict(
+            ot_id=ot.ot_id,
+            recinto_id=ot.recinto_id,
+            fecha_ingreso=ot.fecha_ingreso,
+            desde=desde,
+            hasta=hasta,
+            abierta_antes=abierta_antes,
+            abierta_despues=abierta_despues,
+            patente=ot.patente_id,
+            rut=ot.rut_id,
+            vehiculo_desde=veh_desde,
+            vehiculo_hasta=veh_hasta,
+        )
+        transaction.on_commit(lambda: _notificar(datos))
+
+        publicar_ot(ot, desde)
+
+    return desde
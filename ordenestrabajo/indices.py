@@ -0,0 +1,310 @@
+# ordenestrabajo/indices.py
+"""
+Plan de índices para las tablas no administradas por Django (managed=False).
+
+Como `ordenestrabajo`, `control_acceso`, `solicitudes_ingreso_vehiculo` y
+`documentos` vienen de la BD, Django nunca crea índices para ellas. Este
+módulo declara el plan revisado (qué índice cubre qué consulta) y las
+consultas canónicas que deben aprovecharlo. Lo usa
+`manage.py plan_indices` para emitir/aplicar el DDL y correr EXPLAIN.
+
+Las columnas se declaran por NOMBRE DE CAMPO del modelo y se traducen a su
+`db_column`, así el plan sigue siendo válido si cambia el mapeo.
+"""
+import json
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import Count
+
+# modelo: "app_label.Modelo" | nombre: nombre físico del índice
+# campos: campos del modelo, en el orden de la clave | uso: consultas que cubre
+Indice = namedtuple("Indice", "modelo nombre campos uso")
+
+PLAN_INDICES = [
+    # --- ordenestrabajo ---------------------------------------------------
+    Indice(
+        "ordenestrabajo.OrdenTrabajo", "ix_ot_patente_estado",
+        ("patente", "estado", "fecha_ingreso", "hora_ingreso"),
+        "reparar_punteros_ot y alta del puntero (OTs activas de una patente)",
+    ),
+    Indice(
+        "ordenestrabajo.OrdenTrabajo", "ix_ot_recinto_estado",
+        ("recinto", "estado", "fecha_ingreso", "hora_ingreso"),
+        "api_supervisor_vehiculos (OTs activas del recinto)",
+    ),
+    Indice(
+        "ordenestrabajo.OrdenTrabajo", "ix_ot_agenda",
+        ("fecha_ingreso", "recinto", "hora_ingreso", "estado"),
+        "agenda (matriz por rango), choque de horario al crear OT, reportes por rango",
+    ),
+    # --- control_acceso ---------------------------------------------------
+    Indice(
+        "ordenestrabajo.ControlAcceso", "ix_ca_patente_abierto",
+        ("vehiculo", "fecha_salida", "fecha_ingreso"),
+        "control_acceso_guardia (control abierto del vehículo)",
+    ),
+    # --- solicitudes_ingreso_vehiculo ------------------------------------
+    Indice(
+        "ordenestrabajo.SolicitudIngresoVehiculo", "ix_sol_taller_estado",
+        ("taller", "estado", "fecha_solicitada"),
+        "api_supervisor_solicitudes (pendientes por taller/recinto)",
+    ),
+    Indice(
+        "ordenestrabajo.SolicitudIngresoVehiculo", "ix_sol_vehiculo_estado",
+        ("vehiculo", "estado", "fecha_solicitada"),
+        "control_acceso_guardia, solicitud pendiente del chofer",
+    ),
+    # --- documentos -------------------------------------------------------
+    Indice(
+        "documentos.Documento", "ix_doc_ot_creado",
+        ("ot", "creado_en"),
+        "documentos de una OT (ficha, api_documentos_list)",
+    ),
+    Indice(
+        "documentos.Documento", "ix_doc_patente_ot",
+        ("patente", "ot", "creado_en"),
+        "documentos del vehículo sin OT",
+    ),
+    Indice(
+        "documentos.Documento", "ix_doc_archivo",
+        ("archivo",),
+        "servir_media (documentos de un archivo), gc_blobs",
+    ),
+]
+
+
+# ==========================================================
+# DDL
+# ==========================================================
+def tabla_y_columnas(indice):
+    """(tabla, [columnas]) físicas de un índice del plan."""
+    modelo = apps.get_model(indice.modelo)
+    columnas = [modelo._meta.get_field(c).column for c in indice.campos]
+    return modelo._meta.db_table, columnas
+
+
+def sql_crear(indice):
+    """CREATE INDEX para el motor actual (online en MySQL/InnoDB)."""
+    qn = connection.ops.quote_name
+    tabla, columnas = tabla_y_columnas(indice)
+    sql = "CREATE INDEX {} ON {} ({})".format(
+        qn(indice.nombre), qn(tabla), ", ".join(qn(c) for c in columnas)
+    )
+    if connection.vendor == "mysql":
+        # InnoDB crea índices secundarios sin bloquear escrituras
+        sql += " ALGORITHM=INPLACE LOCK=NONE"
+    return sql
+
+
+def indices_existentes(cursor, tabla):
+    """{nombre: [columnas]} de los índices ya presentes en la tabla."""
+    restricciones = connection.introspection.get_constraints(cursor, tabla)
+    return {
+        nombre: list(info["columns"])
+        for nombre, info in restricciones.items()
+        if info.get("index") or info.get("unique") or info.get("primary_key")
+    }
+
+
+def estado_indice(indice, existentes):
+    """
+    Devuelve (estado, detalle):
+      - "EXISTE"    : ya hay un índice con ese nombre.
+      - "CUBIERTO"  : otro índice tiene como prefijo exactamente estas columnas.
+      - "FALTA"     : hay que crearlo.
+    """
+    _, columnas = tabla_y_columnas(indice)
+    if indice.nombre in existentes:
+        return "EXISTE", indice.nombre
+    for nombre, cols in existentes.items():
+        if cols[: len(columnas)] == columnas:
+            return "CUBIERTO", nombre
+    return "FALTA", ""
+
+
+# ==========================================================
+# CONSULTAS CANÓNICAS (EXPLAIN)
+# ==========================================================
+def _muestra():
+    """
+    Valores reales para parametrizar las consultas (la OT más reciente).
+    Con la tabla vacía se usan valores neutros: el plan igual es válido.
+    """
+    OrdenTrabajo = apps.get_model("ordenestrabajo", "OrdenTrabajo")
+    ot = (
+        OrdenTrabajo.objects
+        .order_by("-ot_id")
+        .values("patente_id", "recinto_id", "fecha_ingreso", "ot_id")
+        .first()
+    ) or {}
+
+    Taller = apps.get_model("talleres", "Taller")
+    taller_id = (
+        Taller.objects.filter(recinto_id=ot.get("recinto_id"))
+        .values_list("taller_id", flat=True).first()
+        if ot else None
+    )
+
+    return {
+        "patente": ot.get("patente_id") or "ZZZZ99",
+        "recinto_id": ot.get("recinto_id") or 0,
+        "fecha": ot.get("fecha_ingreso") or date.today(),
+        "ot_id": ot.get("ot_id") or 0,
+        "taller_id": taller_id or 0,
+    }
+
+
+def consultas_canonicas():
+    """
+    Lista de (nombre, queryset, tabla, índices_aceptados) con las consultas
+    calientes del sistema, armadas igual que en las vistas. Cuando dos
+    índices del plan sirven igual de bien, ambos se aceptan.
+    """
+    from .api_views import ACTIVE_STATES
+
+    OrdenTrabajo = apps.get_model("ordenestrabajo", "OrdenTrabajo")
+    ControlAcceso = apps.get_model("ordenestrabajo", "ControlAcceso")
+    Solicitud = apps.get_model("ordenestrabajo", "SolicitudIngresoVehiculo")
+    Documento = apps.get_model("documentos", "Documento")
+
+    m = _muestra()
+
+    return [
+        (
+            "ot_activa (puntero)",
+            OrdenTrabajo.objects.filter(puntero_activo__vehiculo_id=m["patente"])[:1],
+            "ordenestrabajo", ("PRIMARY",),
+        ),
+        (
+            "agenda.ocupacion",
+            OrdenTrabajo.objects
+            .filter(recinto_id=m["recinto_id"], fecha_ingreso__gte=m["fecha"],
+                    fecha_ingreso__lte=m["fecha"] + timedelta(days=6),
+                    estado__in=ACTIVE_STATES, hora_ingreso__isnull=False)
+            .order_by()
+            .values("fecha_ingreso", "hora_ingreso")
+            .annotate(n=Count("ot_id")),
+            "ordenestrabajo", ("ix_ot_agenda", "ix_ot_recinto_estado"),
+        ),
+        (
+            "api_supervisor_vehiculos",
+            OrdenTrabajo.objects
+            .filter(recinto_id=m["recinto_id"], estado__in=ACTIVE_STATES)
+            .order_by("-fecha_ingreso", "-hora_ingreso"),
+            "ordenestrabajo", ("ix_ot_recinto_estado",),
+        ),
+        (
+            "alta_puntero",
+            OrdenTrabajo.objects
+            .filter(patente_id=m["patente"], estado__in=ACTIVE_STATES)
+            .order_by("-fecha_ingreso", "-hora_ingreso", "-ot_id")[:1],
+            "ordenestrabajo", ("ix_ot_patente_estado",),
+        ),
+        (
+            "control_abierto",
+            ControlAcceso.objects
+            .filter(vehiculo_id=m["patente"], fecha_salida__isnull=True)
+            .order_by("-fecha_ingreso", "-control_id")[:1],
+            "control_acceso", ("ix_ca_patente_abierto",),
+        ),
+        (
+            "solicitudes_pendientes",
+            Solicitud.objects
+            .filter(taller_id=m["taller_id"], estado="PENDIENTE")
+            .order_by("fecha_solicitada"),
+            "solicitudes_ingreso_vehiculo", ("ix_sol_taller_estado",),
+        ),
+        (
+            "solicitud_vehiculo",
+            Solicitud.objects
+            .filter(vehiculo_id=m["patente"], estado__in=["PENDIENTE", "APROBADA"])
+            .order_by("-fecha_solicitada")[:1],
+            "solicitudes_ingreso_vehiculo", ("ix_sol_vehiculo_estado",),
+        ),
+        (
+            "documentos_ot",
+            Documento.objects.filter(ot_id=m["ot_id"]).order_by("-creado_en"),
+            "documentos", ("ix_doc_ot_creado",),
+        ),
+        (
+            "documentos_vehiculo",
+            Documento.objects
+            .filter(patente_id=m["patente"], ot_id__isnull=True)
+            .order_by("-creado_en"),
+            "documentos", ("ix_doc_patente_ot",),
+        ),
+        (
+            "media_documento",
+            Documento.objects.filter(archivo="blobs/00/00/muestra.jpg"),
+            "documentos", ("ix_doc_archivo",),
+        ),
+    ]
+
+
+def _accesos_mysql(plan):
+    """Recorre el EXPLAIN FORMAT=JSON de MySQL -> [(tabla, índice|None)]."""
+    accesos = []
+
+    def visitar(nodo):
+        if isinstance(nodo, dict):
+            if "table_name" in nodo:
+                clave = nodo.get("key")
+                if nodo.get("access_type") == "ALL":
+                    clave = None
+                accesos.append((nodo["table_name"], clave))
+            for valor in nodo.values():
+                visitar(valor)
+        elif isinstance(nodo, list):
+            for valor in nodo:
+                visitar(valor)
+
+    visitar(json.loads(plan))
+    return accesos
+
+
+_RE_SQLITE = re.compile(
+    r"(SCAN|SEARCH) (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?"
+)
+
+
+def _accesos_sqlite(plan):
+    """Líneas SCAN/SEARCH de EXPLAIN QUERY PLAN -> [(tabla, índice|None)]."""
+    accesos = []
+    for tipo, tabla, indice in _RE_SQLITE.findall(plan):
+        if not indice and tipo == "SEARCH":
+            indice = "PRIMARY"  # SEARCH ... USING INTEGER PRIMARY KEY
+        accesos.append((tabla, indice or None))
+    return accesos
+
+
+def explicar(queryset, tabla, aceptados):
+    """
+    Ejecuta EXPLAIN y clasifica el acceso a `tabla`:
+      - "OK"      : usa uno de los índices aceptados.
+      - "OTRO"    : usa otro índice (válido, pero conviene revisar).
+      - "SCAN"    : recorre la tabla completa.
+      - "?"       : el motor no reportó acceso a la tabla (p.ej. WHERE imposible).
+    Devuelve (estado, índice_usado, texto_del_plan).
+    """
+    if connection.vendor == "mysql":
+        plan = queryset.explain(format="JSON")
+        accesos = _accesos_mysql(plan)
+    elif connection.vendor == "sqlite":
+        plan = queryset.explain()
+        accesos = _accesos_sqlite(plan)
+    else:
+        plan = queryset.explain()
+        return ("OK" if any(i in plan for i in aceptados) else "?"), None, plan
+
+    for nombre_tabla, indice in accesos:
+        if nombre_tabla != tabla:
+            continue
+        if indice is None:
+            return "SCAN", None, plan
+        return ("OK" if indice in aceptados else "OTRO"), indice, plan
+
+    return "?", None, plan
@@ -0,0 +1,102 @@
+# ordenestrabajo/management/commands/backfill_eventos.py
+"""
+Crea la tabla ot_eventos (si falta) y carga en ella la bitácora antigua.
+
+Uso:
+    python manage.py backfill_eventos              # crea tabla + carga
+    python manage.py backfill_eventos --solo-tabla # solo CREATE TABLE
+    python manage.py backfill_eventos --dry-run    # informa sin escribir
+
+Cada línea "[Cargo Nombre] comentario" de ordenestrabajo.descripcion pasa a
+ser un evento (sin estado desde/hasta, que la bitácora antigua no guardaba).
+El autor se vincula al Empleado cuyo nombre o usuario coincide. La fecha del
+evento es la de ingreso de la OT.
+
+Solo procesa OTs sin eventos con estado_desde NULL (el de creación de la
+OT o las líneas ya importadas), así que se puede repetir, y también importa
+las OTs antiguas que ya recibieron transiciones nuevas. Hasta que se corra,
+la ficha muestra `descripcion` antes de los eventos de esas OTs.
+`descripcion` no se modifica.
+"""
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from autenticacion.models import Empleado
+from ordenestrabajo.bitacora import parsear_bitacora
+from ordenestrabajo.models import OrdenTrabajo, OTEvento
+
+
+class Command(BaseCommand):
+    help = "Migra la bitácora de ordenestrabajo.descripcion a la tabla ot_eventos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--solo-tabla", action="store_true",
+                            help="Solo crea la tabla si no existe.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Muestra lo que haría sin escribir.")
+        parser.add_argument("--lote", type=int, default=500,
+                            help="OTs por transacción (default 500).")
+
+    def handle(self, *args, **options):
+        dry = options["dry_run"]
+        tabla = OTEvento._meta.db_table
+
+        if tabla not in connection.introspection.table_names():
+            if dry:
+                self.stdout.write(f"Falta la tabla {tabla}.")
+                return
+            with connection.schema_editor() as editor:
+                editor.create_model(OTEvento)
+            self.stdout.write(self.style.SUCCESS(f"Tabla {tabla} creada."))
+
+        if options["solo_tabla"]:
+            return
+
+        # nombre / usuario -> rut (una consulta)
+        ruts = {}
+        for rut, nombre, usuario in Empleado.objects.values_list("rut", "nombre", "usuario"):
+            for clave in (nombre, usuario):
+                if clave:
+                    ruts.setdefault(clave.strip().lower(), rut)
+
+        ots = (
+            OrdenTrabajo.objects
+            .exclude(descripcion__isnull=True)
+            .exclude(descripcion="")
+            # Sin evento de creación ni bitácora importada; las transiciones no cuentan
+            .exclude(ot_id__in=OTEvento.objects.filter(estado_desde__isnull=True).values("ot_id"))
+            .order_by("ot_id")
+            .values_list("ot_id", "fecha_ingreso", "hora_ingreso", "descripcion")
+        )
+
+        lote, n_ots, n_eventos = [], 0, 0
+        for ot_id, fecha, hora, descripcion in ots.iterator(chunk_size=options["lote"]):
+            creado_en = timezone.make_aware(datetime.combine(fecha, hora or time(0, 0)))
+            for cargo, nombre, comentario in parsear_bitacora(descripcion):
+                lote.append(OTEvento(
+                    ot_id=ot_id,
+                    autor_id=ruts.get(nombre.lower()),
+                    autor_nombre=nombre,
+                    cargo=cargo,
+                    comentario=comentario,
+                    creado_en=creado_en,
+                ))
+            n_ots += 1
+            if n_ots % options["lote"] == 0:
+                n_eventos += self._guardar(lote, dry)
+                lote = []
+        n_eventos += self._guardar(lote, dry)
+
+        prefijo = "[dry-run] " if dry else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}{n_ots} OTs procesadas, {n_eventos} eventos cargados."
+        ))
+
+    def _guardar(self, eventos, dry):
+        if eventos and not dry:
+            with transaction.atomic():
+                OTEvento.objects.bulk_create(eventos, batch_size=1000)
+        return len(eventos)
@@ -0,0 +1,293 @@
+# ordenestrabajo/management/commands/bench_endpoints.py
+"""
+Benchmark reproducible de los endpoints más usados, para comparar commits.
+
+Uso:
+    python manage.py bench_endpoints
+    python manage.py bench_endpoints --repeticiones 50 --salida antes.json
+    python manage.py bench_endpoints --sin-cache --comparar antes.json
+    python manage.py bench_endpoints --endpoint api_ficha --endpoint api_ots
+
+Pensado para correr sobre la base de `generar_flota` (mismos datos con la
+misma semilla). Hace los requests en proceso con el Client de Django, así
+que pasan por todos los middlewares, decoradores de rol y plantillas, pero
+no por la red ni por un servidor:
+
+  - api_ficha               supervisor, vehículo con OT activa
+  - api_ots                 supervisor, rango por defecto (30 días)
+  - api_resumen_talleres    supervisor
+  - api_agenda_slots        supervisor, primer taller del recinto, hoy
+  - control_acceso_guardia  guardia, búsqueda por la misma patente
+
+Por endpoint: calentamiento sin medir, luego --repeticiones requests con
+mínimo, p50, p95, máximo y promedio en ms y las consultas SQL del último
+request. Por defecto la caché queda como en producción (fragmentos y
+agenda calientes); --sin-cache la vacía antes de cada request.
+
+El resultado se guarda en JSON con el commit (git rev-parse HEAD), la base
+y la cantidad de datos; --comparar muestra la diferencia de p50/p95 contra
+un JSON anterior. Termina con error si algún endpoint no responde 200.
+
+Como generar_flota, solo corre contra SQLite o MySQL en localhost (salvo
+--forzar): crea los User de los empleados que usa.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from autenticacion.models import Empleado, sincronizar_grupo
+from ordenestrabajo.models import OrdenTrabajo, VehiculoOTActual
+from talleres.models import Taller
+from utils.base_local import verificar_base_local
+from vehiculos.models import Vehiculo
+
+ENDPOINTS = (
+    "api_ficha",
+    "api_ots",
+    "api_resumen_talleres",
+    "api_agenda_slots",
+    "control_acceso_guardia",
+)
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, round(p / 100 * len(valores) + 0.5) - 1))
+    return valores[indice]
+
+
+def commit_actual():
+    """(hash, hay_cambios_sin_commit) o (None, None) si no hay git."""
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        cambios = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return sha, bool(cambios)
+
+
+class Command(BaseCommand):
+    help = "Mide los endpoints principales y guarda los tiempos en JSON para comparar entre commits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=30,
+                            help="Requests medidos por endpoint (default 30).")
+        parser.add_argument("--calentamiento", type=int, default=3,
+                            help="Requests previos sin medir (default 3).")
+        parser.add_argument("--endpoint", action="append", choices=ENDPOINTS,
+                            help="Solo este endpoint (se puede repetir).")
+        parser.add_argument("--sin-cache", action="store_true",
+                            help="Vacía la caché antes de cada request.")
+        parser.add_argument("--supervisor",
+                            help="Usuario del supervisor (default: el primero con OTs activas).")
+        parser.add_argument("--guardia",
+                            help="Usuario del guardia (default: uno del recinto del supervisor).")
+        parser.add_argument("--salida",
+                            help="Archivo JSON de resultados (default bench_endpoints_<commit>.json).")
+        parser.add_argument("--comparar",
+                            help="JSON de una corrida anterior para mostrar la diferencia.")
+        parser.add_argument("--forzar", action="store_true",
+                            help="Permite una base MySQL que no está en localhost.")
+
+    def handle(self, *args, **options):
+        repeticiones = max(1, options["repeticiones"])
+        calentamiento = max(0, options["calentamiento"])
+        sin_cache = options["sin_cache"]
+        nombres = options["endpoint"] or list(ENDPOINTS)
+
+        # _cliente() crea o sincroniza User: solo contra una base local
+        verificar_base_local(options["forzar"])
+        supervisor, guardia = self._actores(options["supervisor"], options["guardia"])
+        casos = self._casos(supervisor, guardia)
+
+        sha, modificado = commit_actual()
+        self.stdout.write(
+            f"{connection.vendor} · {Vehiculo.objects.count():,} vehículos · "
+            f"{OrdenTrabajo.objects.count():,} OTs · commit {sha[:10] if sha else '?'}"
+            f"{' (con cambios)' if modificado else ''}"
+        )
+
+        resultados = {}
+        fallas = []
+        for nombre in nombres:
+            cliente, url = casos[nombre]
+            r = self._medir(cliente, url, repeticiones, calentamiento, sin_cache)
+            resultados[nombre] = r
+            if r["estado"] != 200:
+                fallas.append(f"{nombre}: HTTP {r['estado']}")
+            self.stdout.write(
+                f"  {nombre:<24} p50={r['p50_ms']:8.2f} p95={r['p95_ms']:8.2f} "
+                f"max={r['max_ms']:8.2f} ms  consultas={r['consultas']:<3} [{r['estado']}]"
+            )
+
+        informe = {
+            "fecha": timezone.now().isoformat(timespec="seconds"),
+            "commit": sha,
+            "cambios_sin_commit": modificado,
+            "base": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "datos": {
+                "vehiculos": Vehiculo.objects.count(),
+                "ots": OrdenTrabajo.objects.count(),
+            },
+            "repeticiones": repeticiones,
+            "calentamiento": calentamiento,
+            "sin_cache": sin_cache,
+            "endpoints": {nombre: {"url": casos[nombre][1]} for nombre in nombres},
+            "resultados": resultados,
+        }
+        salida = options["salida"] or f"bench_endpoints_{(sha or 'sin_git')[:10]}.json"
+        with open(salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        self.stdout.write(f"Resultados en {salida}")
+
+        if options["comparar"]:
+            self._comparar(options["comparar"], informe)
+
+        if fallas:
+            raise CommandError("Endpoints con error: " + "; ".join(fallas))
+        self.stdout.write(self.style.SUCCESS("Benchmark completo."))
+
+    # ------------------------------------------------------
+    # Preparación
+    # ------------------------------------------------------
+    @staticmethod
+    def _actores(usuario_supervisor, usuario_guardia):
+        supervisores = Empleado.objects.filter(cargo="SUPERVISOR", is_active=True)
+        if usuario_supervisor:
+            supervisor = supervisores.filter(usuario=usuario_supervisor).first()
+        else:
+            recintos_activos = VehiculoOTActual.objects.filter(
+                ot_activa__isnull=False,
+            ).values("ot_activa__recinto_id")
+            supervisor = (
+                supervisores.filter(recinto_id__in=recintos_activos).order_by("rut").first()
+                or supervisores.order_by("rut").first()
+            )
+        if not supervisor:
+            raise CommandError("No hay un supervisor activo (¿se corrió generar_flota?).")
+
+        guardias = Empleado.objects.filter(cargo="GUARDIA", is_active=True)
+        if usuario_guardia:
+            guardia = guardias.filter(usuario=usuario_guardia).first()
+        else:
+            guardia = guardias.filter(recinto_id=supervisor.recinto_id).order_by("rut").first()
+        if not guardia:
+            raise CommandError("No hay un guardia activo en el recinto del supervisor.")
+        return supervisor, guardia
+
+    @staticmethod
+    def _cliente(empleado):
+        """Client con sesión del User vinculado al empleado (se crea si falta)."""
+        user, _ = User.objects.get_or_create(username=empleado.usuario)
+        sincronizar_grupo(empleado, user)
+        cliente = Client()
+        cliente.force_login(user)
+        return cliente
+
+    def _casos(self, supervisor, guardia):
+        recinto_id = supervisor.recinto_id
+        puntero = (
+            VehiculoOTActual.objects
+            .filter(ot_activa__recinto_id=recinto_id)
+            .order_by("vehiculo_id")
+            .first()
+        )
+        patente = puntero.vehiculo_id if puntero else (
+            OrdenTrabajo.objects.filter(recinto_id=recinto_id)
+            .order_by("patente_id").values_list("patente_id", flat=True).first()
+        )
+        taller = Taller.objects.filter(recinto_id=recinto_id).order_by("taller_id").first()
+        if not patente or not taller:
+            raise CommandError("El recinto del supervisor no tiene OTs o talleres.")
+
+        sup = self._cliente(supervisor)
+        gua = self._cliente(guardia)
+        hoy = date.today().isoformat()
+        return {
+            "api_ficha": (sup, f"{reverse('vehiculos:api_ficha')}?patente={patente}"),
+            "api_ots": (sup, reverse("reportes:api_ots")),
+            "api_resumen_talleres": (sup, reverse("reportes:api_resumen_talleres")),
+            "api_agenda_slots": (
+                sup, f"{reverse('ordenestrabajo:api_agenda_slots')}?fecha={hoy}&taller_id={taller.taller_id}",
+            ),
+            "control_acceso_guardia": (gua, f"{reverse('control-acceso')}?patente={patente}"),
+        }
+
+    # ------------------------------------------------------
+    # Medición
+    # ------------------------------------------------------
+    @staticmethod
+    def _medir(cliente, url, repeticiones, calentamiento, sin_cache):
+        for _ in range(calentamiento):
+            if sin_cache:
+                cache.clear()
+            cliente.get(url)
+
+        tiempos = []
+        estado = consultas = None
+        for _ in range(repeticiones):
+            if sin_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                response = cliente.get(url)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            estado = response.status_code
+            consultas = len(ctx.captured_queries)
+
+        tiempos.sort()
+        return {
+            "estado": estado,
+            "consultas": consultas,
+            "min_ms": round(tiempos[0], 3),
+            "p50_ms": round(percentil(tiempos, 50), 3),
+            "p95_ms": round(percentil(tiempos, 95), 3),
+            "max_ms": round(tiempos[-1], 3),
+            "promedio_ms": round(statistics.fmean(tiempos), 3),
+        }
+
+    def _comparar(self, ruta, actual):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                anterior = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer {ruta}: {e}")
+
+        commit = (anterior.get("commit") or "?")[:10]
+        self.stdout.write(f"Comparación contra {ruta} (commit {commit}):")
+        for nombre, r in actual["resultados"].items():
+            previo = anterior.get("resultados", {}).get(nombre)
+            if not previo:
+                self.stdout.write(f"  {nombre:<24} sin datos anteriores")
+                continue
+            partes = []
+            for clave in ("p50_ms", "p95_ms"):
+                antes, ahora = previo[clave], r[clave]
+                delta = (ahora - antes) / antes * 100 if antes else 0.0
+                partes.append(f"{clave[:3]} {antes:8.2f} -> {ahora:8.2f} ms ({delta:+6.1f}%)")
+            partes.append(f"consultas {previo['consultas']} -> {r['consultas']}")
+            self.stdout.write(f"  {nombre:<24} " + "  ".join(partes))
@@ -0,0 +1,146 @@
+# ordenestrabajo/management/commands/bench_reservas.py
+"""
+Prueba de estrés concurrente de la reserva de cupos (ordenestrabajo/reservas.py).
+
+Uso:
+    python manage.py bench_reservas
+    python manage.py bench_reservas --hilos 64 --intentos 5000 --slots 10
+    python manage.py bench_reservas --taller 2 --fecha 2099-06-01
+
+Lanza N hilos (cada uno con su propia conexión a la BD) que intentan reservar
+al mismo tiempo unos pocos bloques de la agenda de un taller en una fecha de
+prueba, con horas repartidas dentro de cada bloque. Al final verifica
+en la BD que ningún bloque tenga más reservas que cupos (agenda.cupos) ni un
+andén repetido, y que cada reserva exitosa exista. Termina con error si
+encuentra una doble reserva. Las filas de prueba se borran al terminar.
+
+Escribe en la base configurada: solo corre contra SQLite o MySQL en
+localhost (salvo --forzar).
+"""
+import threading
+import time
+from collections import Counter
+from datetime import date, time as dtime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Count
+
+from ordenestrabajo import agenda
+from ordenestrabajo.models import ReservaSlot
+from ordenestrabajo.reservas import SlotOcupado, reservar
+from talleres.models import Taller
+from utils.base_local import verificar_base_local
+
+
+class Command(BaseCommand):
+    help = "Estrés concurrente de reservas de horario: verifica que no haya dobles reservas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=32,
+                            help="Hilos concurrentes (default 32).")
+        parser.add_argument("--intentos", type=int, default=2000,
+                            help="Intentos de reserva en total (default 2000).")
+        parser.add_argument("--slots", type=int, default=5,
+                            help="Bloques distintos en disputa (default 5).")
+        parser.add_argument("--taller", type=int, default=None,
+                            help="taller_id (default: el primero).")
+        parser.add_argument("--fecha", default="2099-01-01",
+                            help="Fecha de prueba, sin OTs reales (default 2099-01-01).")
+        parser.add_argument("--forzar", action="store_true",
+                            help="Permite una base MySQL que no está en localhost.")
+
+    def handle(self, *args, **options):
+        verificar_base_local(options["forzar"])
+        taller = Taller.objects.select_related("recinto").order_by("taller_id")
+        if options["taller"]:
+            taller = taller.filter(taller_id=options["taller"])
+        taller = taller.first()
+        if not taller:
+            raise CommandError("No hay taller para la prueba.")
+        recinto = taller.recinto
+
+        fecha = date.fromisoformat(options["fecha"])
+        prueba = ReservaSlot.objects.filter(recinto_id=recinto.recinto_id, fecha=fecha)
+        if prueba.filter(ot__isnull=False).exists():
+            raise CommandError(f"La fecha {fecha} tiene reservas reales; use otra con --fecha.")
+        prueba.delete()
+
+        cupos = agenda.cupos(taller)
+        paso = max(int(agenda.configuracion(taller.taller_id)["slot_min"]), 1)
+        bloques = agenda.grilla(taller.taller_id)[: max(1, options["slots"])]
+        if not bloques:
+            raise CommandError(f"El taller {taller.taller_id} no tiene bloques en su agenda.")
+        hilos = max(1, options["hilos"])
+        intentos = max(1, options["intentos"])
+
+        def hora(n):
+            # Distintos minutos dentro del mismo bloque: todos reservan su inicio
+            minuto = bloques[n % len(bloques)] + (n // len(bloques)) % paso
+            return dtime(minuto // 60, minuto % 60)
+
+        self.stdout.write(
+            f"Taller {taller.taller_id}, recinto {recinto.recinto_id} ({recinto.nombre}): "
+            f"{cupos} cupo(s) por bloque de {paso} min, {len(bloques)} bloque(s), "
+            f"{hilos} hilos, {intentos} intentos"
+        )
+
+        resultado = Counter()
+        bloqueo = threading.Lock()
+        inicio_comun = threading.Barrier(hilos)
+
+        def trabajador(indice):
+            local = Counter()
+            try:
+                inicio_comun.wait()
+                for n in range(indice, intentos, hilos):
+                    try:
+                        with transaction.atomic():
+                            reservar(taller, fecha, hora(n), cupos=cupos)
+                        local["ok"] += 1
+                    except SlotOcupado:
+                        local["ocupado"] += 1
+                    except DatabaseError:
+                        # p.ej. deadlock/lock timeout: la transacción se reintenta en la vista
+                        local["error_bd"] += 1
+            finally:
+                close_old_connections()
+                with bloqueo:
+                    resultado.update(local)
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        segundos = time.perf_counter() - t0
+
+        por_slot = dict(
+            prueba.values_list("hora").annotate(n=Count("reserva_id")).values_list("hora", "n")
+        )
+        andenes_repetidos = (
+            prueba.values("hora", "anden").annotate(n=Count("reserva_id")).filter(n__gt=1).count()
+        )
+        filas = sum(por_slot.values())
+        excedidos = {h.strftime("%H:%M"): n for h, n in por_slot.items() if n > cupos}
+        prueba.delete()
+
+        self.stdout.write(
+            f"  reservas ok={resultado['ok']}  completos={resultado['ocupado']}  "
+            f"errores_bd={resultado['error_bd']}  filas={filas}  "
+            f"{intentos / segundos:,.0f} intentos/s ({segundos:.2f} s)"
+        )
+
+        esperado = cupos * len(bloques)
+        if excedidos or andenes_repetidos or filas != resultado["ok"]:
+            raise CommandError(
+                f"Doble reserva detectada: sobrecupo={excedidos} "
+                f"andenes_repetidos={andenes_repetidos} filas={filas} ok={resultado['ok']}"
+            )
+        if filas < min(esperado, intentos) and not resultado["error_bd"]:
+            raise CommandError(f"Quedaron cupos sin usar: {filas} de {esperado}.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sin dobles reservas: {filas} de {esperado} cupos tomados."
+        ))
@@ -0,0 +1,217 @@
+# ordenestrabajo/management/commands/bench_transiciones.py
+"""
+Benchmark concurrente de cambios de estado de OT.
+
+Uso:
+    python manage.py bench_transiciones
+    python manage.py bench_transiciones --hilos 32 --ots 4 --cambios 2000
+
+Crea OTs de prueba (vehículos ZZ####) en "En Proceso" y lanza N hilos que
+las alternan En Proceso <-> Pausado, cada uno leyendo la OT y aplicando la
+transición que corresponde a lo que leyó. Se comparan dos escenarios:
+
+  - antiguo : leer OT + vehículo, validar y luego save() de ambos
+              (lectura-modificación-escritura sin condición)
+  - cas     : ordenestrabajo.estados.aplicar_transicion
+              (UPDATE ... WHERE estado=? + UPDATE del vehículo, atómico)
+
+Cada cambio deja un evento en ot_eventos. Un cambio se "perdió" si dos
+eventos seguidos no encadenan (el `desde` de uno no es el `hasta` del
+anterior) o si el último evento no coincide con el estado final de la OT.
+Termina con error si el escenario cas pierde alguno o si aplica menos
+cambios por segundo que el antiguo. Al final se borran las OTs y vehículos
+de prueba y se reconstruye el snapshot de KPIs.
+
+Escribe en la base configurada: solo corre contra SQLite o MySQL en
+localhost (salvo --forzar).
+
+En SQLite los hilos chocan con el bloqueo de la base completa (errores_bd);
+las cifras de rendimiento son representativas en MySQL.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, transaction
+
+from autenticacion.models import Empleado
+from ordenestrabajo.bitacora import registrar_evento
+from ordenestrabajo.estados import (
+    TransicionConflicto,
+    TransicionInvalida,
+    aplicar_transicion,
+    estado_vehiculo,
+    validar,
+)
+from ordenestrabajo.models import OrdenTrabajo, OTEvento
+from reportes.kpis import reconstruir as reconstruir_kpis
+from talleres.models import Recinto
+from utils.base_local import verificar_base_local
+from vehiculos.models import Vehiculo
+
+PREFIJO = "ZZ"
+SIGUIENTE = {"En Proceso": "Pausado", "Pausado": "En Proceso"}
+
+
+class Command(BaseCommand):
+    help = "Compara cambios de estado de OT concurrentes: save() vs compare-and-swap."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=16,
+                            help="Hilos concurrentes (default 16).")
+        parser.add_argument("--ots", type=int, default=4,
+                            help="OTs en disputa (default 4).")
+        parser.add_argument("--cambios", type=int, default=1000,
+                            help="Intentos de cambio por escenario (default 1000).")
+        parser.add_argument("--forzar", action="store_true",
+                            help="Permite una base MySQL que no está en localhost.")
+
+    def handle(self, *args, **options):
+        verificar_base_local(options["forzar"])
+        hilos = max(1, options["hilos"])
+        n_ots = max(1, options["ots"])
+        cambios = max(1, options["cambios"])
+
+        recinto = Recinto.objects.order_by("recinto_id").first()
+        responsable = Empleado.objects.order_by("rut").first()
+        if not recinto or not responsable:
+            raise CommandError("Se necesita al menos un recinto y un empleado.")
+
+        self.stdout.write(f"{hilos} hilos, {n_ots} OTs, {cambios} intentos por escenario")
+
+        resultados = {}
+        for nombre, funcion in (("antiguo", self._cambio_antiguo), ("cas", self._cambio_cas)):
+            ot_ids = self._crear_fixtures(recinto, responsable, n_ots)
+            try:
+                resultados[nombre] = self._medir(funcion, ot_ids, hilos, cambios)
+            finally:
+                self._borrar_fixtures()
+                # Los save() concurrentes del escenario antiguo descuadran los deltas
+                reconstruir_kpis()
+
+            r = resultados[nombre]
+            self.stdout.write(
+                f"  {nombre:<8} aplicados={r['ok']:<6} conflictos={r['conflicto']:<6} "
+                f"errores_bd={r['error_bd']:<4} perdidos={r['perdidos']:<5} "
+                f"{r['por_segundo']:,.0f} cambios/s"
+            )
+
+        antiguo, cas = resultados["antiguo"]["por_segundo"], resultados["cas"]["por_segundo"]
+        self.stdout.write(
+            f"  rendimiento cas / antiguo: {cas / antiguo if antiguo else 0:.2f}x"
+        )
+
+        if resultados["cas"]["perdidos"]:
+            raise CommandError(
+                f"La máquina de estados perdió {resultados['cas']['perdidos']} cambio(s)."
+            )
+        if cas < antiguo:
+            raise CommandError(
+                f"compare-and-swap aplicó {cas:,.0f} cambios/s, menos que el camino "
+                f"antiguo ({antiguo:,.0f}/s)."
+            )
+        self.stdout.write(self.style.SUCCESS(
+            "Sin cambios perdidos y con más cambios/s usando compare-and-swap."
+        ))
+
+    # ------------------------------------------------------
+    # Escenarios
+    # ------------------------------------------------------
+    @staticmethod
+    def _cambio_antiguo(ot_id):
+        ot = OrdenTrabajo.objects.get(ot_id=ot_id)
+        veh = Vehiculo.objects.get(patente=ot.patente_id)
+        desde = ot.estado
+        hasta = SIGUIENTE[desde]
+        validar(desde, hasta)
+        ot.estado = hasta
+        veh.estado = estado_vehiculo(hasta)
+        veh.save()
+        ot.save()
+        registrar_evento(ot, comentario="bench", desde=desde, hasta=hasta, nombre="bench")
+
+    @staticmethod
+    def _cambio_cas(ot_id):
+        ot = OrdenTrabajo.objects.defer("descripcion").get(ot_id=ot_id)
+        aplicar_transicion(ot, SIGUIENTE[ot.estado], comentario="bench", nombre="bench", reglas=False)
+
+    def _medir(self, funcion, ot_ids, hilos, cambios):
+        resultado = Counter()
+        bloqueo = threading.Lock()
+        inicio_comun = threading.Barrier(hilos)
+
+        def trabajador(indice):
+            local = Counter()
+            try:
+                inicio_comun.wait()
+                for n in range(indice, cambios, hilos):
+                    try:
+                        funcion(ot_ids[n % len(ot_ids)])
+                        local["ok"] += 1
+                    except (TransicionConflicto, TransicionInvalida):
+                        local["conflicto"] += 1
+                    except DatabaseError:
+                        local["error_bd"] += 1
+            finally:
+                close_old_connections()
+                with bloqueo:
+                    resultado.update(local)
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        segundos = time.perf_counter() - t0
+
+        resultado["perdidos"] = self._cambios_perdidos(ot_ids)
+        resultado["por_segundo"] = resultado["ok"] / segundos if segundos else 0
+        return resultado
+
+    @staticmethod
+    def _cambios_perdidos(ot_ids):
+        finales = dict(OrdenTrabajo.objects.filter(ot_id__in=ot_ids).values_list("ot_id", "estado"))
+        perdidos = 0
+        for ot_id in ot_ids:
+            actual = "En Proceso"
+            for desde, hasta in (
+                OTEvento.objects.filter(ot_id=ot_id)
+                .order_by("evento_id")
+                .values_list("estado_desde", "estado_hasta")
+            ):
+                if desde != actual:
+                    perdidos += 1
+                actual = hasta
+            if actual != finales[ot_id]:
+                perdidos += 1
+        return perdidos
+
+    # ------------------------------------------------------
+    # Datos de prueba
+    # ------------------------------------------------------
+    def _crear_fixtures(self, recinto, responsable, n_ots):
+        self._borrar_fixtures()
+        ot_ids = []
+        with transaction.atomic():
+            for i in range(n_ots):
+                veh = Vehiculo.objects.create(
+                    patente=f"{PREFIJO}{i:04d}", marca="Bench", modelo="Bench",
+                    estado="En Taller",
+                )
+                ot = OrdenTrabajo.objects.create(
+                    fecha_ingreso=date.today(), estado="En Proceso", patente=veh,
+                    recinto=recinto, rut=responsable, descripcion="bench_transiciones",
+                )
+                ot_ids.append(ot.ot_id)
+        return ot_ids
+
+    @staticmethod
+    def _borrar_fixtures():
+        with transaction.atomic():
+            for ot in OrdenTrabajo.objects.filter(patente__patente__startswith=PREFIJO):
+                ot.delete()
+            for veh in Vehiculo.objects.filter(patente__startswith=PREFIJO):
+                veh.delete()
@@ -0,0 +1,521 @@
+# ordenestrabajo/management/commands/generar_flota.py
+"""
+Crea el esquema completo en una base local y la llena con una flota
+sintética para pruebas de carga y benchmarks (ver bench_endpoints).
+
+Uso:
+    python manage.py generar_flota
+    python manage.py generar_flota --vehiculos 2000 --ots 100000 --semilla 7
+    python manage.py generar_flota --solo-esquema
+
+Los modelos de la app son managed=False (las tablas vienen de MySQL), así
+que `migrate` no las crea: primero se corre `migrate` y luego se crean con
+el schema_editor las tablas que falten (también las de ordenestrabajo/sql).
+
+Genera, con una semilla fija (misma semilla = mismos datos):
+  - recintos "Flota N" con sus talleres (andenes)
+  - empleados por cargo en cada recinto (REPARTO_CARGOS)
+  - vehículos con patente de formato chileno (LLLLNN)
+  - OTs repartidas en los últimos --dias días: las cerradas según
+    ESTADOS_CERRADOS y, para una fracción de los vehículos, una OT activa
+    reciente según ESTADOS_ACTIVOS_PESO (nunca dos activas por vehículo)
+  - eventos de bitácora (creación y cierre), pausas, documentos (solo la
+    fila: los archivos no existen en MEDIA_ROOT), ingresos/salidas de
+    portería, designaciones chofer-vehículo y solicitudes pendientes
+
+Se inserta con bulk_create por lotes, sin señales: al final se aplica el
+plan de índices (plan_indices --aplicar, para que bench_endpoints mida el
+esquema de producción) y se reconstruyen los punteros de OT actual, las
+reservas de la agenda y el snapshot de KPIs (que además invalida los ETag). Los usuarios Django se crean al iniciar
+sesión (EmpleadosBackend) o los crea bench_endpoints.
+
+Solo corre sobre una base vacía (sin vehículos ni OTs) y local: SQLite
+(DB_ENGINE=sqlite en .env) o MySQL en localhost. --forzar salta el control
+de host, nunca el de base vacía.
+"""
+import random
+import time as reloj
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from autenticacion.models import Empleado
+from documentos.models import Documento
+from ordenestrabajo.estados import estado_vehiculo
+from ordenestrabajo.models import (
+    ControlAcceso,
+    DesignacionVehicular,
+    OrdenTrabajo,
+    OTEvento,
+    Pausa,
+    SolicitudIngresoVehiculo,
+)
+from talleres.models import Recinto, Taller
+from utils.base_local import crear_tablas_faltantes, verificar_base_local
+from vehiculos.models import Vehiculo
+
+PREFIJO_RECINTO = "Flota"
+
+# Fracción de los empleados de cada recinto por cargo (al menos uno de cada)
+REPARTO_CARGOS = {
+    "CHOFER": 0.60,
+    "MECANICO": 0.25,
+    "GUARDIA": 0.06,
+    "ADMINISTRATIVO": 0.05,
+    "SUPERVISOR": 0.04,
+}
+
+# Estado final de las OTs históricas (pesos relativos)
+ESTADOS_CERRADOS = {
+    "Finalizado": 88,
+    "Cancelado": 5,
+    "Sin Repuestos": 4,
+    "No Reparable": 3,
+}
+
+# Estado de la OT activa de los vehículos que tienen una
+ESTADOS_ACTIVOS_PESO = {
+    "Pendiente": 30,
+    "Recibida": 10,
+    "En Taller": 10,
+    "En Proceso": 35,
+    "Pausado": 15,
+}
+
+# Probabilidades por OT
+P_PAUSA = 0.12
+P_DOCUMENTOS = 0.15
+
+MODELOS = [
+    ("Volvo", "FH 460", "Camión"),
+    ("Scania", "R 450", "Camión"),
+    ("Mercedes-Benz", "Actros 2645", "Camión"),
+    ("Hyundai", "HD78", "Camión"),
+    ("Chevrolet", "NPR 816", "Furgón"),
+    ("Mercedes-Benz", "Sprinter 515", "Furgón"),
+    ("Peugeot", "Partner", "Furgón"),
+    ("Toyota", "Hilux", "Pickup"),
+    ("Ford", "Ranger", "Pickup"),
+    ("Nissan", "Versa", "Auto"),
+    ("Mercedes-Benz", "O500", "Bus"),
+]
+
+FALLAS = [
+    "Mantención preventiva 20.000 km",
+    "Cambio de pastillas y discos de freno",
+    "Falla en sistema de refrigeración",
+    "Ruido en caja de cambios",
+    "Revisión de embrague",
+    "Cambio de neumáticos",
+    "Falla eléctrica en luces traseras",
+    "Fuga de aceite en motor",
+    "Revisión técnica anual",
+    "Falla en sistema de aire acondicionado",
+]
+
+MOTIVOS_PAUSA = [
+    "Espera de repuestos",
+    "Fin de turno",
+    "Espera de autorización",
+    "Herramienta en uso",
+]
+
+NOMBRES = ["Juan", "María", "Pedro", "Camila", "José", "Valentina", "Luis", "Francisca", "Diego", "Javiera"]
+APELLIDOS = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez", "Sepúlveda"]
+
+LETRAS_PATENTE = "BCDFGHJKLPRSTVWXYZ"
+RUT_INICIAL = 30_000_000
+
+
+def rut_con_dv(numero):
+    """RUT con dígito verificador (módulo 11)."""
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    dv = {11: "0", 10: "K"}.get(resto, str(resto))
+    return f"{numero}-{dv}"
+
+
+def patente(indice):
+    letras = ""
+    n = indice // 100
+    for _ in range(4):
+        n, r = divmod(n, len(LETRAS_PATENTE))
+        letras = LETRAS_PATENTE[r] + letras
+    return f"{letras}{indice % 100:02d}"
+
+
+@contextmanager
+def fechas_explicitas(*campos):
+    """
+    Desactiva auto_now_add en los campos dados mientras dura el bloque, para
+    que bulk_create guarde las fechas históricas en vez de "ahora".
+    """
+    originales = [(campo, campo.auto_now_add) for campo in campos]
+    for campo, _ in originales:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, valor in originales:
+            campo.auto_now_add = valor
+
+
+class Command(BaseCommand):
+    help = "Crea el esquema en una base local y genera una flota sintética (recintos, empleados, vehículos, OTs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recintos", type=int, default=5,
+                            help="Recintos a crear (default 5).")
+        parser.add_argument("--talleres-por-recinto", type=int, default=6,
+                            help="Talleres (andenes) por recinto (default 6).")
+        parser.add_argument("--empleados", type=int, default=120,
+                            help="Empleados por recinto, repartidos por cargo (default 120).")
+        parser.add_argument("--vehiculos", type=int, default=10_000,
+                            help="Vehículos (default 10000).")
+        parser.add_argument("--ots", type=int, default=1_000_000,
+                            help="Órdenes de trabajo (default 1000000).")
+        parser.add_argument("--dias", type=int, default=730,
+                            help="Días de historia hacia atrás desde hoy (default 730).")
+        parser.add_argument("--activas", type=float, default=0.08,
+                            help="Fracción de vehículos con una OT activa (default 0.08).")
+        parser.add_argument("--semilla", type=int, default=42,
+                            help="Semilla del generador (default 42).")
+        parser.add_argument("--lote", type=int, default=5000,
+                            help="Filas por bulk_create (default 5000).")
+        parser.add_argument("--clave", default="flota1234",
+                            help="Contraseña de todos los empleados generados.")
+        parser.add_argument("--solo-esquema", action="store_true",
+                            help="Solo crea las tablas, sin datos.")
+        parser.add_argument("--forzar", action="store_true",
+                            help="Permite una base MySQL que no está en localhost.")
+
+    def handle(self, *args, **options):
+        verificar_base_local(options["forzar"])
+        self._crear_esquema()
+        if options["solo_esquema"]:
+            self.stdout.write(self.style.SUCCESS("Esquema creado."))
+            return
+
+        if Vehiculo.objects.exists() or OrdenTrabajo.objects.exists():
+            raise CommandError(
+                "La base ya tiene vehículos u OTs: generar_flota se corre sobre una base vacía."
+            )
+
+        self.rng = random.Random(options["semilla"])
+        self.lote = max(100, options["lote"])
+        self.hoy = date.today()
+        self.ahora = timezone.now()
+        inicio = reloj.perf_counter()
+
+        recintos, talleres = self._recintos(max(1, options["recintos"]), max(1, options["talleres_por_recinto"]))
+        personal = self._empleados(recintos, max(len(REPARTO_CARGOS), options["empleados"]), options["clave"])
+        vehiculos = self._vehiculos(recintos, max(1, options["vehiculos"]))
+        ultima = self._ots(
+            vehiculos, personal, max(0, options["ots"]), max(1, options["dias"]),
+            min(max(options["activas"], 0.0), 1.0),
+        )
+        self._estado_vehiculos(ultima)
+        self._designaciones(vehiculos, personal)
+        self._solicitudes(vehiculos, personal, talleres, ultima)
+
+        # Índices después de la carga (más rápido que mantenerlos fila a fila)
+        self.stdout.write("Aplicando el plan de índices...")
+        call_command("plan_indices", aplicar=True, stdout=self.stdout)
+
+        self.stdout.write("Reconstruyendo punteros, reservas y KPIs...")
+        call_command("reparar_punteros_ot", verbosity=0, stdout=self.stdout)
+        call_command("sincronizar_reservas", stdout=self.stdout)
+        call_command("reconstruir_kpis", stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Flota generada en {reloj.perf_counter() - inicio:,.1f} s "
+            f"({connection.vendor}, semilla {options['semilla']})."
+        ))
+
+    # ------------------------------------------------------
+    # Esquema
+    # ------------------------------------------------------
+    def _crear_esquema(self):
+        call_command("migrate", interactive=False, verbosity=0)
+        creadas = crear_tablas_faltantes()
+        if creadas:
+            self.stdout.write(f"Tablas creadas: {', '.join(sorted(creadas))}")
+
+    # ------------------------------------------------------
+    # Inserción por lotes
+    # ------------------------------------------------------
+    def _insertar(self, modelo, filas):
+        """bulk_create de un iterable en lotes; devuelve la cantidad insertada."""
+        total = 0
+        pendientes = []
+        for fila in filas:
+            pendientes.append(fila)
+            if len(pendientes) >= self.lote:
+                total += self._volcar(modelo, pendientes)
+        if pendientes:
+            total += self._volcar(modelo, pendientes)
+        return total
+
+    @staticmethod
+    def _volcar(modelo, pendientes):
+        with transaction.atomic():
+            modelo.objects.bulk_create(pendientes)
+        n = len(pendientes)
+        pendientes.clear()
+        return n
+
+    def _nombre(self):
+        return f"{self.rng.choice(NOMBRES)} {self.rng.choice(APELLIDOS)} {self.rng.choice(APELLIDOS)}"
+
+    # ------------------------------------------------------
+    # Recintos, talleres, empleados, vehículos
+    # ------------------------------------------------------
+    def _recintos(self, n_recintos, por_recinto):
+        ubicaciones = [u for u, _ in Recinto._meta.get_field("ubicacion").choices]
+        recintos = []
+        for i in range(n_recintos):
+            recintos.append(Recinto.objects.create(
+                nombre=f"{PREFIJO_RECINTO} {i + 1}",
+                ubicacion=ubicaciones[i % len(ubicaciones)],
+                jefe_recinto=self._nombre(),
+            ))
+
+        ultimo = Taller.objects.order_by("-nro_anden").values_list("nro_anden", flat=True).first() or 0
+        Taller.objects.bulk_create([
+            Taller(recinto=recinto, encargado_taller=self._nombre(),
+                   nro_anden=ultimo + i * por_recinto + j + 1)
+            for i, recinto in enumerate(recintos)
+            for j in range(por_recinto)
+        ])
+        talleres = {}
+        for taller in Taller.objects.filter(recinto__in=recintos).order_by("nro_anden"):
+            talleres.setdefault(taller.recinto_id, []).append(taller)
+        self.stdout.write(f"{len(recintos)} recintos, {n_recintos * por_recinto} talleres")
+        return recintos, talleres
+
+    def _empleados(self, recintos, por_recinto, clave):
+        """{recinto_id: {cargo: [rut, ...]}}"""
+        hash_clave = make_password(clave)
+        personal = {}
+        empleados = []
+        numero = RUT_INICIAL
+        for recinto in recintos:
+            por_cargo = personal.setdefault(recinto.recinto_id, {})
+            for cargo, fraccion in REPARTO_CARGOS.items():
+                for _ in range(max(1, round(por_recinto * fraccion))):
+                    numero += 1
+                    rut = rut_con_dv(numero)
+                    por_cargo.setdefault(cargo, []).append(rut)
+                    empleados.append(Empleado(
+                        rut=rut, nombre=self._nombre(), cargo=cargo, region="RM",
+                        password=hash_clave, usuario=f"flota.{cargo.lower()}.{numero}",
+                        recinto=recinto, is_staff=cargo == "SUPERVISOR",
+                    ))
+        total = self._insertar(Empleado, empleados)
+        self.stdout.write(f"{total} empleados")
+        return personal
+
+    def _vehiculos(self, recintos, n_vehiculos):
+        """Lista de (patente, recinto_id) en orden de generación."""
+        vehiculos = []
+
+        def filas():
+            for i in range(n_vehiculos):
+                recinto = recintos[i % len(recintos)]
+                marca, modelo, tipo = self.rng.choice(MODELOS)
+                vehiculos.append((patente(i), recinto.recinto_id))
+                yield Vehiculo(
+                    patente=patente(i), marca=marca, modelo=modelo, tipo=tipo,
+                    anio=self.rng.randint(2012, self.hoy.year), estado="Disponible",
+                    ubicacion=recinto.ubicacion,
+                )
+
+        total = self._insertar(Vehiculo, filas())
+        self.stdout.write(f"{total} vehículos")
+        return vehiculos
+
+    # ------------------------------------------------------
+    # OTs y lo que cuelga de ellas
+    # ------------------------------------------------------
+    def _ots(self, vehiculos, personal, n_ots, dias, activas):
+        """
+        Genera las OTs por rondas (una por vehículo y ronda, en orden de
+        fecha) y sus eventos, pausas, documentos y controles de acceso.
+        Devuelve {patente: estado de su última OT}.
+        """
+        n_veh = len(vehiculos)
+        rondas = -(-n_ots // n_veh) if n_ots else 0
+        # Vehículos con `rondas` OTs; el resto tiene una menos
+        completos = n_ots - (rondas - 1) * n_veh if rondas else 0
+        paso = dias / rondas if rondas else dias
+        primera = self.hoy - timedelta(days=dias)
+
+        ot_id = (OrdenTrabajo.objects.order_by("-ot_id").values_list("ot_id", flat=True).first() or 0)
+        cerrados, pesos_cerrados = zip(*ESTADOS_CERRADOS.items())
+        activos, pesos_activos = zip(*ESTADOS_ACTIVOS_PESO.items())
+        ultima = {}
+        cuentas = dict.fromkeys(("ots", "eventos", "pausas", "documentos", "accesos"), 0)
+        hijos = {"eventos": [], "pausas": [], "documentos": [], "accesos": []}
+        ots = []
+
+        def volcar():
+            cuentas["ots"] += self._volcar(OrdenTrabajo, ots)
+            for clave, modelo in (("eventos", OTEvento), ("pausas", Pausa),
+                                  ("documentos", Documento), ("accesos", ControlAcceso)):
+                if hijos[clave]:
+                    cuentas[clave] += self._volcar(modelo, hijos[clave])
+            self.stdout.write(f"  {cuentas['ots']:,} / {n_ots:,} OTs")
+
+        campos_fecha = (
+            Pausa._meta.get_field("inicio"),
+            Documento._meta.get_field("creado_en"),
+        )
+        with fechas_explicitas(*campos_fecha):
+            for ronda in range(rondas):
+                for indice, (placa, recinto_id) in enumerate(vehiculos):
+                    total_vehiculo = rondas if indice < completos else rondas - 1
+                    if ronda >= total_vehiculo:
+                        continue
+                    es_ultima = ronda == total_vehiculo - 1
+                    activa = es_ultima and self.rng.random() < activas
+
+                    ot_id += 1
+                    fecha = primera + timedelta(days=int((ronda + self.rng.random()) * paso))
+                    fecha = min(fecha, self.hoy)
+                    if activa:
+                        estado = self.rng.choices(activos, pesos_activos)[0]
+                        # La OT activa es de la última semana (o de los próximos días si está Pendiente)
+                        desfase = self.rng.randint(0, 6)
+                        fecha = self.hoy + timedelta(days=desfase) if estado == "Pendiente" else self.hoy - timedelta(days=desfase)
+                        salida = None
+                    else:
+                        estado = self.rng.choices(cerrados, pesos_cerrados)[0]
+                        salida = min(fecha + timedelta(days=self.rng.randint(0, 9)), self.hoy)
+
+                    equipo = personal[recinto_id]
+                    mecanico = self.rng.choice(equipo["MECANICO"])
+                    creador = self.rng.choice(equipo["SUPERVISOR"])
+                    hora = time(self.rng.randint(9, 18), 0)
+                    ingreso = timezone.make_aware(datetime.combine(fecha, hora))
+
+                    ots.append(OrdenTrabajo(
+                        ot_id=ot_id, fecha_ingreso=fecha, hora_ingreso=hora, fecha_salida=salida,
+                        descripcion=self.rng.choice(FALLAS), estado=estado,
+                        recinto_id=recinto_id, patente_id=placa, rut_id=mecanico, rut_creador_id=creador,
+                    ))
+                    self._hijos_ot(hijos, ot_id, placa, equipo, estado, fecha, salida, ingreso, creador, mecanico)
+                    if es_ultima:
+                        ultima[placa] = estado
+
+                    if len(ots) >= self.lote:
+                        volcar()
+            if ots:
+                volcar()
+
+        self.stdout.write(
+            f"{cuentas['ots']:,} OTs, {cuentas['eventos']:,} eventos, {cuentas['pausas']:,} pausas, "
+            f"{cuentas['documentos']:,} documentos, {cuentas['accesos']:,} controles de acceso"
+        )
+        return ultima
+
+    def _hijos_ot(self, hijos, ot_id, placa, equipo, estado, fecha, salida, ingreso, creador, mecanico):
+        cierre = timezone.make_aware(datetime.combine(salida, time(17, 30))) if salida else None
+        if ingreso > self.ahora:
+            # OT agendada para los próximos días: se creó en los últimos 3
+            creada = self.ahora - timedelta(hours=self.rng.randint(1, 72))
+        else:
+            creada = ingreso
+        # Lo ya ocurrido de las OTs de hoy no puede quedar en el futuro
+        ingreso = min(ingreso, self.ahora)
+
+        hijos["eventos"].append(OTEvento(
+            ot_id=ot_id, autor_id=creador, cargo="SUPERVISOR", estado_desde=None,
+            estado_hasta="Pendiente", comentario="OT creada", creado_en=creada,
+        ))
+        if estado != "Pendiente":
+            hijos["eventos"].append(OTEvento(
+                ot_id=ot_id, autor_id=mecanico, cargo="MECANICO", estado_desde="Pendiente",
+                estado_hasta=estado, creado_en=min(cierre or ingreso + timedelta(hours=1), self.ahora),
+            ))
+
+        if estado == "Pausado" or (salida and estado != "Cancelado" and self.rng.random() < P_PAUSA):
+            inicio = min(ingreso + timedelta(hours=self.rng.randint(1, 6)), self.ahora)
+            abierta = estado == "Pausado"
+            hijos["pausas"].append(Pausa(
+                ot_id=ot_id, motivo=self.rng.choice(MOTIVOS_PAUSA), inicio=inicio,
+                fin=None if abierta else min(inicio + timedelta(hours=self.rng.randint(1, 24)), self.ahora),
+                activo=abierta,
+            ))
+
+        if estado != "Pendiente" and self.rng.random() < P_DOCUMENTOS:
+            for n in range(self.rng.randint(1, 3)):
+                tipo = self.rng.choice(("FOTO", "FOTO", "INFORME"))
+                extension = "jpg" if tipo == "FOTO" else "pdf"
+                hijos["documentos"].append(Documento(
+                    ot_id=ot_id, patente_id=placa, tipo=tipo, titulo=f"{tipo.title()} {n + 1}",
+                    archivo=f"flota/ot_{ot_id}_{n + 1}.{extension}", creado_en=ingreso,
+                ))
+
+        # Portería: todo vehículo que llegó al recinto pasó por el guardia
+        if estado not in ("Pendiente", "Cancelado"):
+            guardias = equipo["GUARDIA"]
+            hijos["accesos"].append(ControlAcceso(
+                fecha_ingreso=fecha, fecha_salida=salida,
+                guardia_ingreso_id=self.rng.choice(guardias),
+                guardia_salida_id=self.rng.choice(guardias) if salida else None,
+                vehiculo_id=placa, chofer_id=self.rng.choice(equipo["CHOFER"]),
+            ))
+
+    # ------------------------------------------------------
+    # Estado final, designaciones y solicitudes
+    # ------------------------------------------------------
+    def _estado_vehiculos(self, ultima):
+        """Alinea el estado del vehículo con su última OT."""
+        por_estado = {}
+        for placa, estado in ultima.items():
+            if estado == "No Reparable":
+                destino = "Fuera de Servicio"
+            else:
+                destino = estado_vehiculo(estado)
+            if destino != "Disponible":
+                por_estado.setdefault(destino, []).append(placa)
+        with transaction.atomic():
+            for destino, placas in por_estado.items():
+                for i in range(0, len(placas), self.lote):
+                    Vehiculo.objects.filter(patente__in=placas[i:i + self.lote]).update(estado=destino)
+
+    def _designaciones(self, vehiculos, personal):
+        inicio = self.hoy - timedelta(days=365)
+
+        def filas():
+            for placa, recinto_id in vehiculos:
+                yield DesignacionVehicular(
+                    fecha_inicio=inicio, estado="En uso", vehiculo_id=placa,
+                    empleado_id=self.rng.choice(personal[recinto_id]["CHOFER"]),
+                )
+
+        self.stdout.write(f"{self._insertar(DesignacionVehicular, filas())} designaciones")
+
+    def _solicitudes(self, vehiculos, personal, talleres, ultima):
+        """Solicitudes PENDIENTE para ~3% de los vehículos sin OT activa."""
+        sin_ot = [(p, r) for p, r in vehiculos if ultima.get(p) not in ESTADOS_ACTIVOS_PESO]
+        elegidos = self.rng.sample(sin_ot, len(sin_ot) * 3 // 100)
+
+        def filas():
+            for placa, recinto_id in elegidos:
+                yield SolicitudIngresoVehiculo(
+                    vehiculo_id=placa, chofer_id=self.rng.choice(personal[recinto_id]["CHOFER"]),
+                    taller=self.rng.choice(talleres[recinto_id]),
+                    fecha_solicitada=self.hoy + timedelta(days=self.rng.randint(1, 10)),
+                    descripcion=self.rng.choice(FALLAS), estado="PENDIENTE",
+                )
+
+        self.stdout.write(f"{self._insertar(SolicitudIngresoVehiculo, filas())} solicitudes pendientes")
@@ -0,0 +1,115 @@
+# ordenestrabajo/management/commands/plan_indices.py
+"""
+Plan de índices compuestos para las tablas no administradas (managed=False).
+
+Uso:
+    python manage.py plan_indices              # muestra el estado y el DDL pendiente
+    python manage.py plan_indices --aplicar    # crea los índices que faltan
+    python manage.py plan_indices --explain    # EXPLAIN de las consultas canónicas
+    python manage.py plan_indices --explain --verbose-plan
+
+El plan vive en ordenestrabajo/indices.py (PLAN_INDICES). Con --explain el
+comando termina con error si alguna consulta canónica recorre la tabla
+completa, para detectar regresiones (índice borrado, filtro cambiado, etc.).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ordenestrabajo import indices
+
+
+class Command(BaseCommand):
+    help = "Emite/aplica el plan de índices y verifica las consultas calientes con EXPLAIN."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--aplicar",
+            action="store_true",
+            help="Crea en la BD los índices del plan que aún no existen.",
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Ejecuta EXPLAIN sobre las consultas canónicas.",
+        )
+        parser.add_argument(
+            "--verbose-plan",
+            action="store_true",
+            help="Junto con --explain, imprime el plan completo de cada consulta.",
+        )
+
+    def handle(self, *args, **options):
+        self._plan(aplicar=options["aplicar"])
+
+        if options["explain"]:
+            self._explain(detalle=options["verbose_plan"])
+
+    # ------------------------------------------------------
+    # DDL
+    # ------------------------------------------------------
+    def _plan(self, aplicar):
+        self.stdout.write(f"Motor: {connection.vendor}")
+
+        pendientes = []
+        with connection.cursor() as cursor:
+            existentes_por_tabla = {}
+            for indice in indices.PLAN_INDICES:
+                tabla, columnas = indices.tabla_y_columnas(indice)
+                if tabla not in existentes_por_tabla:
+                    existentes_por_tabla[tabla] = indices.indices_existentes(cursor, tabla)
+
+                estado, detalle = indices.estado_indice(indice, existentes_por_tabla[tabla])
+                extra = f" (vía {detalle})" if estado == "CUBIERTO" else ""
+                self.stdout.write(
+                    f"  [{estado:<8}] {tabla}.{indice.nombre} ({', '.join(columnas)}){extra}"
+                )
+                if estado == "FALTA":
+                    pendientes.append(indice)
+
+        if not pendientes:
+            self.stdout.write(self.style.SUCCESS("Todos los índices del plan están presentes."))
+            return
+
+        self.stdout.write("")
+        self.stdout.write("-- DDL pendiente")
+        for indice in pendientes:
+            self.stdout.write(indices.sql_crear(indice) + ";")
+
+        if not aplicar:
+            self.stdout.write(self.style.WARNING(
+                f"{len(pendientes)} índice(s) pendiente(s). Use --aplicar para crearlos."
+            ))
+            return
+
+        with connection.cursor() as cursor:
+            for indice in pendientes:
+                cursor.execute(indices.sql_crear(indice))
+                self.stdout.write(f"  creado {indice.nombre}")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(pendientes)} índice(s) creado(s)."))
+
+    # ------------------------------------------------------
+    # EXPLAIN
+    # ------------------------------------------------------
+    def _explain(self, detalle):
+        self.stdout.write("")
+        self.stdout.write("EXPLAIN de consultas canónicas")
+
+        escaneos = []
+        for nombre, qs, tabla, aceptados in indices.consultas_canonicas():
+            estado, usado, plan = indices.explicar(qs, tabla, aceptados)
+            self.stdout.write(
+                f"  {nombre:<26} {tabla:<30} índice={usado or '-':<24} [{estado}]"
+            )
+            if detalle:
+                for linea in plan.splitlines():
+                    self.stdout.write(f"      {linea}")
+            if estado == "SCAN":
+                escaneos.append(nombre)
+
+        if escaneos:
+            raise CommandError(
+                "Consultas sin índice (full scan): " + ", ".join(escaneos)
+            )
+
+        self.stdout.write(self.style.SUCCESS("Todas las consultas canónicas usan índice."))
@@ -0,0 +1,99 @@
+# ordenestrabajo/management/commands/reparar_punteros_ot.py
+"""
+Crea la tabla vehiculo_ot_actual (si falta) y reconstruye los punteros a la
+OT activa y a la última OT de cada vehículo desde ordenestrabajo.
+
+Uso:
+    python manage.py reparar_punteros_ot              # crea tabla + reconstruye
+    python manage.py reparar_punteros_ot --solo-tabla # solo CREATE TABLE
+    python manage.py reparar_punteros_ot --dry-run    # informa diferencias sin escribir
+
+Se corre al desplegar el puntero y cada vez que se carguen OTs por SQL.
+La OT activa es la más reciente (fecha, hora, ot_id) en un estado activo;
+los vehículos con más de una OT activa quedan informados para revisarlos a
+mano (el puntero apunta a la más reciente, las demás no se tocan).
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ordenestrabajo.estados import ESTADOS_ACTIVOS
+from ordenestrabajo.models import OrdenTrabajo, VehiculoOTActual
+
+
+class Command(BaseCommand):
+    help = "Crea/reconstruye la tabla vehiculo_ot_actual (OT activa y última OT por vehículo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--solo-tabla", action="store_true",
+                            help="Solo crea la tabla si no existe.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Muestra lo que haría sin escribir.")
+
+    def handle(self, *args, **options):
+        dry = options["dry_run"]
+        tabla = VehiculoOTActual._meta.db_table
+
+        existe = tabla in connection.introspection.table_names()
+        if not existe:
+            if dry:
+                self.stdout.write(f"Falta la tabla {tabla}.")
+            else:
+                with connection.schema_editor() as editor:
+                    editor.create_model(VehiculoOTActual)
+                self.stdout.write(self.style.SUCCESS(f"Tabla {tabla} creada."))
+                existe = True
+
+        if options["solo_tabla"]:
+            return
+
+        # patente -> [ot_activa, ultima_ot] en una pasada ordenada
+        esperados = {}
+        varias_activas = {}
+        ots = (
+            OrdenTrabajo.objects
+            .order_by("patente_id", "fecha_ingreso", "hora_ingreso", "ot_id")
+            .values_list("patente_id", "ot_id", "estado")
+        )
+        for patente, ot_id, estado in ots.iterator(chunk_size=2000):
+            fila = esperados.setdefault(patente, [None, None])
+            if estado in ESTADOS_ACTIVOS:
+                if fila[0] is not None:
+                    varias_activas.setdefault(patente, [fila[0]]).append(ot_id)
+                fila[0] = ot_id
+            fila[1] = max(fila[1] or 0, ot_id)
+
+        actuales = {}
+        if existe:
+            actuales = {
+                patente: [activa, ultima]
+                for patente, activa, ultima in VehiculoOTActual.objects.values_list(
+                    "vehiculo_id", "ot_activa_id", "ultima_ot_id",
+                )
+            }
+
+        distintos = [p for p, fila in esperados.items() if actuales.get(p) != fila]
+        sobrantes = [p for p in actuales if p not in esperados]
+
+        self.stdout.write(f"Vehículos con OTs: {len(esperados)}")
+        self.stdout.write(f"Punteros a corregir/crear: {len(distintos)}")
+        if sobrantes:
+            self.stdout.write(f"Punteros de vehículos sin OTs (se eliminan): {len(sobrantes)}")
+        if varias_activas:
+            self.stdout.write(self.style.WARNING(
+                f"Vehículos con más de una OT activa: {varias_activas}"
+            ))
+
+        if dry:
+            return
+
+        with transaction.atomic():
+            VehiculoOTActual.objects.all().delete()
+            VehiculoOTActual.objects.bulk_create(
+                [
+                    VehiculoOTActual(vehiculo_id=patente, ot_activa_id=activa, ultima_ot_id=ultima)
+                    for patente, (activa, ultima) in esperados.items()
+                ],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS("Punteros reconstruidos."))
@@ -0,0 +1,102 @@
+# ordenestrabajo/management/commands/sincronizar_reservas.py
+"""
+Crea la tabla reservas_slot (si falta) y la reconstruye desde las OTs activas.
+
+Uso:
+    python manage.py sincronizar_reservas              # crea tabla + reconstruye
+    python manage.py sincronizar_reservas --solo-tabla # solo CREATE TABLE
+    python manage.py sincronizar_reservas --dry-run    # informa sin escribir
+
+Se corre una vez al desplegar el sistema de cupos: las OTs activas creadas
+antes no tienen reserva y el horario se vería libre. Como en
+ordenestrabajo/reservas.py, cada OT ocupa el bloque de la grilla que
+contiene su hora, con los cupos de la agenda; la OT no guarda el taller,
+así que se usa la grilla del primer taller del recinto. Los bloques que ya
+tenían más OTs que cupos, y las OTs fuera de la grilla, quedan informados
+(no se tocan las OTs; solo quedan sin fila de reserva).
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ordenestrabajo import agenda
+from ordenestrabajo.estados import ESTADOS_ACTIVOS
+from ordenestrabajo.models import OrdenTrabajo, ReservaSlot
+from talleres.models import Taller
+
+
+class Command(BaseCommand):
+    help = "Crea/reconstruye la tabla de cupos de la agenda (reservas_slot)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--solo-tabla", action="store_true",
+                            help="Solo crea la tabla si no existe.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Muestra lo que haría sin escribir.")
+
+    def handle(self, *args, **options):
+        dry = options["dry_run"]
+        tabla = ReservaSlot._meta.db_table
+
+        if tabla not in connection.introspection.table_names():
+            if dry:
+                self.stdout.write(f"Falta la tabla {tabla}.")
+                return
+            with connection.schema_editor() as editor:
+                editor.create_model(ReservaSlot)
+            self.stdout.write(self.style.SUCCESS(f"Tabla {tabla} creada."))
+
+        if options["solo_tabla"]:
+            return
+
+        ots = (
+            OrdenTrabajo.objects
+            .filter(estado__in=ESTADOS_ACTIVOS, hora_ingreso__isnull=False)
+            .order_by("fecha_ingreso", "hora_ingreso", "ot_id")
+            .values_list("ot_id", "recinto_id", "fecha_ingreso", "hora_ingreso")
+        )
+
+        # Primer taller de cada recinto: su grilla y sus cupos
+        talleres = {}
+        for taller in Taller.objects.order_by("-taller_id"):
+            talleres[taller.recinto_id] = taller
+        cupos = {recinto_id: agenda.cupos(t) for recinto_id, t in talleres.items()}
+
+        usados = defaultdict(int)
+        nuevas, sobrecupo, fuera = [], [], []
+        for ot_id, recinto_id, fecha, hora in ots:
+            taller = talleres.get(recinto_id)
+            inicio = agenda.bloque(taller.taller_id, hora) if taller else None
+            if inicio is None:
+                fuera.append(ot_id)
+                continue
+            slot = (recinto_id, fecha, inicio)
+            usados[slot] += 1
+            if usados[slot] > cupos[recinto_id]:
+                sobrecupo.append(ot_id)
+                continue
+            nuevas.append(ReservaSlot(
+                recinto_id=recinto_id, fecha=fecha, hora=inicio,
+                anden=usados[slot], ot_id=ot_id,
+            ))
+
+        self.stdout.write(f"OTs activas con horario: {len(nuevas) + len(sobrecupo) + len(fuera)}")
+        self.stdout.write(f"Reservas a crear: {len(nuevas)}")
+        if sobrecupo:
+            self.stdout.write(self.style.WARNING(
+                f"OTs en horarios con sobrecupo (sin reserva): {sobrecupo}"
+            ))
+        if fuera:
+            self.stdout.write(self.style.WARNING(
+                f"OTs fuera de la grilla de la agenda (sin reserva): {fuera}"
+            ))
+
+        if dry:
+            return
+
+        with transaction.atomic():
+            ReservaSlot.objects.all().delete()
+            ReservaSlot.objects.bulk_create(nuevas, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS("Reservas sincronizadas."))
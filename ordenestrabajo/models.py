@@ -1,10 +1,12 @@
 # ordenestrabajo/models.py
-from django.db import models
+from django.db import models, transaction
 
 from autenticacion.models import Empleado
 from vehiculos.models import Vehiculo
 from talleres.models import Taller, Recinto
 
+from . import originales
+
 
 class OrdenTrabajo(models.Model):
     """
@@ -89,6 +91,12 @@ class OrdenTrabajo(models.Model):
         related_name="ots_creadas",
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        originales.al_cargar(instance, field_names)
+        return instance
+
     # ======================================================
     # Normalización de patente (KG.JV93 -> KGJV93, etc.)
     # ======================================================
@@ -100,7 +108,13 @@ class OrdenTrabajo(models.Model):
                 .strip()
                 .upper()
             )
-        super().save(*args, **kwargs)
+        # Los post_save comparan contra los valores originales (ver originales.py)
+        originales.cargar(self)
+        # Los post_save van en la misma transacción: si el vehículo ya tiene
+        # otra OT activa (punteros.OTActivaExistente) la OT no queda guardada
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        originales.refrescar(self)
 
     def __str__(self):
         return f"OT #{self.ot_id} - {self.patente_id} ({self.estado})"
@@ -357,3 +371,164 @@ class ControlAcceso(models.Model):
 
     def __str__(self):
         return f"Control #{self.control_id} - {self.vehiculo_id}"
+
+
+# ===========================================
+# TABLA: RESERVAS DE HORARIO (cupos por andén)
+# ===========================================
+class ReservaSlot(models.Model):
+    """
+    Un cupo tomado en la agenda: (recinto, fecha, hora, andén).
+
+    La UNIQUE uq_reserva_slot es la que resuelve la concurrencia: dos
+    aprobaciones simultáneas nunca pueden quedarse con el mismo andén en el
+    mismo horario. Ver ordenestrabajo/reservas.py.
+
+    Tabla creada con `python manage.py sincronizar_reservas` (o el DDL de
+    ordenestrabajo/sql/reservas_slot.sql).
+    """
+    class Meta:
+        managed = False
+        db_table = "reservas_slot"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recinto", "fecha", "hora", "anden"],
+                name="uq_reserva_slot",
+            ),
+        ]
+
+    reserva_id = models.AutoField(primary_key=True)
+
+    recinto = models.ForeignKey(
+        Recinto,
+        db_column="recinto_id",
+        on_delete=models.DO_NOTHING,
+        related_name="reservas",
+    )
+
+    fecha = models.DateField()
+    hora = models.TimeField()
+    anden = models.PositiveSmallIntegerField()
+
+    # NULL solo durante la aprobación (cupo tomado, OT aún sin crear)
+    ot = models.OneToOneField(
+        OrdenTrabajo,
+        db_column="ot_id",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="reserva",
+    )
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.fecha} {self.hora:%H:%M} andén {self.anden} (OT {self.ot_id})"
+
+
+# ===========================================
+# TABLA: BITÁCORA DE EVENTOS DE LA OT
+# ===========================================
+class OTEvento(models.Model):
+    """
+    Bitácora de la OT, una fila por evento (solo se inserta).
+
+    Reemplaza a la concatenación de comentarios en ordenestrabajo.descripcion
+    (VARCHAR(2000), que había que reescribir completa y se truncaba). Ver
+    ordenestrabajo/bitacora.py.
+
+    Tabla creada con `python manage.py backfill_eventos` (o el DDL de
+    ordenestrabajo/sql/ot_eventos.sql).
+    """
+    class Meta:
+        managed = False
+        db_table = "ot_eventos"
+        indexes = [
+            # Lectura paginada por OT en orden de inserción
+            models.Index(fields=["ot", "evento_id"], name="ix_evento_ot"),
+        ]
+
+    evento_id = models.BigAutoField(primary_key=True)
+
+    ot = models.ForeignKey(
+        OrdenTrabajo,
+        db_column="ot_id",
+        on_delete=models.CASCADE,
+        related_name="eventos",
+    )
+
+    autor = models.ForeignKey(
+        Empleado,
+        db_column="rut_autor",
+        to_field="rut",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="eventos_ot",
+    )
+    # Copia del nombre/cargo al momento del evento (el Empleado puede cambiar)
+    autor_nombre = models.CharField(max_length=255, blank=True, default="")
+    cargo = models.CharField(max_length=50, blank=True, default="")
+
+    estado_desde = models.CharField(max_length=50, null=True, blank=True)
+    estado_hasta = models.CharField(max_length=50, null=True, blank=True)
+    comentario = models.TextField(blank=True, default="")
+
+    creado_en = models.DateTimeField()
+
+    def __str__(self):
+        return f"OT {self.ot_id} · {self.estado_desde} → {self.estado_hasta} ({self.autor_nombre})"
+
+
+# ===========================================
+# TABLA: PUNTERO A LA OT ACTUAL DEL VEHÍCULO
+# ===========================================
+class VehiculoOTActual(models.Model):
+    """
+    Una fila por vehículo con su OT activa y su última OT.
+
+    Evita buscar en ordenestrabajo por patente + estado con ORDER BY (o el
+    GROUP BY MAX(ot_id) de api_ultimas_ot): la OT actual se lee por PK. La
+    PK (patente) con una sola columna ot_activa_id es lo que impide dos OTs
+    activas para el mismo vehículo. Ver ordenestrabajo/punteros.py.
+
+    Tabla creada con `python manage.py reparar_punteros_ot` (o el DDL de
+    ordenestrabajo/sql/vehiculo_ot_actual.sql).
+    """
+    class Meta:
+        managed = False
+        db_table = "vehiculo_ot_actual"
+
+    vehiculo = models.OneToOneField(
+        Vehiculo,
+        db_column="patente",
+        to_field="patente",
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="puntero_ot",
+    )
+
+    # NULL = el vehículo no tiene OT activa
+    ot_activa = models.OneToOneField(
+        OrdenTrabajo,
+        db_column="ot_activa_id",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="puntero_activo",
+    )
+
+    # Última OT creada (mayor ot_id), activa o no
+    ultima_ot = models.OneToOneField(
+        OrdenTrabajo,
+        db_column="ultima_ot_id",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="puntero_ultima",
+    )
+
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.vehiculo_id}: activa={self.ot_activa_id} última={self.ultima_ot_id}"
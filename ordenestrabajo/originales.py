@@ -0,0 +1,53 @@
+# ordenestrabajo/originales.py
+"""
+Valores "originales" de una OT (los últimos leídos o escritos en la BD).
+
+Los receptores de post_save / post_delete que necesitan saber qué cambió
+(KPIs en reportes.kpis, caché de la agenda, versiones de los ETag en
+utils.versiones) comparan la instancia contra esta copia, que se guarda
+una sola vez para todos:
+
+- al cargar la OT desde la BD (OrdenTrabajo.from_db, sin señales), si
+  trae todos los CAMPOS: con .only() / .defer() sobre alguno de ellos no
+  se copia nada, y los listados con .values() no crean instancias;
+- en OrdenTrabajo.save(): si falta, se lee de la BD antes de guardar (una
+  consulta) y después de los post_save se reemplaza por lo guardado;
+- con `refrescar(ot)` cuando se escribe con UPDATE directo (máquina de
+  estados), para que un save() posterior no vuelva a aplicar el cambio.
+"""
+CAMPOS = ("estado", "fecha_salida", "recinto_id", "rut_id", "fecha_ingreso", "hora_ingreso")
+
+_CAMPOS = frozenset(CAMPOS)
+
+_ATRIBUTO = "_originales"
+
+
+def refrescar(instance):
+    """Toma los valores actuales de la instancia como originales."""
+    datos = instance.__dict__
+    try:
+        datos[_ATRIBUTO] = {campo: datos[campo] for campo in CAMPOS}
+    except KeyError:
+        # Campo diferido: sin copia (save() la lee de la BD si hace falta)
+        datos.pop(_ATRIBUTO, None)
+
+
+def al_cargar(instance, field_names):
+    """Copia de los valores recién leídos (desde from_db)."""
+    if _CAMPOS.issubset(field_names):
+        datos = instance.__dict__
+        datos[_ATRIBUTO] = {campo: datos[campo] for campo in CAMPOS}
+
+
+def de(instance):
+    """{campo: valor} original de la OT, o None (OT nueva o sin copia)."""
+    return instance.__dict__.get(_ATRIBUTO)
+
+
+def cargar(instance):
+    """Lee los originales de la BD si la instancia no los tiene (antes de save())."""
+    if instance.pk is None or _ATRIBUTO in instance.__dict__:
+        return
+    fila = type(instance)._base_manager.filter(pk=instance.pk).values(*CAMPOS).first()
+    if fila:
+        instance.__dict__[_ATRIBUTO] = fila
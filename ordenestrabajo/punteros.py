@@ -0,0 +1,177 @@
+# ordenestrabajo/punteros.py
+"""
+Puntero a la OT activa y a la última OT de cada vehículo (vehiculo_ot_actual).
+
+Las vistas calientes (ficha, control de acceso, cambio de estado, registro
+taller) preguntan "¿cuál es la OT actual de esta patente?". En vez de
+filtrar ordenestrabajo por patente + estado y ordenar, se lee la fila del
+vehículo por PK y se une a la OT por PK.
+
+Mantenimiento:
+
+- `tomar(ot)` apunta el vehículo a una OT nueva con un UPDATE condicional
+  (WHERE ot_activa_id IS NULL OR ot_activa_id = ?). Si el vehículo ya
+  tiene otra OT activa no se escribe nada y se lanza OTActivaExistente:
+  la BD decide, no una lectura previa. El post_save de la OT lo llama en
+  cada save() de una OT activa, así que el error corta ese save().
+- Cuando la OT deja de estar activa se limpia ot_activa_id solo si sigue
+  apuntando a esa OT: en la transacción de estados.aplicar_transicion
+  (junto con el cambio de estado) o en post_save.
+- Al borrar una OT, el SET_NULL de las FK limpia el puntero y se recalcula
+  la última OT.
+
+Si el puntero se desalinea (cargas por SQL, tabla nueva) se reconstruye con
+`python manage.py reparar_punteros_ot`.
+"""
+from django.db.models import Max, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .estados import ESTADOS_ACTIVOS
+from .models import OrdenTrabajo, VehiculoOTActual
+
+
+class OTActivaExistente(Exception):
+    """El vehículo ya tiene otra OT activa."""
+
+    def __init__(self, patente, ot_id):
+        self.patente, self.ot_id = patente, ot_id
+        super().__init__(f"Ya existe una OT activa #{ot_id} para {patente}.")
+
+
+# ==========================================================
+# LECTURA
+# ==========================================================
+def ot_activa(patente):
+    """
+    QuerySet con la OT activa del vehículo (0 o 1 fila), para encadenar
+    select_related/defer. Lectura por PK del puntero + PK de la OT.
+    """
+    return OrdenTrabajo.objects.filter(puntero_activo__vehiculo_id=patente)
+
+
+def puntero(patente, *relacionados):
+    """Fila VehiculoOTActual del vehículo (o None), con select_related opcional."""
+    return (
+        VehiculoOTActual.objects
+        .select_related(*relacionados)
+        .filter(vehiculo_id=patente)
+        .first()
+    )
+
+
+def ot_actual_o_ultima(patente):
+    """OT activa del vehículo o, si no tiene, su última OT (una consulta)."""
+    fila = puntero(patente, "ot_activa", "ultima_ot")
+    if not fila:
+        return None
+    return fila.ot_activa or fila.ultima_ot
+
+
+# ==========================================================
+# ESCRITURA
+# ==========================================================
+def _activa_en_tabla(patente, excluir=None):
+    """OT activa más reciente según ordenestrabajo (solo al crear el puntero)."""
+    return (
+        OrdenTrabajo.objects
+        .filter(patente_id=patente, estado__in=ESTADOS_ACTIVOS)
+        .exclude(ot_id=excluir)
+        .order_by("-fecha_ingreso", "-hora_ingreso", "-ot_id")
+        .values_list("ot_id", flat=True)
+        .first()
+    )
+
+
+def _asegurar_fila(patente, excluir=None):
+    """
+    Crea la fila del vehículo si no existe, inicializada desde
+    ordenestrabajo (vehículos anteriores al puntero o cargados por SQL).
+    """
+    if VehiculoOTActual.objects.filter(vehiculo_id=patente).exists():
+        return
+    VehiculoOTActual.objects.get_or_create(
+        vehiculo_id=patente,
+        defaults={
+            "ot_activa_id": _activa_en_tabla(patente, excluir),
+            "ultima_ot_id": (
+                OrdenTrabajo.objects.filter(patente_id=patente)
+                .exclude(ot_id=excluir)
+                .aggregate(m=Max("ot_id"))["m"]
+            ),
+        },
+    )
+
+
+def _marcar_ultima(ot):
+    VehiculoOTActual.objects.filter(
+        Q(ultima_ot__isnull=True) | Q(ultima_ot_id__lt=ot.ot_id),
+        vehiculo_id=ot.patente_id,
+    ).update(ultima_ot_id=ot.ot_id, actualizado_en=timezone.now())
+
+
+def tomar(ot):
+    """
+    Apunta el vehículo de `ot` a esta OT como activa (y última).
+    Idempotente; lanza OTActivaExistente si hay otra OT activa.
+
+    Debe llamarse dentro de transaction.atomic() junto con la creación de
+    la OT, para que el conflicto deshaga todo.
+    """
+    patente = ot.patente_id
+    _asegurar_fila(patente, excluir=ot.ot_id)
+    _marcar_ultima(ot)
+
+    tomadas = VehiculoOTActual.objects.filter(
+        Q(ot_activa__isnull=True) | Q(ot_activa_id=ot.ot_id),
+        vehiculo_id=patente,
+    ).update(ot_activa_id=ot.ot_id, actualizado_en=timezone.now())
+    if not tomadas:
+        actual = (
+            VehiculoOTActual.objects.filter(vehiculo_id=patente)
+            .values_list("ot_activa_id", flat=True).first()
+        )
+        raise OTActivaExistente(patente, actual)
+
+
+def soltar(ot_id, patente):
+    """Limpia la OT activa del vehículo si todavía es `ot_id`."""
+    return VehiculoOTActual.objects.filter(
+        vehiculo_id=patente, ot_activa_id=ot_id,
+    ).update(ot_activa=None, actualizado_en=timezone.now())
+
+
+def _recalcular_ultima(patente):
+    ultima = (
+        OrdenTrabajo.objects.filter(patente_id=patente)
+        .aggregate(m=Max("ot_id"))["m"]
+    )
+    VehiculoOTActual.objects.filter(
+        vehiculo_id=patente, ultima_ot__isnull=True,
+    ).update(ultima_ot_id=ultima, actualizado_en=timezone.now())
+
+
+# ==========================================================
+# RECEPTORES
+# ==========================================================
+@receiver(post_save, sender=OrdenTrabajo)
+def _ot_post_save(sender, instance, created, **kwargs):
+    if instance.estado not in ESTADOS_ACTIVOS:
+        if created:
+            _asegurar_fila(instance.patente_id, excluir=instance.ot_id)
+            _marcar_ultima(instance)
+        else:
+            soltar(instance.ot_id, instance.patente_id)
+        return
+
+    # Toda OT activa toma el puntero, también fuera de la aprobación (admin,
+    # scripts). Si el vehículo ya tiene otra, OTActivaExistente sale del
+    # save() y la transacción deshace la OT: nunca quedan dos activas.
+    tomar(instance)
+
+
+@receiver(post_delete, sender=OrdenTrabajo)
+def _ot_post_delete(sender, instance, **kwargs):
+    _recalcular_ultima(instance.patente_id)
+
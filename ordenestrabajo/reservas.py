@@ -0,0 +1,104 @@
+# ordenestrabajo/reservas.py
+"""
+Reserva de horarios de la agenda con cupos por andén.
+
+Un bloque de la grilla del taller (ordenestrabajo/agenda.py) admite
+`agenda.cupos(taller)` OTs activas: la capacidad configurada del taller o,
+si no tiene, tantas como andenes (Taller) tenga el recinto. Es lo mismo que
+muestra agenda.matriz. Cada OT ocupa una fila de reservas_slot con la hora
+de INICIO del bloque (09:40 en bloques de 60 min reserva 09:00) y un número
+de andén; la UNIQUE (recinto, fecha, hora, andén) hace el arbitraje:
+
+- Se leen los andenes ya tomados (1 SELECT) y se intenta el INSERT en el
+  primer andén libre, dentro de un savepoint.
+- Si otra transacción ganó ese andén, el INSERT falla con IntegrityError
+  (la BD lo resuelve en esa misma sentencia, sin leer-y-luego-escribir) y
+  se prueba el siguiente. Sin andenes libres -> SlotOcupado; una hora
+  fuera de la grilla del taller -> FueraDeHorario.
+
+Debe llamarse dentro de transaction.atomic(): si la aprobación falla más
+adelante, el cupo se libera con el rollback.
+
+El cupo se libera cuando la OT deja de estar activa (post_save o
+`ot_estado_cambiado`) o se borra (CASCADE).
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from talleres.models import Taller
+
+from . import agenda
+from .estados import ESTADOS_ACTIVOS, ot_estado_cambiado
+from .models import OrdenTrabajo, ReservaSlot
+
+logger = logging.getLogger(__name__)
+
+
+class SlotOcupado(Exception):
+    """No quedan andenes libres en el horario pedido."""
+
+
+class FueraDeHorario(SlotOcupado):
+    """La hora no cae en ningún bloque de la grilla del taller."""
+
+
+def capacidad(recinto_id):
+    """Cupos por horario = andenes del recinto (mínimo 1)."""
+    return Taller.objects.filter(recinto_id=recinto_id).count() or 1
+
+
+def reservar(taller, fecha, hora, ot=None, cupos=None):
+    """
+    Toma un andén libre en el bloque del taller que contiene `hora` y
+    devuelve la ReservaSlot (con la hora de inicio del bloque).
+    Lanza SlotOcupado si el bloque está completo.
+    """
+    recinto_id = taller.recinto_id
+    inicio = agenda.bloque(taller.taller_id, hora)
+    if inicio is None:
+        raise FueraDeHorario(f"El horario {hora:%H:%M} está fuera de la agenda del taller.")
+    hora = inicio
+    cupos = cupos or agenda.cupos(taller)
+    tomados = set(
+        ReservaSlot.objects
+        .filter(recinto_id=recinto_id, fecha=fecha, hora=hora)
+        .values_list("anden", flat=True)
+    )
+
+    for anden in range(1, cupos + 1):
+        if anden in tomados:
+            continue
+        try:
+            with transaction.atomic():
+                return ReservaSlot.objects.create(
+                    recinto_id=recinto_id, fecha=fecha, hora=hora, anden=anden, ot=ot,
+                )
+        except IntegrityError:
+            # Otro supervisor tomó este andén entre la lectura y el INSERT
+            logger.debug("Andén %s ya tomado en %s %s (recinto %s)", anden, fecha, hora, recinto_id)
+
+    raise SlotOcupado(f"El horario {hora:%H:%M} del {fecha:%d-%m-%Y} ya está completo.")
+
+
+def asignar_ot(reserva, ot):
+    ReservaSlot.objects.filter(pk=reserva.pk).update(ot=ot)
+    reserva.ot = ot
+
+
+def liberar(ot_id):
+    return ReservaSlot.objects.filter(ot_id=ot_id).delete()[0]
+
+
+@receiver(post_save, sender=OrdenTrabajo)
+def _liberar_al_cerrar(sender, instance, created, **kwargs):
+    if not created and instance.estado not in ESTADOS_ACTIVOS:
+        liberar(instance.ot_id)
+
+
+@receiver(ot_estado_cambiado)
+def _liberar_en_transicion(sender, ot_id, hasta, **kwargs):
+    if hasta not in ESTADOS_ACTIVOS:
+        liberar(ot_id)
@@ -0,0 +1,19 @@
+-- ordenestrabajo/sql/ot_eventos.sql
+-- Bitácora de eventos de la OT (modelo ordenestrabajo.OTEvento).
+-- Equivale a `python manage.py backfill_eventos --solo-tabla`.
+
+CREATE TABLE IF NOT EXISTS ot_eventos (
+    evento_id     BIGINT NOT NULL AUTO_INCREMENT,
+    ot_id         INT NOT NULL,
+    rut_autor     VARCHAR(12) NULL,
+    autor_nombre  VARCHAR(255) NOT NULL DEFAULT '',
+    cargo         VARCHAR(50) NOT NULL DEFAULT '',
+    estado_desde  VARCHAR(50) NULL,
+    estado_hasta  VARCHAR(50) NULL,
+    comentario    LONGTEXT NOT NULL,
+    creado_en     DATETIME(6) NOT NULL,
+    PRIMARY KEY (evento_id),
+    KEY ix_evento_ot (ot_id, evento_id),
+    CONSTRAINT fk_evento_ot FOREIGN KEY (ot_id) REFERENCES ordenestrabajo (ot_id) ON DELETE CASCADE,
+    CONSTRAINT fk_evento_autor FOREIGN KEY (rut_autor) REFERENCES empleados (rut) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
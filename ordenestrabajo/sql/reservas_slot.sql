@@ -0,0 +1,18 @@
+-- ordenestrabajo/sql/reservas_slot.sql
+-- Cupos de la agenda por andén (modelo ordenestrabajo.ReservaSlot).
+-- Equivale a `python manage.py sincronizar_reservas --solo-tabla`.
+
+CREATE TABLE IF NOT EXISTS reservas_slot (
+    reserva_id  INT NOT NULL AUTO_INCREMENT,
+    recinto_id  INT NOT NULL,
+    fecha       DATE NOT NULL,
+    hora        TIME(6) NOT NULL,
+    anden       SMALLINT UNSIGNED NOT NULL,
+    ot_id       INT NULL,
+    creado_en   DATETIME(6) NOT NULL,
+    PRIMARY KEY (reserva_id),
+    UNIQUE KEY uq_reserva_slot (recinto_id, fecha, hora, anden),
+    UNIQUE KEY uq_reserva_ot (ot_id),
+    CONSTRAINT fk_reserva_recinto FOREIGN KEY (recinto_id) REFERENCES recinto (recinto_id),
+    CONSTRAINT fk_reserva_ot FOREIGN KEY (ot_id) REFERENCES ordenestrabajo (ot_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
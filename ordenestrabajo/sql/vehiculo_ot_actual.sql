@@ -0,0 +1,16 @@
+-- ordenestrabajo/sql/vehiculo_ot_actual.sql
+-- OT activa y última OT de cada vehículo (modelo ordenestrabajo.VehiculoOTActual).
+-- Equivale a `python manage.py reparar_punteros_ot --solo-tabla`.
+
+CREATE TABLE IF NOT EXISTS vehiculo_ot_actual (
+    patente         VARCHAR(20) NOT NULL,
+    ot_activa_id    INT NULL,
+    ultima_ot_id    INT NULL,
+    actualizado_en  DATETIME(6) NOT NULL,
+    PRIMARY KEY (patente),
+    UNIQUE KEY uq_puntero_ot_activa (ot_activa_id),
+    UNIQUE KEY uq_puntero_ultima_ot (ultima_ot_id),
+    CONSTRAINT fk_puntero_vehiculo FOREIGN KEY (patente) REFERENCES vehiculos (patente) ON DELETE CASCADE,
+    CONSTRAINT fk_puntero_ot_activa FOREIGN KEY (ot_activa_id) REFERENCES ordenestrabajo (ot_id) ON DELETE SET NULL,
+    CONSTRAINT fk_puntero_ultima_ot FOREIGN KEY (ultima_ot_id) REFERENCES ordenestrabajo (ot_id) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
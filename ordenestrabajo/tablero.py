@@ -0,0 +1,107 @@
+# ordenestrabajo/tablero.py
+"""
+Publicación de cambios del tablero de OTs por WebSocket (Channels).
+
+Cada recinto tiene su grupo `tablero_recinto_<id>`. Las vistas que mutan
+OTs / solicitudes / vehículos llaman a `publicar_*`; el envío se hace
+después del COMMIT para que el cliente, al recibir el delta, ya lea los
+datos nuevos. Si Redis no está disponible solo se registra en el log:
+la operación principal nunca falla por el tablero. Cada envío espera como
+mucho ENVIO_TIMEOUT y, tras un error, los envíos se omiten durante
+REDIS_PAUSA segundos (como la réplica de chat/historial.py).
+"""
+import asyncio
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Segundos que puede esperar un envío: corre dentro de la respuesta HTTP
+ENVIO_TIMEOUT = 0.5
+
+# Tras un error de Redis no se reintenta durante estos segundos (cada
+# respuesta esperaría el timeout)
+REDIS_PAUSA = 30
+
+_redis_caido_hasta = 0.0
+
+
+def grupo_recinto(recinto_id):
+    return f"tablero_recinto_{recinto_id}"
+
+
+def _redis_disponible():
+    return time.monotonic() >= _redis_caido_hasta
+
+
+def _redis_fallo(recinto_id, error):
+    global _redis_caido_hasta
+    _redis_caido_hasta = time.monotonic() + REDIS_PAUSA
+    logger.warning(
+        "No se pudo publicar evento de tablero (recinto=%s), pausa de %ss: %s",
+        recinto_id, REDIS_PAUSA, str(error) or type(error).__name__,
+    )
+
+
+async def _group_send(layer, grupo, mensaje):
+    # channels_redis no expone un timeout de socket solo para el envío
+    await asyncio.wait_for(layer.group_send(grupo, mensaje), ENVIO_TIMEOUT)
+
+
+def _enviar(recinto_id, data):
+    if not _redis_disponible():
+        return
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(_group_send)(
+            layer,
+            grupo_recinto(recinto_id),
+            {"type": "tablero.evento", "data": data},
+        )
+    except Exception as e:
+        _redis_fallo(recinto_id, e)
+
+
+def publicar(recinto_id, tipo, **datos):
+    """Encola un delta {tipo, ...datos} para el recinto (tras el commit)."""
+    if not recinto_id:
+        return
+    data = {"tipo": tipo, **datos}
+    transaction.on_commit(lambda: _enviar(recinto_id, data))
+
+
+def publicar_ot(ot, estado_anterior=None):
+    publicar(
+        ot.recinto_id,
+        "ot",
+        ot_id=ot.ot_id,
+        patente=ot.patente_id,
+        estado=ot.estado,
+        estado_anterior=estado_anterior,
+        rut_mecanico=ot.rut_id,
+    )
+
+
+def publicar_solicitud(solicitud, recinto_id):
+    publicar(
+        recinto_id,
+        "solicitud",
+        solicitud_id=solicitud.id,
+        patente=solicitud.vehiculo_id,
+        estado=solicitud.estado,
+    )
+
+
+def publicar_vehiculo(vehiculo, recinto_id):
+    publicar(
+        recinto_id,
+        "vehiculo",
+        patente=vehiculo.patente,
+        estado=vehiculo.estado,
+    )
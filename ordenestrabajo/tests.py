@@ -1,3 +1,287 @@
-from django.test import TestCase
+from datetime import date, time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from autenticacion.models import Empleado, sincronizar_grupo
+from reportes import kpis
+from talleres.models import Recinto, Taller
+from vehiculos.models import Vehiculo
+
+from . import punteros
+from .bitacora import parsear_bitacora
+from .estados import (
+    ESTADOS_FINALES,
+    TRANSICIONES,
+    TransicionConflicto,
+    TransicionInvalida,
+    aplicar_transicion,
+    validar,
+)
+from .models import OrdenTrabajo, OTEvento, ReservaSlot, VehiculoOTActual
+from .reservas import FueraDeHorario, SlotOcupado, reservar
+
+ESTADOS = [estado for estado, _ in OrdenTrabajo.ESTADO_OT_CHOICES]
+
+
+class DatosBase(TestCase):
+    """Un recinto con dos andenes, un supervisor, un mecánico y dos vehículos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recinto = Recinto.objects.create(nombre="Renca", ubicacion="Renca", jefe_recinto="Jefe")
+        cls.taller = Taller.objects.create(encargado_taller="Andén 1", recinto=cls.recinto)
+        Taller.objects.create(encargado_taller="Andén 2", recinto=cls.recinto)
+        cls.supervisor = Empleado.objects.create(
+            rut="11111111-1", nombre="Sofía", cargo="SUPERVISOR", usuario="sup",
+            password="-", recinto=cls.recinto,
+        )
+        cls.mecanico = Empleado.objects.create(
+            rut="22222222-2", nombre="Mario", cargo="MECANICO", usuario="mec",
+            password="-", recinto=cls.recinto,
+        )
+        cls.vehiculo = Vehiculo.objects.create(patente="AB1234", marca="Volvo", modelo="FH", estado="En Recinto")
+        cls.otro_vehiculo = Vehiculo.objects.create(patente="CD5678", marca="Volvo", modelo="FM")
+        # Los deltas de KPIs van en on_commit, que setUpTestData no ejecuta
+        kpis.reconstruir()
+
+    def setUp(self):
+        # Roles, empleado por sesión y versiones viven en la caché, no en la BD
+        cache.clear()
+
+    def crear_ot(self, estado="Pendiente", vehiculo=None, **campos):
+        # Con los efectos de después del COMMIT (KPIs, versiones, agenda)
+        with self.captureOnCommitCallbacks(execute=True):
+            return OrdenTrabajo.objects.create(
+                fecha_ingreso=campos.pop("fecha_ingreso", date(2030, 1, 7)),
+                hora_ingreso=campos.pop("hora_ingreso", time(10, 0)),
+                estado=estado,
+                patente=vehiculo or self.vehiculo,
+                recinto=self.recinto,
+                rut=self.mecanico,
+                rut_creador=self.supervisor,
+                **campos,
+            )
+
+    def cliente(self, empleado):
+        user = User.objects.create(username=empleado.usuario)
+        sincronizar_grupo(empleado, user)
+        self.client.force_login(user)
+        return self.client
+
+
+# ==========================================================
+# MÁQUINA DE ESTADOS
+# ==========================================================
+class MatrizTransicionesTests(SimpleTestCase):
+    def test_solo_las_transiciones_de_la_matriz(self):
+        for desde in ESTADOS:
+            for hasta in ESTADOS:
+                with self.subTest(desde=desde, hasta=hasta):
+                    if hasta in TRANSICIONES.get(desde, []):
+                        validar(desde, hasta)
+                    else:
+                        with self.assertRaises(TransicionInvalida):
+                            validar(desde, hasta)
+
+    def test_estados_finales_no_tienen_salida(self):
+        for estado in ESTADOS_FINALES:
+            self.assertNotIn(estado, TRANSICIONES)
+
+    def test_pausado_no_finaliza_directo(self):
+        with self.assertRaises(TransicionInvalida):
+            validar("Pausado", "Finalizado")
+
+
+class AplicarTransicionTests(DatosBase):
+    def test_cambia_ot_vehiculo_y_bitacora(self):
+        ot = self.crear_ot()
+        with self.captureOnCommitCallbacks(execute=True):
+            desde = aplicar_transicion(ot, "En Taller", self.mecanico, "recibido")
+
+        self.assertEqual(desde, "Pendiente")
+        self.assertEqual(OrdenTrabajo.objects.get(pk=ot.pk).estado, "En Taller")
+        self.assertEqual(Vehiculo.objects.get(pk="AB1234").estado, "En Taller")
+        evento = OTEvento.objects.get(ot=ot, estado_hasta="En Taller")
+        self.assertEqual((evento.estado_desde, evento.comentario), ("Pendiente", "recibido"))
+
+    def test_regla_del_vehiculo_no_escribe_nada(self):
+        ot = self.crear_ot(vehiculo=self.otro_vehiculo)  # Disponible: el guardia no lo ingresó
+        with self.assertRaises(TransicionInvalida):
+            aplicar_transicion(ot, "En Taller", self.mecanico, "recibido")
+
+        self.assertEqual(OrdenTrabajo.objects.get(pk=ot.pk).estado, "Pendiente")
+        self.assertFalse(OTEvento.objects.filter(ot=ot).exists())
+
+    def test_cierre_registra_salida_y_suelta_el_puntero(self):
+        ot = self.crear_ot(estado="En Proceso")
+        with self.captureOnCommitCallbacks(execute=True):
+            aplicar_transicion(ot, "Finalizado", self.mecanico, "listo")
+
+        ot.refresh_from_db()
+        self.assertEqual(ot.fecha_salida, date.today())
+        self.assertIsNone(VehiculoOTActual.objects.get(vehiculo_id="AB1234").ot_activa_id)
+
+    def test_instancia_vieja_lanza_conflicto(self):
+        ot = self.crear_ot(estado="En Proceso")
+        vieja = OrdenTrabajo.objects.get(pk=ot.pk)
+        aplicar_transicion(ot, "Pausado", self.mecanico, "espera")
+
+        with self.assertRaises(TransicionConflicto) as ctx:
+            aplicar_transicion(vieja, "Finalizado", self.mecanico, "listo")
+
+        self.assertEqual((ctx.exception.esperado, ctx.exception.actual), ("En Proceso", "Pausado"))
+        self.assertEqual(OrdenTrabajo.objects.get(pk=ot.pk).estado, "Pausado")
+        self.assertEqual(OTEvento.objects.filter(ot=ot).count(), 1)
+
+    def test_api_responde_409_si_otro_cambio_la_ot(self):
+        ot = self.crear_ot(estado="En Proceso")
+        cliente = self.cliente(self.mecanico)
+
+        def otro_usuario_primero(instancia, hasta, *args, **kwargs):
+            # Otro usuario cambia la OT entre la lectura de la vista y el UPDATE
+            aplicar_transicion(OrdenTrabajo.objects.get(pk=instancia.pk), "Pausado", self.supervisor, "espera")
+            return aplicar_transicion(instancia, hasta, *args, **kwargs)
+
+        with mock.patch("ordenestrabajo.api_views_estado.aplicar_transicion", otro_usuario_primero):
+            response = cliente.post(
+                reverse("ordenestrabajo:api_cambiar_estado"),
+                {"patente": "AB-1234", "estado": "Finalizado", "comentario": "listo"},
+            )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()["success"])
+        self.assertEqual(OrdenTrabajo.objects.get(pk=ot.pk).estado, "Pausado")
+
+
+# ==========================================================
+# PUNTERO A LA OT ACTIVA
+# ==========================================================
+class PunterosTests(DatosBase):
+    def test_crear_ot_activa_toma_el_puntero(self):
+        ot = self.crear_ot()
+
+        fila = VehiculoOTActual.objects.get(vehiculo_id="AB1234")
+        self.assertEqual((fila.ot_activa_id, fila.ultima_ot_id), (ot.ot_id, ot.ot_id))
+        self.assertEqual(punteros.ot_activa("AB1234").get(), ot)
+
+    def test_segunda_ot_activa_se_deshace(self):
+        primera = self.crear_ot()
+        with self.assertRaises(punteros.OTActivaExistente) as ctx:
+            self.crear_ot()
+
+        self.assertEqual(ctx.exception.ot_id, primera.ot_id)
+        self.assertEqual(list(OrdenTrabajo.objects.filter(patente_id="AB1234")), [primera])
+        fila = VehiculoOTActual.objects.get(vehiculo_id="AB1234")
+        self.assertEqual((fila.ot_activa_id, fila.ultima_ot_id), (primera.ot_id, primera.ot_id))
+
+    def test_cierre_suelta_el_puntero_en_la_transaccion(self):
+        ot = self.crear_ot(estado="En Proceso")
+        # Sin ejecutar los efectos de después del COMMIT
+        with self.captureOnCommitCallbacks(execute=False):
+            aplicar_transicion(ot, "Finalizado", self.mecanico, "listo")
+
+            self.assertIsNone(VehiculoOTActual.objects.get(vehiculo_id="AB1234").ot_activa_id)
+
+    def test_cierre_deshecho_conserva_el_puntero(self):
+        ot = self.crear_ot(estado="En Proceso")
+        with mock.patch("ordenestrabajo.estados.registrar_evento", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                aplicar_transicion(ot, "Finalizado", self.mecanico, "listo")
+
+        self.assertEqual(VehiculoOTActual.objects.get(vehiculo_id="AB1234").ot_activa_id, ot.ot_id)
+
+    def test_soltar_solo_si_sigue_apuntando(self):
+        primera = self.crear_ot(estado="En Proceso")
+        with self.captureOnCommitCallbacks(execute=True):
+            aplicar_transicion(primera, "Finalizado", self.mecanico, "listo")
+        segunda = self.crear_ot()
+
+        self.assertEqual(punteros.soltar(primera.ot_id, "AB1234"), 0)
+        fila = VehiculoOTActual.objects.get(vehiculo_id="AB1234")
+        self.assertEqual((fila.ot_activa_id, fila.ultima_ot_id), (segunda.ot_id, segunda.ot_id))
+        self.assertEqual(punteros.ot_actual_o_ultima("AB1234"), segunda)
+
+    def test_ot_cerrada_queda_como_ultima(self):
+        cerrada = self.crear_ot(estado="Finalizado", fecha_salida=date(2030, 1, 9))
+
+        fila = VehiculoOTActual.objects.get(vehiculo_id="AB1234")
+        self.assertEqual((fila.ot_activa_id, fila.ultima_ot_id), (None, cerrada.ot_id))
+        self.assertEqual(punteros.ot_actual_o_ultima("AB1234"), cerrada)
+
+
+# ==========================================================
+# RESERVAS DE CUPOS
+# ==========================================================
+class ReservasTests(DatosBase):
+    fecha = date(2030, 1, 8)
+
+    def test_reserva_el_inicio_del_bloque(self):
+        primera = reservar(self.taller, self.fecha, time(9, 10))
+        segunda = reservar(self.taller, self.fecha, time(9, 50))
+
+        self.assertEqual((primera.hora, primera.anden), (time(9, 0), 1))
+        self.assertEqual((segunda.hora, segunda.anden), (time(9, 0), 2))
+        with self.assertRaises(SlotOcupado):
+            reservar(self.taller, self.fecha, time(9, 0))
+
+    def test_capacidad_configurada_del_taller(self):
+        with override_settings(AGENDA_POR_TALLER={self.taller.taller_id: {"capacidad": 1}}):
+            reservar(self.taller, self.fecha, time(11, 0))
+            with self.assertRaises(SlotOcupado):
+                reservar(self.taller, self.fecha, time(11, 30))
+
+    def test_hora_fuera_de_la_grilla(self):
+        with self.assertRaises(FueraDeHorario):
+            reservar(self.taller, self.fecha, time(7, 0))
+
+    def test_carrera_por_el_mismo_anden(self):
+        # Otra aprobación tomó el andén 1 después de la lectura de andenes
+        # libres: el INSERT choca con la UNIQUE y se usa el siguiente.
+        ReservaSlot.objects.create(recinto=self.recinto, fecha=self.fecha, hora=time(10, 0), anden=1)
+        with mock.patch("ordenestrabajo.reservas.set", return_value=set(), create=True):
+            reserva = reservar(self.taller, self.fecha, time(10, 0))
+
+            self.assertEqual(reserva.anden, 2)
+            with self.assertRaises(SlotOcupado):
+                reservar(self.taller, self.fecha, time(10, 0))
+
+        self.assertEqual(
+            sorted(ReservaSlot.objects.filter(fecha=self.fecha).values_list("anden", flat=True)),
+            [1, 2],
+        )
+
+
+# ==========================================================
+# BITÁCORA ANTIGUA
+# ==========================================================
+class ParsearBitacoraTests(SimpleTestCase):
+    def test_cargo_y_nombre(self):
+        self.assertEqual(
+            parsear_bitacora("[Mecánico Juan Pérez] cambio de aceite"),
+            [("Mecánico", "Juan Pérez", "cambio de aceite")],
+        )
+
+    def test_etiqueta_sin_cargo(self):
+        self.assertEqual(parsear_bitacora("[jperez] ok"), [("", "jperez", "ok")])
+
+    def test_cargo_en_mayusculas(self):
+        self.assertEqual(
+            parsear_bitacora("[SUPERVISOR Ana Díaz] aprobada"),
+            [("SUPERVISOR", "Ana Díaz", "aprobada")],
+        )
+
+    def test_lineas_sin_etiqueta(self):
+        texto = "motivo inicial\n[Supervisor Ana] aprobada\nsigue en otra línea\n\n[Usuario pepe] ok"
+        self.assertEqual(parsear_bitacora(texto), [
+            ("", "", "motivo inicial"),
+            ("Supervisor", "Ana", "aprobada\nsigue en otra línea"),
+            ("Usuario", "pepe", "ok"),
+        ])
+
+    def test_vacio(self):
+        self.assertEqual(parsear_bitacora(None), [])
+        self.assertEqual(parsear_bitacora(""), [])
@@ -18,6 +18,7 @@ urlpatterns = [
 
     # Agenda / creación OT / últimas / asignación
     path("agenda/slots/", api_views.api_agenda_slots, name="api_agenda_slots"),
+    path("agenda/matriz/", api_views.api_agenda_matriz, name="api_agenda_matriz"),
     path("ingresos/create/", api_views.api_crear_ingreso, name="api_crear_ingreso"),
     path("ultimas/", api_views.api_ultimas_ot, name="api_ultimas_ot"),
     path("asignar/", api_views.api_asignar_ot, name="api_asignar_ot"),
@@ -40,4 +41,7 @@ urlpatterns = [
     path('<int:ot_id>/pausas/start/', views.pausa_start, name='pausa-start'),
     path('<int:ot_id>/pausas/stop/', views.pausa_stop, name='pausa-stop'),
     path('<int:ot_id>/pausas/', views.pausa_list, name='pausa-list'),
+
+    # Bitácora
+    path('<int:ot_id>/eventos/', api_views.api_ot_eventos, name='api_ot_eventos'),
 ]
@@ -7,9 +7,10 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST, require_GET
 
-from autenticacion.models import Empleado
+from autenticacion.middleware import get_empleado
 from vehiculos.models import Vehiculo
 from .models import OrdenTrabajo, Pausa  # Taller ya no es necesario aquí
+from .estados import TransicionConflicto, aplicar_transicion
 
 ACTIVE_STATES = ["Pendiente", "En Proceso", "En Taller"]
 
@@ -104,15 +105,8 @@ def pausa_list(request, ot_id):
 # ==========================================================
 @login_required
 def ingresos_en_curso_api(request):
-    user = request.user
-
     # Antes usábamos taller; ahora trabajamos por RECINTO
-    empleado = (
-        Empleado.objects
-        .select_related("recinto")
-        .filter(usuario=user.username)
-        .first()
-    )
+    empleado = get_empleado(request)
 
     if not empleado:
         return JsonResponse(
@@ -155,7 +149,7 @@ def ingresos_en_curso_api(request):
 @login_required
 @require_POST
 def ingreso_finalizar_api(request, ot_id):
-    ot = get_object_or_404(OrdenTrabajo, ot_id=ot_id)
+    ot = get_object_or_404(OrdenTrabajo.objects.defer("descripcion"), ot_id=ot_id)
 
     if ot.estado == "Finalizado":
         return JsonResponse(
@@ -163,14 +157,7 @@ def ingreso_finalizar_api(request, ot_id):
             status=400
         )
 
-    ot.estado = "Finalizado"
-    ot.save()
-
-    if ot.patente:
-        ot.patente.estado = "Disponible"
-        ot.patente.save()
-
-    return JsonResponse({"success": True})
+    return _cerrar_ot(request, ot, "Finalizado")
 
 
 # ==========================================================
@@ -179,7 +166,7 @@ def ingreso_finalizar_api(request, ot_id):
 @login_required
 @require_POST
 def ingreso_cancelar_api(request, ot_id):
-    ot = get_object_or_404(OrdenTrabajo, ot_id=ot_id)
+    ot = get_object_or_404(OrdenTrabajo.objects.defer("descripcion"), ot_id=ot_id)
 
     if ot.estado == "Finalizado":
         return JsonResponse(
@@ -187,11 +174,17 @@ def ingreso_cancelar_api(request, ot_id):
             status=400
         )
 
-    ot.estado = "Cancelado"
-    ot.save()
+    return _cerrar_ot(request, ot, "Cancelado")
 
-    if ot.patente:
-        ot.patente.estado = "Disponible"
-        ot.patente.save()
+
+def _cerrar_ot(request, ot, estado):
+    """Cierre administrativo: fuera de la matriz, pero con compare-and-swap."""
+    try:
+        aplicar_transicion(
+            ot, estado, get_empleado(request), nombre=request.user.username,
+            validar_matriz=False, reglas=False,
+        )
+    except TransicionConflicto as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=409)
 
     return JsonResponse({"success": True})
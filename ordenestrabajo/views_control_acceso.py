@@ -4,13 +4,15 @@ from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 
 from autenticacion.models import Empleado
+from autenticacion.middleware import get_empleado
 from vehiculos.models import Vehiculo
 from .models import (
     ControlAcceso,
     DesignacionVehicular,
-    OrdenTrabajo,
     SolicitudIngresoVehiculo,
 )
+from . import punteros
+from .tablero import publicar_vehiculo
 
 # Estados de OT que permiten salida SIN forzar
 ESTADOS_LIBERACION_OT = ["Finalizado", "No Reparable", "Sin Repuestos"]
@@ -20,13 +22,6 @@ ESTADO_VEHICULO_FUERA = "Disponible"
 ESTADO_VEHICULO_DENTRO = "En Recinto"
 
 
-def _empleado_desde_user(user):
-    try:
-        return Empleado.objects.select_related("recinto").get(usuario=user.username)
-    except Empleado.DoesNotExist:
-        return None
-
-
 def _normalizar_patente(p):
     if not p:
         return ""
@@ -40,7 +35,7 @@ def _normalizar_patente(p):
 
 @login_required
 def control_acceso_guardia(request):
-    empleado = _empleado_desde_user(request.user)
+    empleado = get_empleado(request)
 
     ctx = {
         "empleado": empleado,
@@ -48,7 +43,7 @@ def control_acceso_guardia(request):
         "vehiculo": None,
         "designacion": None,
         "control_abierto": None,
-        "ot": None,                 # OT más reciente del vehículo
+        "ot": None,                 # OT activa o, si no hay, la última del vehículo
         "solicitud_ingreso": None,  # última solicitud para este vehículo
 
         "entrada_error": "",
@@ -108,12 +103,7 @@ def control_acceso_guardia(request):
                     .order_by("-fecha_ingreso", "-control_id")
                     .first()
                 )
-                ot = (
-                    OrdenTrabajo.objects
-                    .filter(patente=vehiculo)
-                    .order_by("-fecha_ingreso", "-hora_ingreso", "-ot_id")
-                    .first()
-                )
+                ot = punteros.ot_actual_o_ultima(vehiculo.patente)
                 # última solicitud de ingreso en el recinto del guardia
                 solicitud_ingreso = (
                     SolicitudIngresoVehiculo.objects
@@ -175,12 +165,7 @@ def control_acceso_guardia(request):
                 .order_by("-fecha_ingreso", "-control_id")
                 .first()
             )
-            ot = (
-                OrdenTrabajo.objects
-                .filter(patente=vehiculo)
-                .order_by("-fecha_ingreso", "-hora_ingreso", "-ot_id")
-                .first()
-            )
+            ot = punteros.ot_actual_o_ultima(vehiculo.patente)
             solicitud_ingreso = (
                 SolicitudIngresoVehiculo.objects
                 .select_related("vehiculo", "chofer", "taller")
@@ -309,6 +294,7 @@ def control_acceso_guardia(request):
         if empleado and empleado.recinto and hasattr(empleado.recinto, "ubicacion"):
             vehiculo.ubicacion = empleado.recinto.ubicacion
         vehiculo.save(update_fields=["estado", "ubicacion"])
+        publicar_vehiculo(vehiculo, empleado.recinto_id)
 
         ctx["entrada_ok"] = (
             f"Ingreso registrado correctamente para {vehiculo.patente}. "
@@ -409,6 +395,7 @@ def control_acceso_guardia(request):
         # Marcamos el vehículo como "fuera del recinto"
         vehiculo.estado = ESTADO_VEHICULO_FUERA  # -> "Disponible"
         vehiculo.save(update_fields=["estado"])
+        publicar_vehiculo(vehiculo, empleado.recinto_id)
 
         ctx["salida_ok"] = (
             f"Salida registrada correctamente para {vehiculo.patente}. "
@@ -2,15 +2,21 @@ import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
-import chat.routing
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pepsico_taller.settings")
 
 django_asgi_app = get_asgi_application()
 
+# Las rutas WebSocket importan modelos: van después de inicializar Django
+import chat.routing  # noqa: E402
+import ordenestrabajo.routing  # noqa: E402
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(chat.routing.websocket_urlpatterns)
+        URLRouter(
+            chat.routing.websocket_urlpatterns
+            + ordenestrabajo.routing.websocket_urlpatterns
+        )
     ),
 })
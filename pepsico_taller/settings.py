@@ -3,6 +3,7 @@ pymysql.install_as_MySQLdb()
 
 from decouple import config
 import os
+import tempfile
 from pathlib import Path
 
 # ======================
@@ -47,12 +48,16 @@ INSTALLED_APPS = [
 # 🔹 MIDDLEWARE
 # ======================
 MIDDLEWARE = [
+    'utils.metricas.MetricasMiddleware',  # latencia/SQL por vista (/metrics), va primero
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'autenticacion.middleware.EmpleadoMiddleware',  # request.empleado (perezoso)
+    'autenticacion.middleware.SesionDeslizanteMiddleware',  # renueva expiración con throttle
+    'utils.perfilador.PerfiladorMiddleware',  # ?_perfilar=1 / X-Perfilar (staff)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,7 +69,8 @@ ROOT_URLCONF = 'pepsico_taller.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + tiempo de render por vista (utils/metricas.py)
+        'BACKEND': 'utils.metricas.DjangoTemplatesMedidas',
         'DIRS': [BASE_DIR / 'templates'],  # usa /templates del proyecto
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,28 +85,67 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'pepsico_taller.wsgi.application'
+
+# ======================
+# 🔹 MÉTRICAS (/metrics, utils/metricas.py)
+# ======================
+# Cada worker vuelca sus métricas a METRICAS_DIR/<pid>.json cada
+# METRICAS_INTERVALO segundos; /metrics suma los de todos los procesos.
+METRICAS_DIR = config('METRICAS_DIR', default=os.path.join(tempfile.gettempdir(), 'pepsico_metricas'))
+METRICAS_INTERVALO = config('METRICAS_INTERVALO', default=5, cast=float)
+# Con token, Prometheus debe enviar "Authorization: Bearer <token>"
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+# Sin token: solo staff. Aceptar además 127.0.0.1 / ::1 solo si nada hace
+# de proxy en el mismo host (detrás de nginx todos los requests son locales)
+METRICAS_CONFIAR_LOCAL = config('METRICAS_CONFIAR_LOCAL', default=False, cast=bool)
+# Respuestas con header Server-Timing (db / cache / render / app / total)
+SERVER_TIMING_PREFIJOS = ('/api/', '/reportes/api/', '/vehiculos/api/', '/chat/api/')
+# Requests lentos al log `utils.metricas.lentos`: umbral y fracción registrada
+LENTOS_MS = config('LENTOS_MS', default=1000, cast=int)
+LENTOS_MUESTREO = config('LENTOS_MUESTREO', default=0.2, cast=float)
+
+# Perfiles de requests (?_perfilar=1, utils/perfilador.py): carpeta y
+# cantidad de capturas que se conservan (las más antiguas se borran)
+PERFILES_DIR = config('PERFILES_DIR', default=os.path.join(tempfile.gettempdir(), 'pepsico_perfiles'))
+PERFILES_MAX = config('PERFILES_MAX', default=50, cast=int)
 ASGI_APPLICATION = 'pepsico_taller.asgi.application'  # 👈 NUEVO: Channels usa ASGI
 
 # ======================
 # 🔹 BASE DE DATOS (MySQL)
 # ======================
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': config('DB_NAME'),
-        'USER': config('DB_USER'),
-        'PASSWORD': config('DB_PASSWORD'),
-        'HOST': config('DB_HOST'),
-        'PORT': config('DB_PORT'),
-        'OPTIONS': {
-            'charset': 'utf8mb4',
-            'init_command': (
-                "SET sql_mode='STRICT_TRANS_TABLES', "
-                "NAMES 'utf8mb4' COLLATE 'utf8mb4_0900_ai_ci'"
-            ),
-        },
+# DB_ENGINE=sqlite usa un archivo local (DB_SQLITE_PATH) en vez de MySQL:
+# pensado para `generar_flota` / `bench_endpoints` en una máquina de desarrollo.
+DB_ENGINE = config('DB_ENGINE', default='mysql')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_SQLITE_PATH', default=str(BASE_DIR / 'bench.sqlite3')),
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': config('DB_NAME'),
+            'USER': config('DB_USER'),
+            'PASSWORD': config('DB_PASSWORD'),
+            'HOST': config('DB_HOST'),
+            'PORT': config('DB_PORT'),
+            'OPTIONS': {
+                'charset': 'utf8mb4',
+                'init_command': (
+                    "SET sql_mode='STRICT_TRANS_TABLES', "
+                    "NAMES 'utf8mb4' COLLATE 'utf8mb4_0900_ai_ci'"
+                ),
+            },
+        }
+    }
+
+# `manage.py test` crea también las tablas managed=False y usa caché y
+# channel layer en memoria (utils/pruebas.py): DB_ENGINE=sqlite python manage.py test
+TEST_RUNNER = 'utils.pruebas.Runner'
 
 # ======================
 # 🔹 AUTENTICACIÓN Y SESIÓN
@@ -111,6 +156,7 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 LOGIN_URL = 'inicio-sesion'
+LOGIN_LENTO_MS = config('LOGIN_LENTO_MS', default=800, cast=int)  # umbral de log de logins lentos
 LOGIN_REDIRECT_URL = 'inicio'
 LOGOUT_REDIRECT_URL = 'inicio-sesion'
 
@@ -124,6 +170,27 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Quién envía los archivos de /media/ después de revisar permisos
+# (documentos.views.servir_media):
+#   python     -> Django (Range/ETag); desarrollo o sin proxy
+#   x-accel    -> nginx, vía X-Accel-Redirect a MEDIA_INTERNAL_URL (location internal)
+#   x-sendfile -> Apache mod_xsendfile / lighttpd
+MEDIA_ENTREGA = config('MEDIA_ENTREGA', default='python')
+MEDIA_INTERNAL_URL = config('MEDIA_INTERNAL_URL', default='/protegido/')
+
+# Subidas: se cortan al pasar DOCUMENTOS_MAX_MB y van directo a un archivo
+# temporal (nunca completas en memoria). Ver documentos/almacenamiento.py
+DOCUMENTOS_MAX_MB = config('DOCUMENTOS_MAX_MB', default=25, cast=int)
+FILE_UPLOAD_HANDLERS = [
+    'documentos.almacenamiento.LimiteTamanoUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Miniaturas de documentos FOTO (lado máximo en px e hilos del pool por
+# proceso). Requieren Pillow; ver documentos/miniaturas.py
+MINIATURA_LADO = config('MINIATURA_LADO', default=320, cast=int)
+MINIATURAS_HILOS = config('MINIATURAS_HILOS', default=2, cast=int)
+
 # ======================
 # 🔹 CORS Y CSRF
 # ======================
@@ -141,16 +208,69 @@ CSRF_TRUSTED_ORIGINS = [
     "https://testeorepocaps.loca.lt",
 ]
 
+# ======================
+# 🔹 REDIS / CACHÉ
+# ======================
+# Mismo Redis que usa Channels. La caché va en otra base lógica (/1) para
+# no mezclar claves con los grupos de Channels.
+REDIS_URL = config('REDIS_URL', default='redis://127.0.0.1:6379')
+
+# CACHE_BACKEND=locmem permite levantar el proyecto sin Redis (desarrollo).
+# LocMem es por proceso: con varios workers una invalidación solo se ve en
+# el proceso que la hizo (el resto expira por TTL).
+if config('CACHE_BACKEND', default='redis') == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'utils.metricas.LocMemCacheMedida',  # LocMemCache + tiempos
+            'LOCATION': 'pepsico-taller',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'utils.metricas.RedisCacheMedida',  # RedisCache + tiempos
+            'LOCATION': f"{REDIS_URL}/1",
+            'KEY_PREFIX': 'pepsico',
+        }
+    }
+
+# Segundos que se cachean los grupos (roles) de cada usuario
+ROLES_CACHE_TTL = config('ROLES_CACHE_TTL', default=300, cast=int)
+
+# Segundos que se cachea el Empleado resuelto por sesión (request.empleado)
+EMPLEADO_CACHE_TTL = config('EMPLEADO_CACHE_TTL', default=60, cast=int)
+
+# Segundos que vive cada versión de recurso usada en los ETag de los paneles
+# (utils/versiones.py). Con LocMem es también lo máximo que otro proceso
+# puede seguir respondiendo 304 con datos viejos.
+VERSIONES_TTL = config('VERSIONES_TTL', default=86400, cast=int)
+
+# Segundos que se guarda cada tabla/payload renderizado (utils/fragmentos.py);
+# al cambiar los datos la clave cambia, el TTL solo limpia las viejas.
+FRAGMENTOS_TTL = config('FRAGMENTOS_TTL', default=600, cast=int)
+
+# Agenda: grilla por defecto y por taller ({taller_id: {...}}), y segundos
+# que se cachea la ocupación de cada (recinto, día).
+# capacidad None = un cupo por andén del recinto
+AGENDA_DEFAULT = {'inicio': '09:00', 'fin': '18:00', 'slot_min': 60, 'capacidad': None}
+AGENDA_POR_TALLER = {}
+AGENDA_CACHE_TTL = config('AGENDA_CACHE_TTL', default=600, cast=int)
+
 # ======================================================
 # 🔹 SESIONES Y COOKIES – Ajustes recomendados para MVP
 # ======================================================
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# cached_db: se lee desde Redis y la tabla django_session queda como respaldo
+# (solo se escribe cuando la sesión cambia).
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 SESSION_COOKIE_NAME = 'sessionid'
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = False           # True si usas HTTPS
 SESSION_COOKIE_SAMESITE = None          # necesario para fetch()
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
-SESSION_SAVE_EVERY_REQUEST = True
+# No se guarda en cada request: la expiración deslizante la renueva
+# SesionDeslizanteMiddleware como máximo una vez por ventana.
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_WINDOW = config('SESSION_REFRESH_WINDOW', default=300, cast=int)  # segundos
 
 CSRF_COOKIE_HTTPONLY = False
 CSRF_COOKIE_SECURE = False
@@ -184,7 +304,16 @@ CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
+            "hosts": [REDIS_URL],
         },
     },
 }
+
+# Chat: los mensajes se acumulan en memoria y se guardan con bulk_create cada
+# CHAT_BUFFER_MAX mensajes o CHAT_BUFFER_MS milisegundos (lo que ocurra
+# primero). Los últimos CHAT_REPLAY de cada sala quedan en una lista de Redis
+# (base lógica /2) para reenviarlos al conectarse.
+CHAT_BUFFER_MAX = config('CHAT_BUFFER_MAX', default=50, cast=int)
+CHAT_BUFFER_MS = config('CHAT_BUFFER_MS', default=500, cast=int)
+CHAT_REPLAY = config('CHAT_REPLAY', default=50, cast=int)
+CHAT_REDIS_URL = config('CHAT_REDIS_URL', default=f"{REDIS_URL}/2")
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 # ==========================================================
 # ✔ IMPORTS OFICIALES (CORRECTOS)
@@ -10,9 +10,10 @@ from vehiculos.views import ficha_vehiculo              # ficha vehículo REAL
 from reportes.views import reportes_page                # reportes REAL
 from ordenestrabajo.views_control_acceso import control_acceso_guardia
 from autenticacion.views_pages import control_acceso_page
+from documentos.views import servir_media
+from utils.metricas import metrics_view
 
 from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -75,11 +76,18 @@ urlpatterns = [
     path("control-acceso/", control_acceso_guardia, name="control-acceso"),
     path("control-acceso/", control_acceso_page, name="control-acceso"),
 
+    # ==========================================================
+    # MÉTRICAS (Prometheus, utils/metricas.py)
+    # ==========================================================
+    path('metrics', metrics_view, name='metrics'),
+
 ]
 
 
 # ==========================================================
-# SERVIR ARCHIVOS MEDIA EN DEBUG
+# ARCHIVOS MEDIA (con login y permisos, también en producción;
+# la transferencia la hace el proxy según MEDIA_ENTREGA)
 # ==========================================================
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += [
+    re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<nombre>.+)$", servir_media, name="media"),
+]
@@ -0,0 +1,144 @@
+# reportes/agregaciones.py
+"""
+Capa de agregación de los reportes.
+
+Todas las funciones devuelven estructuras planas (dict / list) y ejecutan
+un número CONSTANTE de consultas, independiente de la cantidad de recintos
+u OTs. Los contadores por recinto se calculan en una sola consulta agrupada
+con Count(filter=Q(...)) en lugar de una consulta por recinto/estado.
+"""
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+
+from ordenestrabajo.models import OrdenTrabajo
+from talleres.models import Recinto
+
+from . import kpis
+
+# Estados que el dashboard muestra como "en proceso"
+ESTADOS_EN_PROCESO = ["Pendiente", "En Proceso"]
+
+# Presupuesto de consultas por función (lo verifica `manage.py bench_reportes`)
+PRESUPUESTO_CONSULTAS = {
+    "resumen_global": 2,
+    "agregados_por_recinto": 1,
+}
+
+
+def _dias(duracion):
+    """timedelta -> días con 2 decimales (None si no hay dato)."""
+    return round(duracion.total_seconds() / 86400, 2) if duracion else None
+
+
+def resumen_global(dfrom=None, dto=None):
+    """
+    KPIs globales del dashboard.
+
+    Los contadores de vehículos/empleados (y de OTs sin rango de fechas) se
+    leen del snapshot materializado (reportes.kpis, 1 consulta). Solo el
+    conteo de OTs acotado por fecha_ingreso requiere una consulta extra.
+    """
+    snapshot = kpis.leer_kpis()
+
+    if dfrom and dto:
+        ordenes_activas = OrdenTrabajo.objects.filter(
+            fecha_ingreso__range=(dfrom, dto),
+            estado__in=ESTADOS_EN_PROCESO,
+        ).count()
+    else:
+        ordenes_activas = kpis.suma(snapshot, kpis.OTS_ESTADO, ESTADOS_EN_PROCESO)
+
+    return {
+        "vehiculos_totales": snapshot.get(kpis.VEHICULOS_TOTAL, 0),
+        "vehiculos_en_taller": snapshot.get(kpis.VEHICULOS_ESTADO + "En Taller", 0),
+        "ordenes_activas": ordenes_activas,
+        "empleados_activos": snapshot.get(kpis.EMPLEADOS_ACTIVOS, 0),
+    }
+
+
+def agregados_por_recinto():
+    """
+    Contadores por recinto en UNA consulta (Recinto LEFT JOIN ordenestrabajo
+    GROUP BY recinto). Incluye recintos sin OTs (contadores en 0).
+
+    Cada item trae:
+      taller_id, nombre, vehiculos_total, ots_pendientes, ots_en_proceso,
+      ots_finalizadas, ots_cerradas, duracion_total (timedelta | None)
+    """
+    duracion = ExpressionWrapper(
+        F("ordenes_trabajo__fecha_salida") - F("ordenes_trabajo__fecha_ingreso"),
+        output_field=DurationField(),
+    )
+    cerrada = Q(
+        ordenes_trabajo__fecha_ingreso__isnull=False,
+        ordenes_trabajo__fecha_salida__isnull=False,
+    )
+
+    qs = (
+        Recinto.objects
+        .annotate(
+            vehiculos_total=Count("ordenes_trabajo__patente", distinct=True),
+            ots_pendientes=Count(
+                "ordenes_trabajo", filter=Q(ordenes_trabajo__estado="Pendiente")
+            ),
+            ots_en_proceso=Count(
+                "ordenes_trabajo", filter=Q(ordenes_trabajo__estado="En Proceso")
+            ),
+            ots_finalizadas=Count(
+                "ordenes_trabajo", filter=Q(ordenes_trabajo__estado="Finalizado")
+            ),
+            ots_cerradas=Count("ordenes_trabajo", filter=cerrada),
+            duracion_total=Sum(duracion, filter=cerrada),
+        )
+        .order_by("pk")
+    )
+
+    return [
+        {
+            "taller_id": r.pk,
+            "nombre": str(r),
+            "vehiculos_total": r.vehiculos_total,
+            "ots_pendientes": r.ots_pendientes,
+            "ots_en_proceso": r.ots_en_proceso,
+            "ots_finalizadas": r.ots_finalizadas,
+            "ots_cerradas": r.ots_cerradas,
+            "duracion_total": r.duracion_total,
+        }
+        for r in qs
+    ]
+
+
+def tiempos_promedio(agregados=None):
+    """
+    Promedio de duración (días) de las OTs cerradas, global y por recinto.
+
+    Se deriva de `agregados_por_recinto()` (suma de duraciones / cantidad de
+    OTs cerradas), por lo que no agrega consultas si ya se tienen los datos.
+    """
+    if agregados is None:
+        agregados = agregados_por_recinto()
+
+    por_taller = {}
+    suma_total = None
+    cerradas_total = 0
+
+    for item in agregados:
+        n = item["ots_cerradas"]
+        dur = item["duracion_total"]
+
+        por_taller[item["taller_id"]] = {
+            "taller": item["nombre"],
+            "promedio_dias": _dias(dur / n) if (dur is not None and n) else None,
+        }
+
+        if dur is not None and n:
+            suma_total = dur if suma_total is None else suma_total + dur
+            cerradas_total += n
+
+    global_promedio = (
+        _dias(suma_total / cerradas_total) if suma_total is not None and cerradas_total else None
+    )
+
+    return {
+        "global_promedio_dias": global_promedio,
+        "por_taller": por_taller,
+    }
@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class ReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reportes'
+
+    def ready(self):
+        # Registra las señales que mantienen el snapshot de KPIs
+        from . import kpis  # noqa: F401
@@ -0,0 +1,294 @@
+# reportes/kpis.py
+"""
+Mantenimiento incremental del snapshot de KPIs (tabla kpi_snapshot).
+
+- Cada save()/delete() de Vehiculo, OrdenTrabajo o Empleado aplica un delta
+  (+1 / -1) sobre los contadores afectados al confirmarse su transacción.
+- Los dashboards leen todos los contadores en UNA consulta por PK sobre una
+  tabla de pocas filas, en vez de contar tablas completas en cada poll.
+- Las actualizaciones masivas (QuerySet.update) no disparan señales: quien
+  las haga debe llamar a `registrar_cambio_ot` / `registrar_cambio_vehiculo`
+  o correr `python manage.py reconstruir_kpis`. La máquina de estados de la
+  OT (ordenestrabajo.estados) lo hace vía la señal `ot_estado_cambiado`.
+"""
+import logging
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from autenticacion.models import Empleado
+from ordenestrabajo import originales
+from ordenestrabajo.estados import ot_estado_cambiado
+from ordenestrabajo.models import OrdenTrabajo
+from vehiculos.models import Vehiculo
+
+from .models import KpiSnapshot
+
+logger = logging.getLogger(__name__)
+
+VEHICULOS_TOTAL = "vehiculos.total"
+VEHICULOS_ESTADO = "vehiculos.estado."
+OTS_ESTADO = "ots.estado."
+OTS_ABIERTAS = "ots.abiertas."
+EMPLEADOS_ACTIVOS = "empleados.activos"
+
+# Atributo donde se guarda el estado "original" de Vehiculo / Empleado
+# (post_init). La OT usa la copia compartida de ordenestrabajo.originales.
+_ORIGINAL = "_kpi_original"
+
+
+# ==========================================================
+# LECTURA
+# ==========================================================
+def leer_kpis():
+    """
+    Devuelve {clave: valor} con todos los contadores (1 consulta).
+
+    Si el snapshot aún no existe devuelve los conteos en vivo sin
+    escribirlos: un GET no construye la tabla (dos polls a la vez chocarían
+    en la UNIQUE de `clave`). Se construye con `reconstruir_kpis`.
+    """
+    kpis = dict(KpiSnapshot.objects.values_list("clave", "valor"))
+    if not kpis:
+        kpis = contar()
+    return kpis
+
+
+def suma(kpis, prefijo, estados=None):
+    """Suma los contadores `prefijo + estado` (todos si estados es None)."""
+    if estados is not None:
+        return sum(kpis.get(prefijo + e, 0) for e in estados)
+    return sum(v for k, v in kpis.items() if k.startswith(prefijo))
+
+
+# ==========================================================
+# ESCRITURA INCREMENTAL
+# ==========================================================
+def aplicar_deltas(deltas):
+    """
+    Aplica {clave: delta} con UPDATE valor = valor + delta tras el COMMIT.
+
+    Los contadores son pocas filas que tocan todas las escrituras: no se
+    bloquean dentro de la transacción del que escribe (la haría esperar a
+    las demás) sino en una transacción corta propia, y siempre en el mismo
+    orden de claves para que dos transiciones opuestas no se bloqueen en
+    orden cruzado. Si la transacción se deshace, no se aplica nada.
+    """
+    pendientes = sorted((clave, delta) for clave, delta in deltas.items() if delta)
+    if pendientes:
+        transaction.on_commit(lambda: _aplicar(pendientes))
+
+
+def _aplicar(pendientes):
+    ahora = timezone.now()
+    with transaction.atomic():
+        for clave, delta in pendientes:
+            actualizadas = KpiSnapshot.objects.filter(clave=clave).update(
+                valor=F("valor") + delta,
+                actualizado_en=ahora,
+            )
+            if actualizadas:
+                continue
+            # Contador nuevo (p.ej. un estado que no existía al reconstruir)
+            if delta < 0:
+                logger.warning(
+                    "Delta %s sobre el contador inexistente %s: el snapshot está "
+                    "desalineado (python manage.py reconstruir_kpis)", delta, clave,
+                )
+            try:
+                with transaction.atomic():
+                    KpiSnapshot.objects.create(clave=clave, valor=delta)
+            except IntegrityError:
+                KpiSnapshot.objects.filter(clave=clave).update(
+                    valor=F("valor") + delta,
+                    actualizado_en=ahora,
+                )
+
+
+def _claves_ot(estado, abierta):
+    claves = [OTS_ESTADO + estado]
+    if abierta:
+        claves.append(OTS_ABIERTAS + estado)
+    return claves
+
+
+def registrar_cambio_ot(antes, despues):
+    """
+    antes / despues: (estado, abierta) o None (OT creada / eliminada).
+    `abierta` = la OT no tiene fecha_salida.
+    """
+    if antes == despues:
+        return
+    deltas = Counter()
+    if antes:
+        for clave in _claves_ot(*antes):
+            deltas[clave] -= 1
+    if despues:
+        for clave in _claves_ot(*despues):
+            deltas[clave] += 1
+    aplicar_deltas(deltas)
+
+
+def registrar_cambio_vehiculo(estado_antes, estado_despues, creado=False, eliminado=False):
+    if estado_antes == estado_despues and not (creado or eliminado):
+        return
+    deltas = Counter()
+    if creado:
+        deltas[VEHICULOS_TOTAL] += 1
+    if eliminado:
+        deltas[VEHICULOS_TOTAL] -= 1
+    if estado_antes is not None:
+        deltas[VEHICULOS_ESTADO + estado_antes] -= 1
+    if estado_despues is not None:
+        deltas[VEHICULOS_ESTADO + estado_despues] += 1
+    aplicar_deltas(deltas)
+
+
+# ==========================================================
+# RECONSTRUCCIÓN COMPLETA
+# ==========================================================
+def contar():
+    """Cuenta los contadores en vivo (3 consultas agrupadas, sin escribir)."""
+    kpis = {VEHICULOS_TOTAL: 0, EMPLEADOS_ACTIVOS: 0}
+
+    for fila in Vehiculo.objects.values("estado").annotate(n=Count("patente")):
+        kpis[VEHICULOS_TOTAL] += fila["n"]
+        if fila["estado"] is not None:
+            kpis[VEHICULOS_ESTADO + fila["estado"]] = fila["n"]
+
+    for fila in (
+        OrdenTrabajo.objects
+        .values("estado")
+        .annotate(
+            n=Count("ot_id"),
+            abiertas=Count("ot_id", filter=Q(fecha_salida__isnull=True)),
+        )
+    ):
+        kpis[OTS_ESTADO + fila["estado"]] = fila["n"]
+        kpis[OTS_ABIERTAS + fila["estado"]] = fila["abiertas"]
+
+    kpis[EMPLEADOS_ACTIVOS] = Empleado.objects.filter(is_active=True).count()
+    return kpis
+
+
+def reconstruir():
+    """
+    Recalcula el snapshot desde cero (conteos + escritura).
+    Devuelve el diccionario resultante.
+    """
+    kpis = contar()
+    ahora = timezone.now()
+    with transaction.atomic():
+        KpiSnapshot.objects.all().delete()
+        KpiSnapshot.objects.bulk_create([
+            KpiSnapshot(clave=clave, valor=valor, actualizado_en=ahora)
+            for clave, valor in kpis.items()
+        ])
+
+    return kpis
+
+
+# ==========================================================
+# SEÑALES
+# ==========================================================
+def _estado_ot(instance):
+    return (instance.estado, instance.fecha_salida is None)
+
+
+def _estado_ot_original(instance):
+    original = originales.de(instance)
+    if original is None:
+        return None
+    return (original["estado"], original["fecha_salida"] is None)
+
+
+def _capturar(instance, funcion):
+    """Guarda el valor original si los campos necesarios están cargados."""
+    try:
+        setattr(instance, _ORIGINAL, funcion(instance) if instance.pk else None)
+    except Exception:
+        setattr(instance, _ORIGINAL, None)
+
+
+@receiver(post_init, sender=Vehiculo)
+def _vehiculo_post_init(sender, instance, **kwargs):
+    if "estado" in instance.get_deferred_fields():
+        return
+    _capturar(instance, lambda v: v.estado)
+
+
+@receiver(post_init, sender=Empleado)
+def _empleado_post_init(sender, instance, **kwargs):
+    if "is_active" in instance.get_deferred_fields():
+        return
+    _capturar(instance, lambda e: bool(e.is_active))
+
+
+def _original_desde_bd(sender, instance, campos):
+    """Fallback: la instancia se cargó con campos diferidos."""
+    return sender.objects.filter(pk=instance.pk).values(*campos).first()
+
+
+@receiver(pre_save, sender=Vehiculo)
+def _vehiculo_pre_save(sender, instance, **kwargs):
+    if instance.pk and not hasattr(instance, _ORIGINAL):
+        fila = _original_desde_bd(sender, instance, ["estado"])
+        setattr(instance, _ORIGINAL, fila["estado"] if fila else None)
+
+
+@receiver(pre_save, sender=Empleado)
+def _empleado_pre_save(sender, instance, **kwargs):
+    if instance.pk and not hasattr(instance, _ORIGINAL):
+        fila = _original_desde_bd(sender, instance, ["is_active"])
+        setattr(instance, _ORIGINAL, bool(fila["is_active"]) if fila else None)
+
+
+@receiver(post_save, sender=OrdenTrabajo)
+def _ot_post_save(sender, instance, created, **kwargs):
+    antes = None if created else _estado_ot_original(instance)
+    registrar_cambio_ot(antes, _estado_ot(instance))
+
+
+@receiver(post_delete, sender=OrdenTrabajo)
+def _ot_post_delete(sender, instance, **kwargs):
+    registrar_cambio_ot(_estado_ot_original(instance) or _estado_ot(instance), None)
+
+
+@receiver(post_save, sender=Vehiculo)
+def _vehiculo_post_save(sender, instance, created, **kwargs):
+    antes = None if created else getattr(instance, _ORIGINAL, None)
+    # Vehiculo usa PK natural: un save() "nuevo" puede no traer original
+    creado = created or not hasattr(instance, _ORIGINAL)
+    registrar_cambio_vehiculo(antes, instance.estado, creado=creado)
+    setattr(instance, _ORIGINAL, instance.estado)
+
+
+@receiver(post_delete, sender=Vehiculo)
+def _vehiculo_post_delete(sender, instance, **kwargs):
+    registrar_cambio_vehiculo(getattr(instance, _ORIGINAL, instance.estado), None, eliminado=True)
+
+
+@receiver(post_save, sender=Empleado)
+def _empleado_post_save(sender, instance, created, **kwargs):
+    antes = False if created else bool(getattr(instance, _ORIGINAL, False))
+    despues = bool(instance.is_active)
+    if antes != despues:
+        aplicar_deltas({EMPLEADOS_ACTIVOS: 1 if despues else -1})
+    setattr(instance, _ORIGINAL, despues)
+
+
+@receiver(post_delete, sender=Empleado)
+def _empleado_post_delete(sender, instance, **kwargs):
+    if getattr(instance, _ORIGINAL, instance.is_active):
+        aplicar_deltas({EMPLEADOS_ACTIVOS: -1})
+
+
+@receiver(ot_estado_cambiado)
+def _ot_transicion(sender, desde, hasta, abierta_antes, abierta_despues,
+                   vehiculo_desde, vehiculo_hasta, **kwargs):
+    registrar_cambio_ot((desde, abierta_antes), (hasta, abierta_despues))
+    registrar_cambio_vehiculo(vehiculo_desde, vehiculo_hasta)
@@ -0,0 +1,170 @@
+# reportes/listado.py
+"""
+Listado de OTs para el reporte CU07: paginación por cursor (keyset) y
+exportación en streaming (CSV / NDJSON).
+
+Orden estable: (fecha_ingreso DESC, hora_ingreso DESC, ot_id DESC).
+hora_ingreso admite NULL; tanto MySQL como SQLite ordenan los NULL al final
+en un orden DESC, y el filtro del cursor respeta esa misma regla.
+
+El cursor es opaco para el cliente: base64 de [fecha, hora|null, ot_id] de
+la última fila entregada. Cada página es una consulta acotada por índice
+(ix_ot_agenda) sin OFFSET, así que su costo no crece al avanzar.
+"""
+import base64
+import csv
+import json
+from datetime import date, time
+
+from django.db.models import Q
+
+ORDEN = ("-fecha_ingreso", "-hora_ingreso", "-ot_id")
+
+CAMPOS = (
+    "ot_id", "fecha_ingreso", "hora_ingreso", "fecha_salida", "estado",
+    "patente_id", "patente__marca", "patente__modelo", "recinto__nombre",
+    "rut_id", "rut_creador_id",
+)
+
+COLUMNAS = (
+    "id", "fecha", "hora", "patente", "vehiculo", "taller_nombre", "estado",
+    "rut_mecanico", "rut_creador", "fecha_salida", "duracion_dias",
+)
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+# ==========================================================
+# CURSOR
+# ==========================================================
+def codificar_cursor(fila):
+    hora = fila["hora_ingreso"]
+    datos = [
+        fila["fecha_ingreso"].isoformat(),
+        hora.isoformat() if hora else None,
+        fila["ot_id"],
+    ]
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(texto):
+    try:
+        relleno = "=" * (-len(texto) % 4)
+        fecha, hora, ot_id = json.loads(base64.urlsafe_b64decode(texto + relleno))
+        return (
+            date.fromisoformat(fecha),
+            time.fromisoformat(hora) if hora else None,
+            int(ot_id),
+        )
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise CursorInvalido("Cursor inválido.")
+
+
+def despues_de(cursor):
+    """Q con las filas que van DESPUÉS del cursor en el ORDEN del listado."""
+    fecha, hora, ot_id = cursor
+    if hora is None:
+        # Dentro de la misma fecha los NULL van al final: solo quedan NULL con id menor
+        misma_fecha = Q(hora_ingreso__isnull=True, ot_id__lt=ot_id)
+    else:
+        misma_fecha = (
+            Q(hora_ingreso__lt=hora)
+            | Q(hora_ingreso__isnull=True)
+            | Q(hora_ingreso=hora, ot_id__lt=ot_id)
+        )
+    return Q(fecha_ingreso__lt=fecha) | Q(Q(fecha_ingreso=fecha) & misma_fecha)
+
+
+# ==========================================================
+# FILAS
+# ==========================================================
+def serializar(fila):
+    """Fila de .values(*CAMPOS) -> dict con las claves que consume reportes_ot.js."""
+    fecha = fila["fecha_ingreso"]
+    salida = fila["fecha_salida"]
+    marca_modelo = " ".join(x for x in (fila["patente__marca"], fila["patente__modelo"]) if x)
+    return {
+        "id": fila["ot_id"],
+        "fecha": fecha.isoformat(),
+        "hora": fila["hora_ingreso"].strftime("%H:%M") if fila["hora_ingreso"] else "",
+        "patente": fila["patente_id"],
+        "vehiculo": marca_modelo,
+        "taller_nombre": fila["recinto__nombre"] or "",
+        "estado": fila["estado"],
+        "rut_mecanico": fila["rut_id"] or "",
+        "rut_creador": fila["rut_creador_id"] or "",
+        "fecha_salida": salida.isoformat() if salida else "",
+        "duracion_dias": (salida - fecha).days if (salida and fecha) else None,
+    }
+
+
+def pagina(qs, cursor=None, limite=100):
+    """
+    Una página del listado. Devuelve (items, next_cursor|None).
+    Se pide una fila extra para saber si hay más sin un COUNT.
+    """
+    if cursor is not None:
+        qs = qs.filter(despues_de(cursor))
+    filas = list(qs.order_by(*ORDEN).values(*CAMPOS)[: limite + 1])
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1])
+
+    return [serializar(f) for f in filas], siguiente
+
+
+def recorrer(qs, tamano_lote=2000):
+    """
+    Itera TODAS las filas del listado en lotes por cursor.
+
+    Cada lote es una consulta acotada (LIMIT) leída con .iterator(): la
+    memoria queda constante aunque el rango sea de años, también en MySQL,
+    donde el driver no usa cursores del lado del servidor.
+    """
+    cursor = None
+    while True:
+        lote = qs
+        if cursor is not None:
+            lote = lote.filter(despues_de(cursor))
+        lote = lote.order_by(*ORDEN).values(*CAMPOS)[:tamano_lote]
+
+        ultima = None
+        n = 0
+        for fila in lote.iterator(chunk_size=tamano_lote):
+            ultima = fila
+            n += 1
+            yield fila
+
+        if n < tamano_lote:
+            return
+        cursor = (ultima["fecha_ingreso"], ultima["hora_ingreso"], ultima["ot_id"])
+
+
+# ==========================================================
+# EXPORTACIÓN
+# ==========================================================
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def stream_csv(qs, tamano_lote=2000):
+    escritor = csv.writer(_Eco())
+    yield "\ufeff"  # BOM: Excel detecta UTF-8
+    yield escritor.writerow(COLUMNAS)
+    for fila in recorrer(qs, tamano_lote):
+        item = serializar(fila)
+        yield escritor.writerow([
+            "" if item[c] is None else item[c] for c in COLUMNAS
+        ])
+
+
+def stream_ndjson(qs, tamano_lote=2000):
+    for fila in recorrer(qs, tamano_lote):
+        yield json.dumps(serializar(fila), ensure_ascii=False) + "\n"
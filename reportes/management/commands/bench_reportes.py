@@ -0,0 +1,69 @@
+# reportes/management/commands/bench_reportes.py
+"""
+Benchmark de regresión de consultas para la capa de agregación de reportes.
+
+Uso:
+    python manage.py bench_reportes
+    python manage.py bench_reportes --repeticiones 20
+
+Ejecuta cada función de reportes/agregaciones.py contando las consultas SQL
+emitidas y el tiempo promedio. Si alguna supera su presupuesto
+(PRESUPUESTO_CONSULTAS) el comando termina con error, para detectar
+regresiones N+1 (p.ej. volver a consultar por cada recinto).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reportes import agregaciones
+
+
+class Command(BaseCommand):
+    help = "Cuenta consultas y mide tiempos de la capa de agregación de reportes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeticiones",
+            type=int,
+            default=5,
+            help="Cantidad de ejecuciones por función para promediar el tiempo.",
+        )
+
+    def handle(self, *args, **options):
+        repeticiones = max(1, options["repeticiones"])
+
+        casos = {
+            "resumen_global": agregaciones.resumen_global,
+            "agregados_por_recinto": agregaciones.agregados_por_recinto,
+        }
+
+        fallas = []
+
+        for nombre, funcion in casos.items():
+            presupuesto = agregaciones.PRESUPUESTO_CONSULTAS[nombre]
+
+            with CaptureQueriesContext(connection) as ctx:
+                funcion()
+            consultas = len(ctx.captured_queries)
+
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                funcion()
+            ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+
+            estado = "OK"
+            if consultas > presupuesto:
+                estado = "EXCEDE"
+                fallas.append(f"{nombre}: {consultas} consultas (máx. {presupuesto})")
+
+            self.stdout.write(
+                f"{nombre:<25} consultas={consultas:<3} presupuesto={presupuesto:<3} "
+                f"promedio={ms:8.2f} ms  [{estado}]"
+            )
+
+        if fallas:
+            raise CommandError("Regresión de consultas: " + "; ".join(fallas))
+
+        self.stdout.write(self.style.SUCCESS("Presupuesto de consultas respetado."))
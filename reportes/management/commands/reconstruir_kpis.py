@@ -0,0 +1,52 @@
+# reportes/management/commands/reconstruir_kpis.py
+"""
+Reconstruye desde cero el snapshot de KPIs (tabla kpi_snapshot).
+
+Uso:
+    python manage.py reconstruir_kpis
+    python manage.py reconstruir_kpis --solo-verificar
+
+Útil después de cargas masivas, actualizaciones hechas directo en MySQL o
+cualquier QuerySet.update() que no haya registrado sus deltas. También
+invalida los ETag de los paneles (utils.versiones).
+"""
+from django.core.management.base import BaseCommand
+
+from reportes import kpis
+from reportes.models import KpiSnapshot
+from utils import versiones
+
+
+class Command(BaseCommand):
+    help = "Recalcula el snapshot de KPIs de los dashboards."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--solo-verificar",
+            action="store_true",
+            help="Solo informa las diferencias, sin reemplazar el snapshot.",
+        )
+
+    def handle(self, *args, **options):
+        actual = dict(KpiSnapshot.objects.values_list("clave", "valor"))
+
+        if options["solo_verificar"]:
+            nuevo = kpis.contar()
+        else:
+            nuevo = kpis.reconstruir()
+            versiones.invalidar_todo()
+
+        diferencias = 0
+        for clave in sorted(set(actual) | set(nuevo)):
+            antes = actual.get(clave, 0)
+            despues = nuevo.get(clave, 0)
+            if antes != despues:
+                diferencias += 1
+                self.stdout.write(f"  {clave:<35} {antes:>8} -> {despues:>8}")
+
+        if options["solo_verificar"]:
+            msg = f"{diferencias} contador(es) desalineado(s)."
+        else:
+            msg = f"Snapshot reconstruido ({len(nuevo)} contadores, {diferencias} corregidos)."
+
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-18 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KpiSnapshot',
+            fields=[
+                ('clave', models.CharField(max_length=80, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'kpi_snapshot',
+            },
+        ),
+    ]
@@ -1,4 +1,30 @@
 #reportes/models.py
 from django.db import models
 
-# Create your models here.
+
+# ===========================================
+# SNAPSHOT DE KPIs (tabla propia, gestionada por Django)
+# ===========================================
+class KpiSnapshot(models.Model):
+    """
+    Contadores materializados para los dashboards.
+
+    Cada fila es un contador (clave -> valor), p.ej.:
+      - vehiculos.total
+      - vehiculos.estado.En Taller
+      - ots.estado.Pendiente
+      - ots.abiertas.En Proceso   (OTs sin fecha_salida)
+      - empleados.activos
+
+    Se mantiene incrementalmente desde reportes/kpis.py y se reconstruye
+    con `python manage.py reconstruir_kpis`.
+    """
+    clave = models.CharField(max_length=80, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "kpi_snapshot"
+
+    def __str__(self):
+        return f"{self.clave} = {self.valor}"
@@ -1,3 +1,167 @@
+from datetime import date, time, timedelta
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from autenticacion.models import Empleado, sincronizar_grupo
+from ordenestrabajo.models import OrdenTrabajo
+from talleres.models import Recinto
+from vehiculos.models import Vehiculo
+
+from . import kpis, listado
+
+HOY = date.today()
+AYER = HOY - timedelta(days=1)
+
+
+class ReportesBase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recinto = Recinto.objects.create(nombre="Renca", ubicacion="Renca", jefe_recinto="Jefe")
+        cls.supervisor = Empleado.objects.create(
+            rut="11111111-1", nombre="Sofía", cargo="SUPERVISOR", usuario="sup",
+            password="-", recinto=cls.recinto,
+        )
+        Vehiculo.objects.create(patente="AB1234", marca="Volvo", modelo="FH")
+        kpis.reconstruir()
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username="sup")
+        sincronizar_grupo(self.supervisor, user)
+        self.client.force_login(user)
+
+    def crear_ot(self, fecha, hora, estado="Finalizado"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return OrdenTrabajo.objects.create(
+                fecha_ingreso=fecha, hora_ingreso=hora, fecha_salida=HOY, estado=estado,
+                patente_id="AB1234", recinto=self.recinto,
+                rut=self.supervisor, rut_creador=self.supervisor,
+            )
+
+
+# ==========================================================
+# LISTADO POR CURSOR (keyset)
+# ==========================================================
+class CursorTests(ReportesBase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Empates de (fecha, hora) y horas NULL en la misma fecha
+        cls.ids = {}
+        for nombre, fecha, hora in [
+            ("hoy_10_a", HOY, time(10, 0)),
+            ("hoy_10_b", HOY, time(10, 0)),
+            ("hoy_9", HOY, time(9, 0)),
+            ("hoy_null_a", HOY, None),
+            ("hoy_null_b", HOY, None),
+            ("ayer_null", AYER, None),
+            ("ayer_11", AYER, time(11, 0)),
+        ]:
+            cls.ids[nombre] = OrdenTrabajo.objects.create(
+                fecha_ingreso=fecha, hora_ingreso=hora, fecha_salida=HOY, estado="Finalizado",
+                patente_id="AB1234", recinto=cls.recinto,
+                rut=cls.supervisor, rut_creador=cls.supervisor,
+            ).ot_id
+
+    def orden_esperado(self):
+        i = self.ids
+        # DESC por fecha y hora (NULL al final), empates por ot_id DESC
+        return [
+            i["hoy_10_b"], i["hoy_10_a"], i["hoy_9"], i["hoy_null_b"], i["hoy_null_a"],
+            i["ayer_11"], i["ayer_null"],
+        ]
+
+    def test_orden_del_listado(self):
+        ids = list(OrdenTrabajo.objects.order_by(*listado.ORDEN).values_list("ot_id", flat=True))
+        self.assertEqual(ids, self.orden_esperado())
+
+    def recorrer_paginas(self, pagina):
+        """ids de todas las páginas; `pagina(cursor)` -> (ids, siguiente|None)."""
+        vistos, cursor = [], None
+        # Con un cursor roto las páginas se repetirían para siempre
+        for _ in range(len(self.ids) + 1):
+            ids, cursor = pagina(cursor)
+            vistos += ids
+            if cursor is None:
+                return vistos
+        self.fail(f"La paginación no termina: {vistos}")
+
+    def test_paginas_sin_saltos_ni_repetidos(self):
+        for limite in (1, 2, 3):
+            with self.subTest(limite=limite):
+                def pagina(cursor):
+                    items, siguiente = listado.pagina(
+                        OrdenTrabajo.objects.all(),
+                        listado.decodificar_cursor(cursor) if cursor else None,
+                        limite,
+                    )
+                    return [item["id"] for item in items], siguiente
+
+                self.assertEqual(self.recorrer_paginas(pagina), self.orden_esperado())
+
+    def test_cursor_con_hora_null(self):
+        fila = OrdenTrabajo.objects.filter(pk=self.ids["hoy_null_b"]).values(*listado.CAMPOS).get()
+        cursor = listado.decodificar_cursor(listado.codificar_cursor(fila))
+
+        self.assertEqual(cursor, (HOY, None, self.ids["hoy_null_b"]))
+        despues = OrdenTrabajo.objects.filter(listado.despues_de(cursor)).order_by(*listado.ORDEN)
+        self.assertEqual(
+            list(despues.values_list("ot_id", flat=True)),
+            self.orden_esperado()[4:],
+        )
+
+    def test_recorrer_en_lotes(self):
+        # islice: con un cursor roto recorrer() no termina
+        filas = listado.recorrer(OrdenTrabajo.objects.all(), tamano_lote=2)
+        filas = list(islice(filas, len(self.ids) + 1))
+        self.assertEqual([f["ot_id"] for f in filas], self.orden_esperado())
+
+    def test_api_pagina_y_cursor_invalido(self):
+        url = reverse("reportes:api_ots")
+
+        def pagina(cursor):
+            data = self.client.get(url, {"from": AYER, "to": HOY, "limit": 2, "cursor": cursor or ""}).json()
+            return [item["id"] for item in data["items"]], data["next_cursor"]
+
+        self.assertEqual(self.recorrer_paginas(pagina), self.orden_esperado())
+
+        response = self.client.get(url, {"cursor": "no-es-un-cursor"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()["success"])
+
+
+# ==========================================================
+# GET CONDICIONAL (ETag / 304)
+# ==========================================================
+class EtagTests(ReportesBase):
+    def test_304_hasta_que_cambia_una_ot(self):
+        url = reverse("reportes:api_ots")
+        primera = self.client.get(url)
+        etag = primera["ETag"]
+        self.assertEqual(primera.status_code, 200)
+
+        repetida = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(repetida.status_code, 304)
+        self.assertEqual(repetida.content, b"")
+
+        self.crear_ot(HOY, time(10, 0))
+        despues = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(despues.status_code, 200)
+        self.assertNotEqual(despues["ETag"], etag)
+        self.assertEqual(len(despues.json()["items"]), 1)
+
+    def test_etag_distinto_por_url(self):
+        url = reverse("reportes:api_ots")
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, {"limit": 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+    def test_revalidacion_privada(self):
+        response = self.client.get(reverse("reportes:api_ots"))
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
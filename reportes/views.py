@@ -2,15 +2,20 @@
 from datetime import datetime, timedelta
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, F, ExpressionWrapper, DurationField
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 
-from vehiculos.models import Vehiculo
-from talleres.models import Taller, Recinto
+from talleres.models import Recinto
 from ordenestrabajo.models import OrdenTrabajo
-from autenticacion.models import Empleado
 from autenticacion.roles import supervisor_only
+from utils import versiones
+
+from . import listado
+from .agregaciones import agregados_por_recinto, resumen_global, tiempos_promedio
+
+# Versiones de las que dependen las APIs (ETag / 304, ver utils/versiones.py)
+DEPENDE_DE_OTS = versiones.globales(versiones.OTS)
+DEPENDE_DE_KPIS = versiones.globales(versiones.OTS, versiones.VEHICULOS, versiones.EMPLEADOS)
 
 
 # ==============================================================
@@ -80,36 +85,50 @@ def _date_range(request):
 # ==============================================================
 @login_required(login_url="/inicio-sesion/")
 @supervisor_only
+@versiones.condicional(DEPENDE_DE_KPIS)
 def api_summary(request):
     dfrom, dto = _date_range(request)
 
-    total_vehiculos = Vehiculo.objects.count()
-    en_taller = Vehiculo.objects.filter(estado="En Taller").count()
-
-    ordenes_activas = OrdenTrabajo.objects.filter(
-        fecha_ingreso__range=(dfrom, dto),
-        estado__in=["Pendiente", "En Proceso"],
-    ).count()
-
-    empleados_activos = Empleado.objects.filter(is_active=True).count()
+    resumen = resumen_global(dfrom, dto)
 
     return JsonResponse({
         "success": True,
         "kpis": {
-            "vehiculos_totales": total_vehiculos,
-            "en_taller": en_taller,
-            "en_proceso": ordenes_activas,
-            "empleados_activos": empleados_activos,
+            "vehiculos_totales": resumen["vehiculos_totales"],
+            "en_taller": resumen["vehiculos_en_taller"],
+            "en_proceso": resumen["ordenes_activas"],
+            "empleados_activos": resumen["empleados_activos"],
         },
     })
 
 
 # ==============================================================
 # 🟦 API: Lista de OTs filtrada (usada por reportes_ot.js)
+#      → /reportes/api/ots/
 # ==============================================================
+LIMITE_OTS_DEFAULT = 100
+LIMITE_OTS_MAX = 500
+
+FORMATOS_EXPORTACION = {
+    # formato: (content-type, extensión, generador)
+    "csv": ("text/csv; charset=utf-8", "csv", listado.stream_csv),
+    "ndjson": ("application/x-ndjson; charset=utf-8", "ndjson", listado.stream_ndjson),
+}
+
+
 @login_required(login_url="/inicio-sesion/")
 @supervisor_only
+@versiones.condicional(DEPENDE_DE_OTS)
 def api_ots(request):
+    """
+    Lista de OTs del rango/filtros.
+
+    JSON paginado por cursor:
+      ?limit=100&cursor=<next_cursor>  ->  {"items": [...], "next_cursor": "..." | null}
+
+    Exportación en streaming (todo el rango, memoria constante):
+      ?formato=csv | ?formato=ndjson
+    """
     dfrom, dto = _date_range(request)
 
     patente = (request.GET.get("patente") or "").strip().upper()
@@ -117,10 +136,7 @@ def api_ots(request):
     taller = (request.GET.get("taller_id") or "").strip()
     creador = (request.GET.get("rut_creador") or "").strip()
 
-    qs = (
-        OrdenTrabajo.objects.filter(fecha_ingreso__range=(dfrom, dto))
-        .select_related("patente", "recinto", "rut", "rut_creador")
-    )
+    qs = OrdenTrabajo.objects.filter(fecha_ingreso__range=(dfrom, dto))
 
     if patente:
         qs = qs.filter(patente_id=patente)
@@ -132,37 +148,47 @@ def api_ots(request):
         if taller.isdigit():
             qs = qs.filter(recinto_id=int(taller))
         else:
-            ids = list(
-                Recinto.objects.filter(nombre__icontains=taller)
-                .values_list("id", flat=True)
-            )
-            qs = qs.filter(recinto_id__in=ids or [-1])
+            qs = qs.filter(recinto__nombre__icontains=taller)
 
     if creador:
-        qs = qs.filter(rut_creador__rut=creador)
-
-    items = []
-    for ot in qs.order_by("-fecha_ingreso", "-hora_ingreso", "-ot_id"):
-        # tiempo total en días (si tiene fecha_salida)
-        duracion_dias = None
-        if ot.fecha_salida and ot.fecha_ingreso:
-            duracion_dias = (ot.fecha_salida - ot.fecha_ingreso).days
-
-        items.append({
-            "id": ot.ot_id,
-            "fecha": ot.fecha_ingreso.isoformat(),
-            "hora": ot.hora_ingreso.strftime("%H:%M") if ot.hora_ingreso else "",
-            "patente": ot.patente_id,
-            "vehiculo": f"{ot.patente.marca} {ot.patente.modelo}" if ot.patente else "",
-            "taller_nombre": str(ot.recinto) if ot.recinto else "",
-            "estado": ot.estado,
-            "rut_mecanico": getattr(ot.rut, "rut", ""),
-            "rut_creador": getattr(ot.rut_creador, "rut", ""),
-            "fecha_salida": ot.fecha_salida.isoformat() if ot.fecha_salida else "",
-            "duracion_dias": duracion_dias,
-        })
-
-    return JsonResponse({"success": True, "items": items})
+        qs = qs.filter(rut_creador_id=creador)
+
+    # ---------- Exportación en streaming ----------
+    formato = (request.GET.get("formato") or "").strip().lower()
+    if formato in FORMATOS_EXPORTACION:
+        content_type, extension, generador = FORMATOS_EXPORTACION[formato]
+        response = StreamingHttpResponse(generador(qs), content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="ots_{dfrom.isoformat()}_{dto.isoformat()}.{extension}"'
+        )
+        return response
+    if formato:
+        return JsonResponse(
+            {"success": False, "message": "Formato no soportado (csv | ndjson)."},
+            status=400,
+        )
+
+    # ---------- Página JSON por cursor ----------
+    try:
+        limite = int(request.GET.get("limit") or LIMITE_OTS_DEFAULT)
+    except ValueError:
+        limite = LIMITE_OTS_DEFAULT
+    limite = max(1, min(limite, LIMITE_OTS_MAX))
+
+    cursor = None
+    if request.GET.get("cursor"):
+        try:
+            cursor = listado.decodificar_cursor(request.GET["cursor"])
+        except listado.CursorInvalido as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    items, next_cursor = listado.pagina(qs, cursor=cursor, limite=limite)
+
+    return JsonResponse({
+        "success": True,
+        "items": items,
+        "next_cursor": next_cursor,
+    })
 
 
 # ==============================================================
@@ -171,25 +197,11 @@ def api_ots(request):
 # ==============================================================
 @login_required(login_url="/inicio-sesion/")
 @supervisor_only
+@versiones.condicional(DEPENDE_DE_KPIS)
 def api_resumen_global(request):
-
-    total_vehiculos = Vehiculo.objects.count()
-    en_taller = Vehiculo.objects.filter(estado="En Taller").count()
-
-    ordenes_activas = OrdenTrabajo.objects.filter(
-        estado__in=["Pendiente", "En Proceso"],
-    ).count()
-
-    empleados_activos = Empleado.objects.filter(is_active=True).count()
-
     return JsonResponse({
         "success": True,
-        "data": {
-            "vehiculos_totales": total_vehiculos,
-            "vehiculos_en_taller": en_taller,
-            "ordenes_activas": ordenes_activas,
-            "empleados_activos": empleados_activos,
-        },
+        "data": resumen_global(),
     })
 
 
@@ -199,6 +211,7 @@ def api_resumen_global(request):
 # ==============================================================
 @login_required(login_url="/inicio-sesion/")
 @supervisor_only
+@versiones.condicional(DEPENDE_DE_OTS)
 def api_resumen_talleres(request):
     """
     Devuelve, por cada recinto (que en el dashboard mostramos como "taller"):
@@ -207,22 +220,17 @@ def api_resumen_talleres(request):
       - cantidad de OTs por estado
     Formato esperado por static/js/reportes.js
     """
-    talleres_data = []
-
-    for r in Recinto.objects.all():
-        qs_ot = OrdenTrabajo.objects.filter(recinto=r)
-
-        # Vehículos distintos que han tenido OTs en este recinto
-        vehiculos_total = qs_ot.values("patente_id").distinct().count()
-
-        talleres_data.append({
-            "taller_id": r.pk,
-            "nombre": str(r),  # usamos el __str__ del Recinto
-            "vehiculos_total": vehiculos_total,
-            "ots_pendientes": qs_ot.filter(estado="Pendiente").count(),
-            "ots_en_proceso": qs_ot.filter(estado="En Proceso").count(),
-            "ots_finalizadas": qs_ot.filter(estado="Finalizado").count(),
-        })
+    talleres_data = [
+        {
+            "taller_id": item["taller_id"],
+            "nombre": item["nombre"],
+            "vehiculos_total": item["vehiculos_total"],
+            "ots_pendientes": item["ots_pendientes"],
+            "ots_en_proceso": item["ots_en_proceso"],
+            "ots_finalizadas": item["ots_finalizadas"],
+        }
+        for item in agregados_por_recinto()
+    ]
 
     return JsonResponse({"success": True, "items": talleres_data})
 
@@ -233,35 +241,14 @@ def api_resumen_talleres(request):
 # ==============================================================
 @login_required(login_url="/inicio-sesion/")
 @supervisor_only
+@versiones.condicional(DEPENDE_DE_OTS)
 def api_tiempos_promedio(request):
     """
     Calcula promedio de duración (en días) de las OTs cerradas,
     global y por recinto. Formato esperado por static/js/reportes.js.
+    Se calcula sobre la misma consulta agrupada de api_resumen_talleres.
     """
-
-    # Solo OTs que tienen fecha_ingreso y fecha_salida
-    qs = OrdenTrabajo.objects.filter(
-        fecha_ingreso__isnull=False,
-        fecha_salida__isnull=False,
-    ).annotate(
-        duracion=ExpressionWrapper(
-            F("fecha_salida") - F("fecha_ingreso"),
-            output_field=DurationField(),
-        )
-    )
-
-    global_avg = qs.aggregate(promedio=Avg("duracion"))["promedio"]
-
-    talleres = {}
-    for r in Recinto.objects.all():
-        dur = qs.filter(recinto=r).aggregate(promedio=Avg("duracion"))["promedio"]
-        talleres[r.pk] = {
-            "taller": str(r),
-            "promedio_dias": round(dur.total_seconds() / 86400, 2) if dur else None,
-        }
-
     return JsonResponse({
         "success": True,
-        "global_promedio_dias": round(global_avg.total_seconds() / 86400, 2) if global_avg else None,
-        "por_taller": talleres,
+        **tiempos_promedio(),
     })
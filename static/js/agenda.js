@@ -87,7 +87,31 @@
         }
     }
 
-    async function buscarSlots() {
+    // Matriz de la semana ya cargada: cambiar de día dentro de ella no llama al API
+    let semana = { desde: null, dias: {} };
+
+    function lunesDe(fecha) {
+        const d = new Date(fecha + "T00:00:00");
+        d.setDate(d.getDate() - ((d.getDay() + 6) % 7));
+        const mm = String(d.getMonth() + 1).padStart(2, "0");
+        const dd = String(d.getDate()).padStart(2, "0");
+        return `${d.getFullYear()}-${mm}-${dd}`;
+    }
+
+    async function cargarSemana(desde) {
+        const res = await fetch(
+            `${API_BASE}/agenda/matriz/?desde=${encodeURIComponent(desde)}&taller_id=${encodeURIComponent(window.TALLER_ID)}`
+        );
+        const data = await res.json();
+        if (!data.success) {
+            throw new Error(data.message || "No se pudo cargar los horarios.");
+        }
+
+        semana = { desde, dias: {} };
+        data.dias.forEach(d => { semana.dias[d.fecha] = d.slots; });
+    }
+
+    async function buscarSlots(e) {
         const fecha = fechaInput.value;
         if (!fecha) {
             alert("Seleccione una fecha");
@@ -95,24 +119,22 @@
         }
 
         try {
-            const res = await fetch(
-                `${API_BASE}/agenda/slots/?fecha=${encodeURIComponent(fecha)}&taller_id=${encodeURIComponent(window.TALLER_ID)}`
-            );
-            const data = await res.json();
-
-            if (!data.success) {
-                alert("Error: " + (data.message || "No se pudo cargar los horarios."));
-                return;
+            const desde = lunesDe(fecha);
+            // Click explícito (o tras reservar) = datos frescos
+            if (e || semana.desde !== desde) {
+                await cargarSemana(desde);
             }
-
-            showSlots(data.slots);
+            showSlots(semana.dias[fecha] || []);
         } catch (err) {
             console.error("Error al cargar horarios:", err);
-            alert("Error al cargar horarios");
+            alert("Error: " + err.message);
         }
     }
 
     if (btnBuscar) {
         btnBuscar.addEventListener("click", buscarSlots);
     }
+    if (fechaInput) {
+        fechaInput.addEventListener("change", () => buscarSlots());
+    }
 })();
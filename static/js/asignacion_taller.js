@@ -174,6 +174,11 @@ document.addEventListener("DOMContentLoaded", () => {
     enlazarBotonesAsignar();
     cargarPendientes();
 
-    // Auto refresh cada 10s
-    setInterval(cargarPendientes, 10000);
+    // En vivo: recargar solo cuando cambia una solicitud del recinto
+    const recargar = debounce(cargarPendientes);
+    conectarTablero((evento) => {
+        if (evento.tipo === "solicitud" || evento.tipo === "refresco") {
+            recargar();
+        }
+    });
 });
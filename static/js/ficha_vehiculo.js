@@ -295,6 +295,17 @@
         }
     }
 
+    // Miniatura de las fotos (el archivo completo solo se baja al abrirlo)
+    function docMiniatura(doc) {
+        if (!doc.miniatura) return "";
+        return `
+            <a href="${doc.archivo}" target="_blank" class="me-2">
+                <img src="${doc.miniatura}" alt="${doc.titulo}" loading="lazy"
+                     width="48" height="48" class="rounded" style="object-fit: cover;">
+            </a>
+        `;
+    }
+
     // Render simple (solo documentos)
     function renderListaSimple(container, docs) {
         docs.forEach(doc => {
@@ -302,9 +313,12 @@
             li.className = "list-group-item d-flex justify-content-between align-items-center";
 
             li.innerHTML = `
-                <span>
-                    <b>${doc.titulo}</b><br>
-                    <small class="text-muted">${doc.tipo} — ${doc.creado_en}</small>
+                <span class="d-flex align-items-center">
+                    ${docMiniatura(doc)}
+                    <span>
+                        <b>${doc.titulo}</b><br>
+                        <small class="text-muted">${doc.tipo} — ${doc.creado_en}</small>
+                    </span>
                 </span>
                 <a href="${doc.archivo}" target="_blank" class="btn btn-sm btn-outline-primary">
                     Abrir
@@ -340,8 +354,8 @@
 
             grupo.docs.forEach(doc => {
                 html += `
-                    <div class="d-flex justify-content-between border-bottom py-1">
-                        <span>${doc.titulo}</span>
+                    <div class="d-flex justify-content-between align-items-center border-bottom py-1">
+                        <span class="d-flex align-items-center">${docMiniatura(doc)}${doc.titulo}</span>
                         <a class="btn btn-sm btn-outline-primary" target="_blank" href="${doc.archivo}">
                             Abrir
                         </a>
@@ -374,8 +388,8 @@
 
         lista.forEach(doc => {
             listaDocsVehiculo.innerHTML += `
-                <div class="d-flex justify-content-between border-bottom py-1">
-                    <span>${doc.titulo}</span>
+                <div class="d-flex justify-content-between align-items-center border-bottom py-1">
+                    <span class="d-flex align-items-center">${docMiniatura(doc)}${doc.titulo}</span>
                     <a class="btn btn-sm btn-outline-primary" target="_blank" href="${doc.archivo}">
                         Abrir
                     </a>
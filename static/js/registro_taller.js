@@ -1,14 +1,21 @@
 // static/js/registro_taller.js
 // ======================================================
-//  REGISTRO TALLER — Auto refresh de vehículos en taller
+//  REGISTRO TALLER — Vehículos en taller en vivo
 //  - Mecánico / Supervisor
 //  - Usa /api/ordenestrabajo/... para cargar OTs
+//  - Recarga solo cuando el tablero (tablero_ws.js) avisa un cambio
 //  - Los cambios de estado los maneja registro_taller_estado.js
 // ======================================================
 
 document.addEventListener("DOMContentLoaded", () => {
-    cargarVehiculos();                   // Carga inicial
-    setInterval(cargarVehiculos, 10000); // 🔁 Refresco cada 10 segundos
+    cargarVehiculos(); // Carga inicial
+
+    const recargar = debounce(cargarVehiculos);
+    conectarTablero((evento) => {
+        // Solicitudes no afectan esta tabla
+        if (evento.tipo === "solicitud") return;
+        recargar();
+    });
 });
 
 // ======================================================
@@ -21,7 +28,10 @@ async function cargarVehiculos() {
 
     if (!contenedor) return;
 
-    contenedor.innerHTML = "<p>Cargando vehículos asignados...</p>";
+    // Solo mostramos "Cargando" en la primera carga (evita parpadeo en vivo)
+    if (!contenedor.dataset.cargado) {
+        contenedor.innerHTML = "<p>Cargando vehículos asignados...</p>";
+    }
 
     const API_URL =
         modo === "supervisor"
@@ -39,6 +49,7 @@ async function cargarVehiculos() {
 
         // La API devuelve HTML listo para el <tbody>
         contenedor.innerHTML = data.html;
+        contenedor.dataset.cargado = "1";
 
         // 👇 Los botones de estado (recibir / pausar / finalizar / reanudar)
         // se manejan en registro_taller_estado.js mediante event delegation.
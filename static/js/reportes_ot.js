@@ -83,25 +83,77 @@
   }
 
   // ============================
-  // Cargar tabla de OTs
+  // Cargar tabla de OTs (paginada por cursor)
   // ============================
-  async function loadOTs() {
+  const PAGE_SIZE = 100;
+  let nextCursor = null;
+  let totalCargadas = 0;
+  let cargando = false;
+
+  function filaHtml(row) {
+    return `
+          <tr>
+            <td>${row.id}</td>
+            <td>${row.fecha} ${row.hora || ""}</td>
+            <td>${row.patente}</td>
+            <td>${row.vehiculo || ""}</td>
+            <td>${row.taller_nombre || ""}</td>
+            <td>${row.estado}</td>
+            <td>${row.rut_mecanico || ""}</td>
+            <td>${row.rut_creador || ""}</td>
+            <td>${row.fecha_salida || ""}</td>
+            <td>${row.duracion_dias ?? ""}</td>
+          </tr>
+        `;
+  }
+
+  function actualizarPie() {
+    $("#tablaCount") &&
+      ($("#tablaCount").textContent = `${totalCargadas} registro(s)${
+        nextCursor ? " (hay más)" : ""
+      }`);
+    const btn = $("#btnCargarMas");
+    btn && btn.classList.toggle("d-none", !nextCursor);
+  }
+
+  function actualizarExportar() {
+    const { from, to } = getRangeOrDefaults();
+    const base = toQuery({ from, to, ...getTableFilters() });
+    const csv = $("#btnExportCsv");
+    const ndjson = $("#btnExportNdjson");
+    csv && (csv.href = `/reportes/api/ots/?${base}&formato=csv`);
+    ndjson && (ndjson.href = `/reportes/api/ots/?${base}&formato=ndjson`);
+  }
+
+  // append=false: nueva consulta (reemplaza la tabla); true: "Cargar más"
+  async function loadOTs(append = false) {
+    if (cargando) return;
+    if (append && !nextCursor) return;
+    cargando = true;
+
     const body = $("#tablaOtsBody");
-    if (body)
-      body.innerHTML =
-        '<tr><td colspan="10" class="text-muted">Cargando…</td></tr>';
-    $("#tablaCount") && ($("#tablaCount").textContent = "");
+    if (!append) {
+      nextCursor = null;
+      totalCargadas = 0;
+      if (body)
+        body.innerHTML =
+          '<tr><td colspan="10" class="text-muted">Cargando…</td></tr>';
+      $("#tablaCount") && ($("#tablaCount").textContent = "");
+      actualizarExportar();
+    }
 
     const { from, to } = getRangeOrDefaults();
     const filters = getTableFilters();
-    const url = `/reportes/api/ots/?${toQuery({ from, to, ...filters })}`;
+    const params = { from, to, ...filters, limit: PAGE_SIZE };
+    if (append) params.cursor = nextCursor;
+    const url = `/reportes/api/ots/?${toQuery(params)}`;
 
     try {
       const res = await fetch(url, { credentials: "same-origin" });
       const data = await res.json().catch(() => ({}));
 
       if (!res.ok || !data.success) {
-        if (body) {
+        if (body && !append) {
           body.innerHTML = `<tr><td colspan="10" class="text-danger">Error: ${
             data.message || res.status
           }</td></tr>`;
@@ -110,43 +162,33 @@
       }
 
       const items = Array.isArray(data.items) ? data.items : [];
-      if (items.length === 0) {
+      nextCursor = data.next_cursor || null;
+
+      if (!append && items.length === 0) {
         if (body) {
           body.innerHTML =
             '<tr><td colspan="10" class="text-muted">Sin registros en el rango / filtros.</td></tr>';
         }
+        actualizarPie();
         return;
       }
 
       if (body) {
-        body.innerHTML = items
-          .map(
-            (row) => `
-          <tr>
-            <td>${row.id}</td>
-            <td>${row.fecha} ${row.hora || ""}</td>
-            <td>${row.patente}</td>
-            <td>${row.vehiculo || ""}</td>
-            <td>${row.taller_nombre || ""}</td>
-            <td>${row.estado}</td>
-            <td>${row.rut_mecanico || ""}</td>
-            <td>${row.rut_creador || ""}</td>
-            <td>${row.fecha_salida || ""}</td>
-            <td>${row.duracion_dias ?? ""}</td>
-          </tr>
-        `
-          )
-          .join("");
+        const html = items.map(filaHtml).join("");
+        if (append) body.insertAdjacentHTML("beforeend", html);
+        else body.innerHTML = html;
       }
 
-      $("#tablaCount") &&
-        ($("#tablaCount").textContent = `${items.length} registro(s)`);
+      totalCargadas += items.length;
+      actualizarPie();
     } catch (e) {
       console.error("Error loadOTs", e);
-      if (body) {
+      if (body && !append) {
         body.innerHTML =
           '<tr><td colspan="10" class="text-danger">Error de red</td></tr>';
       }
+    } finally {
+      cargando = false;
     }
   }
 
@@ -190,6 +232,11 @@
 
     $("#fltEstado")?.addEventListener("change", () => loadOTs());
 
+    $("#btnCargarMas")?.addEventListener("click", (e) => {
+      e.preventDefault();
+      loadOTs(true);
+    });
+
     // Rango por defecto (protegido por null-check)
     const def = defaultRange();
     const fromInput = $("#fromDate");
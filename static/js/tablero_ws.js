@@ -0,0 +1,77 @@
+// static/js/tablero_ws.js
+// ======================================================
+//  Tablero en vivo del recinto (WebSocket /ws/tablero/)
+//  - El servidor empuja deltas de OT / solicitud / vehículo
+//  - Reconexión con backoff exponencial
+//  - Mientras el socket está caído se usa polling de respaldo
+// ======================================================
+
+function conectarTablero(onEvento, opciones = {}) {
+    const fallbackMs = opciones.fallbackMs || 30000;
+    let intentos = 0;
+    let pollTimer = null;
+    let socket = null;
+
+    function iniciarFallback() {
+        if (pollTimer) return;
+        pollTimer = setInterval(() => onEvento({ tipo: "refresco" }), fallbackMs);
+    }
+
+    function detenerFallback() {
+        if (!pollTimer) return;
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+
+    function abrir() {
+        const proto = window.location.protocol === "https:" ? "wss://" : "ws://";
+        socket = new WebSocket(proto + window.location.host + "/ws/tablero/");
+
+        socket.onopen = () => {
+            // Si hubo desconexión, refrescamos una vez para no perder cambios
+            if (intentos > 0) onEvento({ tipo: "refresco" });
+            intentos = 0;
+            detenerFallback();
+        };
+
+        socket.onmessage = (e) => {
+            try {
+                onEvento(JSON.parse(e.data));
+            } catch (err) {
+                console.error("❌ Evento de tablero inválido:", err);
+            }
+        };
+
+        socket.onclose = () => {
+            iniciarFallback();
+            intentos += 1;
+            const espera = Math.min(30000, 1000 * 2 ** Math.min(intentos, 5));
+            setTimeout(abrir, espera);
+        };
+    }
+
+    if (!("WebSocket" in window)) {
+        iniciarFallback();
+        return null;
+    }
+
+    abrir();
+    return {
+        cerrar: () => {
+            detenerFallback();
+            if (socket) {
+                socket.onclose = null;
+                socket.close();
+            }
+        },
+    };
+}
+
+// Agrupa ráfagas de eventos en una sola recarga
+function debounce(fn, ms = 300) {
+    let t = null;
+    return (...args) => {
+        clearTimeout(t);
+        t = setTimeout(() => fn(...args), ms);
+    };
+}
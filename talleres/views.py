@@ -2,11 +2,16 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from datetime import date
 
-from autenticacion.models import Empleado
+from autenticacion.middleware import get_empleado
 from autenticacion.roles import mecanico_or_supervisor
 from vehiculos.models import Vehiculo
+from ordenestrabajo import punteros
+from ordenestrabajo.estados import (
+    TransicionConflicto,
+    TransicionInvalida,
+    aplicar_transicion,
+)
 from ordenestrabajo.models import OrdenTrabajo
 
 
@@ -20,13 +25,8 @@ def registro_taller_page(request):
 
     user = request.user
 
-    # Antes: select_related("taller") → ahora usamos "recinto"
-    empleado = (
-        Empleado.objects
-        .select_related("recinto")
-        .filter(usuario=user.username)
-        .first()
-    )
+    # Empleado con su recinto, resuelto una vez por request
+    empleado = get_empleado(request)
 
     # modo de vista según cargo
     modo = "mecanico"
@@ -62,48 +62,21 @@ def registro_taller_page(request):
                 "message": "Debe ingresar un comentario para finalizar la OT."
             })
 
-        veh = Vehiculo.objects.filter(patente=patente).first()
-        if not veh:
+        if not Vehiculo.objects.filter(patente=patente).exists():
             return JsonResponse({"success": False, "message": f"No existe el vehículo {patente}."})
 
-        ot = (
-            OrdenTrabajo.objects.filter(
-                patente_id=patente,
-                estado__in=["Pendiente", "En Taller", "En Proceso", "Pausado"]
-            )
-            .order_by("-fecha_ingreso", "-hora_ingreso")
-            .first()
-        )
+        ot = punteros.ot_activa(patente).defer("descripcion").first()
 
         if not ot:
             return JsonResponse({"success": False, "message": "No hay OT activa para actualizar."})
 
-        TRANSICIONES_VALIDAS = {
-            "Pendiente": ["En Taller"],
-            "En Taller": ["En Proceso", "Pausado"],
-            "En Proceso": ["Pausado", "Finalizado"],
-            "Pausado": ["En Taller", "En Proceso", "Finalizado"],
-        }
-
-        estado_actual = ot.estado
-
-        if nuevo_estado not in TRANSICIONES_VALIDAS.get(estado_actual, []):
-            return JsonResponse({
-                "success": False,
-                "message": f"No se puede cambiar de {estado_actual} a {nuevo_estado}."
-            })
-
-        ot.estado = nuevo_estado
-        ot.descripcion = (ot.descripcion or "") + f"\n[{user.username}] {comentario}"
-
-        if nuevo_estado == "Finalizado":
-            ot.fecha_salida = date.today()
-            veh.estado = "Disponible"
-        else:
-            veh.estado = nuevo_estado
-
-        veh.save()
-        ot.save()
+        # Matriz de transiciones y efectos compartidos con api_cambiar_estado
+        try:
+            aplicar_transicion(ot, nuevo_estado, empleado, comentario, nombre=user.username)
+        except TransicionInvalida as e:
+            return JsonResponse({"success": False, "message": str(e)})
+        except TransicionConflicto as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=409)
 
         return JsonResponse({"success": True, "message": "Estado actualizado correctamente."})
 
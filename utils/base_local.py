@@ -0,0 +1,44 @@
+# utils/base_local.py
+"""
+Utilidades para los comandos que escriben datos de prueba (generar_flota,
+bench_*): solo deben correr contra una base local, nunca contra la de
+producción, y necesitan las tablas de los modelos managed=False.
+"""
+from django.apps import apps
+from django.core.management.base import CommandError
+from django.db import connection
+
+HOSTS_LOCALES = ("localhost", "127.0.0.1", "::1")
+
+
+def verificar_base_local(forzar=False):
+    """
+    Lanza CommandError si la base no es SQLite ni MySQL en localhost.
+    `forzar` (opción --forzar del comando) salta el control.
+    """
+    if connection.vendor == "sqlite" or forzar:
+        return
+    host = connection.settings_dict.get("HOST") or "localhost"
+    if host not in HOSTS_LOCALES:
+        raise CommandError(
+            f"La base está en {host}: este comando escribe datos de prueba y es "
+            "solo para bases locales (usa DB_ENGINE=sqlite o --forzar)."
+        )
+
+
+def crear_tablas_faltantes():
+    """
+    Crea con el schema_editor las tablas que falten (también las de los
+    modelos managed=False, que `migrate` no crea). Devuelve sus nombres.
+    """
+    existentes = set(connection.introspection.table_names())
+    creadas = []
+    with connection.schema_editor() as editor:
+        for modelo in apps.get_models():
+            tabla = modelo._meta.db_table
+            if modelo._meta.proxy or tabla in existentes:
+                continue
+            editor.create_model(modelo)
+            existentes.add(tabla)
+            creadas.append(tabla)
+    return creadas
@@ -1,6 +1,6 @@
 # utils/estadisticas.py
-from vehiculos.models import Vehiculo
-from autenticacion.models import Empleado
+from reportes import kpis as kpi_snapshot
+
 
 def contar_vehiculos_por_estado():
     """
@@ -9,13 +9,15 @@ def contar_vehiculos_por_estado():
     - En taller
     - En proceso
     - Disponibles
+
+    Se leen del snapshot materializado (reportes.kpis), sin contar la tabla.
     """
-    vehiculos = Vehiculo.objects.all()
+    kpis = kpi_snapshot.leer_kpis()
     return {
-        'total': vehiculos.count(),
-        'en_taller': vehiculos.filter(estado__iexact='En Taller').count(),
-        'en_proceso': vehiculos.filter(estado__iexact='En Proceso').count(),
-        'disponibles': vehiculos.filter(estado__iexact='Disponible').count(),
+        'total': kpis.get(kpi_snapshot.VEHICULOS_TOTAL, 0),
+        'en_taller': kpis.get(kpi_snapshot.VEHICULOS_ESTADO + 'En Taller', 0),
+        'en_proceso': kpis.get(kpi_snapshot.VEHICULOS_ESTADO + 'En Proceso', 0),
+        'disponibles': kpis.get(kpi_snapshot.VEHICULOS_ESTADO + 'Disponible', 0),
     }
 
 
@@ -23,4 +25,4 @@ def contar_empleados_activos():
     """
     Devuelve la cantidad de empleados activos (solo para supervisores).
     """
-    return Empleado.objects.filter(is_active=True).count()
+    return kpi_snapshot.leer_kpis().get(kpi_snapshot.EMPLEADOS_ACTIVOS, 0)
@@ -0,0 +1,94 @@
+# utils/fragmentos.py
+"""
+Caché de fragmentos HTML y payloads JSON ya renderizados.
+
+Las APIs de los paneles devuelven la misma tabla (render_to_string) a todos
+los usuarios del mismo recinto (o al mismo mecánico) hasta que cambian sus
+datos. `fragmento()` guarda el resultado con clave
+
+    fragmento:<endpoint>:<ámbito>:<hash de las versiones>
+
+usando las versiones de utils/versiones.py, que ya incrementan los
+post_save / post_delete de OrdenTrabajo, SolicitudIngresoVehiculo,
+Vehiculo y Empleado y las transiciones de estado. Al cambiar una versión
+la clave cambia: no hay que borrar nada, las entradas viejas expiran por
+FRAGMENTOS_TTL.
+
+Funciona igual con LocMemCache (desarrollo, un proceso) que con Redis
+(producción, compartida entre workers).
+
+`contadores()` devuelve los aciertos/fallos por endpoint de este proceso.
+"""
+import hashlib
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import versiones as versiones_mod
+
+logger = logging.getLogger(__name__)
+
+FRAGMENTOS_TTL = getattr(settings, "FRAGMENTOS_TTL", 600)
+
+HIT = "hit"
+MISS = "miss"
+
+_contadores = Counter()
+_lock = threading.Lock()
+
+
+def _contar(endpoint, resultado):
+    with _lock:
+        _contadores[(endpoint, resultado)] += 1
+
+
+def contadores():
+    """{endpoint: {"hit": n, "miss": n}} desde que partió el proceso."""
+    with _lock:
+        copia = dict(_contadores)
+    resultado = {}
+    for (endpoint, tipo), n in copia.items():
+        resultado.setdefault(endpoint, {HIT: 0, MISS: 0})[tipo] = n
+    return resultado
+
+
+def reiniciar_contadores():
+    with _lock:
+        _contadores.clear()
+
+
+def _clave(endpoint, ambito, versiones):
+    huella = hashlib.sha1("|".join(str(v) for v in versiones).encode()).hexdigest()[:16]
+    return f"fragmento:{endpoint}:{ambito}:{huella}"
+
+
+def fragmento(endpoint, ambito, dependencias, generar):
+    """
+    Resultado cacheado de `generar()` para (endpoint, ámbito) mientras no
+    cambie ninguna de las `dependencias` [(recurso, ámbito), ...].
+
+    `generar` debe devolver algo serializable (str, dict, list) que no
+    dependa del usuario. Si la caché falla se genera igual, sin guardar.
+    """
+    try:
+        clave = _clave(endpoint, ambito, versiones_mod.versiones(dependencias))
+        valor = cache.get(clave)
+    except Exception as e:
+        logger.warning("Caché de fragmentos no disponible (%s): %s", endpoint, e)
+        _contar(endpoint, MISS)
+        return generar()
+
+    if valor is not None:
+        _contar(endpoint, HIT)
+        return valor
+
+    _contar(endpoint, MISS)
+    valor = generar()
+    try:
+        cache.set(clave, valor, FRAGMENTOS_TTL)
+    except Exception as e:
+        logger.warning("No se pudo guardar el fragmento %s: %s", clave, e)
+    return valor
@@ -0,0 +1,457 @@
+# utils/metricas.py
+"""
+Métricas por endpoint en formato Prometheus (GET /metrics).
+
+`MetricasMiddleware` mide cada request y lo agrupa por nombre de la ruta
+resuelta (`request.resolver_match.view_name`, p.ej.
+"ordenestrabajo:api_supervisor_vehiculos"; "sin_ruta" para los 404):
+
+  - http_request_duration_seconds  histograma de latencia (vista, metodo, estado)
+  - db_queries_total               consultas SQL (connection.execute_wrapper)
+  - db_seconds_total               tiempo dentro de la BD
+  - template_render_seconds_total  tiempo renderizando plantillas (backend
+                                   `utils.metricas.DjangoTemplatesMedidas`,
+                                   sin las consultas que se ejecutan dentro)
+  - cache_seconds_total            tiempo en la caché de Django (backends
+                                   `LocMemCacheMedida` / `RedisCacheMedida`)
+  - fragment_cache_requests_total  aciertos/fallos de utils.fragmentos
+
+Las respuestas de SERVER_TIMING_PREFIJOS (/api/, /reportes/api/,
+/vehiculos/api/, /chat/api/) llevan además el header `Server-Timing` (db,
+cache, render, app y total, con la cantidad de consultas), que las devtools
+del navegador muestran en la pestaña Network. Los requests de más de
+LENTOS_MS se registran en el logger `utils.metricas.lentos` (una fracción
+LENTOS_MUESTREO de ellos).
+
+Cada proceso acumula en memoria y, como mucho cada METRICAS_INTERVALO
+segundos, vuelca su total a METRICAS_DIR/<pid>.json (escritura atómica). La
+vista /metrics suma los archivos de todos los workers del servidor; los de
+procesos que ya no existen se consolidan en `terminados.json` para que los
+contadores no retrocedan al reciclar workers.
+
+Acceso a /metrics: con METRICAS_TOKEN configurado se exige
+`Authorization: Bearer <token>`; sin él, un usuario staff (o localhost, si
+METRICAS_CONFIAR_LOCAL está activo).
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+from django.template.backends.django import DjangoTemplates, Template
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows (desarrollo): sin candado
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+logger_lentos = logging.getLogger(__name__ + ".lentos")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LATENCIA = "http_request_duration_seconds"
+CONSULTAS = "db_queries_total"
+TIEMPO_BD = "db_seconds_total"
+TIEMPO_PLANTILLAS = "template_render_seconds_total"
+TIEMPO_CACHE = "cache_seconds_total"
+FRAGMENTOS = "fragment_cache_requests_total"
+
+TIPOS = {
+    LATENCIA: ("histogram", "Latencia de los requests por vista."),
+    CONSULTAS: ("counter", "Consultas SQL ejecutadas por vista."),
+    TIEMPO_BD: ("counter", "Segundos dentro de la base de datos por vista."),
+    TIEMPO_PLANTILLAS: ("counter", "Segundos renderizando plantillas por vista."),
+    TIEMPO_CACHE: ("counter", "Segundos en la caché de Django por vista."),
+    FRAGMENTOS: ("counter", "Aciertos/fallos de la caché de fragmentos por endpoint."),
+}
+
+ARCHIVO_TERMINADOS = "terminados.json"
+ARCHIVO_CANDADO = ".candado"
+
+# Medición del request en curso (la completan los backends medidos)
+_medicion = contextvars.ContextVar("medicion_request", default=None)
+
+
+class Medicion:
+    """Tiempos (segundos) y contadores de un request."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.bd = 0.0
+        self.operaciones_cache = 0
+        self.cache = 0.0
+        self.plantillas = 0.0
+        self.en_cache = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.bd += time.perf_counter() - inicio
+
+    def server_timing(self, total):
+        app = max(total - self.bd - self.cache - self.plantillas, 0.0)
+        return ", ".join([
+            f'db;dur={self.bd * 1000:.1f};desc="{self.consultas} consultas"',
+            f'cache;dur={self.cache * 1000:.1f};desc="{self.operaciones_cache} ops"',
+            f"render;dur={self.plantillas * 1000:.1f}",
+            f"app;dur={app * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+
+# ==========================================================
+# REGISTRO EN MEMORIA (por proceso)
+# ==========================================================
+# {(nombre, ((etiqueta, valor), ...)): valor}
+_series = defaultdict(float)
+_lock = threading.Lock()
+_ultimo_volcado = 0.0
+
+
+def _etiquetas(**etiquetas):
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _observar_latencia(segundos, **etiquetas):
+    base = _etiquetas(**etiquetas)
+    for limite in BUCKETS:
+        if segundos <= limite:
+            _series[(LATENCIA + "_bucket", base + (("le", str(limite)),))] += 1
+    _series[(LATENCIA + "_bucket", base + (("le", "+Inf"),))] += 1
+    _series[(LATENCIA + "_sum", base)] += segundos
+    _series[(LATENCIA + "_count", base)] += 1
+
+
+def registrar_request(vista, metodo, estado, segundos, medicion):
+    with _lock:
+        _observar_latencia(segundos, vista=vista, metodo=metodo, estado=estado)
+        por_vista = _etiquetas(vista=vista)
+        _series[(CONSULTAS, por_vista)] += medicion.consultas
+        _series[(TIEMPO_BD, por_vista)] += medicion.bd
+        if medicion.plantillas:
+            _series[(TIEMPO_PLANTILLAS, por_vista)] += medicion.plantillas
+        if medicion.cache:
+            _series[(TIEMPO_CACHE, por_vista)] += medicion.cache
+
+
+def _instantanea():
+    """Series de este proceso, incluidos los contadores de utils.fragmentos."""
+    from . import fragmentos
+
+    with _lock:
+        series = dict(_series)
+    for endpoint, valores in fragmentos.contadores().items():
+        for resultado, n in valores.items():
+            series[(FRAGMENTOS, _etiquetas(endpoint=endpoint, resultado=resultado))] = n
+    return series
+
+
+# ==========================================================
+# ALMACÉN COMPARTIDO (un archivo por proceso)
+# ==========================================================
+def _directorio():
+    directorio = settings.METRICAS_DIR
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def _a_json(series):
+    return [[nombre, list(map(list, etiquetas)), valor] for (nombre, etiquetas), valor in series.items()]
+
+
+def _de_json(filas):
+    return {(nombre, tuple(map(tuple, etiquetas))): valor for nombre, etiquetas, valor in filas}
+
+
+def _escribir(ruta, series):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w") as f:
+        json.dump(_a_json(series), f)
+    os.replace(temporal, ruta)
+
+
+def _leer(ruta):
+    try:
+        with open(ruta) as f:
+            return _de_json(json.load(f))
+    except (OSError, ValueError) as e:
+        logger.warning("Métricas: no se pudo leer %s: %s", ruta, e)
+        return {}
+
+
+def volcar(forzar=False):
+    """Escribe el total de este proceso en METRICAS_DIR/<pid>.json."""
+    global _ultimo_volcado
+    ahora = time.monotonic()
+    if not forzar and ahora - _ultimo_volcado < settings.METRICAS_INTERVALO:
+        return
+    _ultimo_volcado = ahora
+    series = _instantanea()
+    if not series:
+        # Procesos sin requests (comandos de manage.py) no dejan archivo
+        return
+    try:
+        _escribir(os.path.join(_directorio(), f"{os.getpid()}.json"), series)
+    except OSError as e:
+        logger.warning("Métricas: no se pudo volcar el proceso %s: %s", os.getpid(), e)
+
+
+def _vivo(pid):
+    if os.name == "nt":
+        # En Windows os.kill termina el proceso: se asume vivo
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _sumar(total, series):
+    for clave, valor in series.items():
+        total[clave] = total.get(clave, 0) + valor
+
+
+def leer_todo():
+    """Suma de las series de todos los procesos (vivos y terminados)."""
+    volcar(forzar=True)
+    directorio = _directorio()
+    total = {}
+
+    with open(os.path.join(directorio, ARCHIVO_CANDADO), "w") as candado:
+        if fcntl is not None:
+            fcntl.flock(candado, fcntl.LOCK_EX)
+        ruta_terminados = os.path.join(directorio, ARCHIVO_TERMINADOS)
+        terminados = _leer(ruta_terminados) if os.path.exists(ruta_terminados) else {}
+        consolidar = []
+
+        for archivo in os.listdir(directorio):
+            pid, ext = os.path.splitext(archivo)
+            if ext != ".json" or not pid.isdigit():
+                continue
+            ruta = os.path.join(directorio, archivo)
+            series = _leer(ruta)
+            if _vivo(int(pid)):
+                _sumar(total, series)
+            else:
+                _sumar(terminados, series)
+                consolidar.append(ruta)
+
+        if consolidar:
+            _escribir(ruta_terminados, terminados)
+            for ruta in consolidar:
+                os.remove(ruta)
+
+    _sumar(total, terminados)
+    return total
+
+
+atexit.register(volcar, forzar=True)
+
+
+# ==========================================================
+# FORMATO PROMETHEUS
+# ==========================================================
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _base(nombre):
+    for sufijo in ("_bucket", "_sum", "_count"):
+        if nombre.endswith(sufijo) and nombre[: -len(sufijo)] in TIPOS:
+            return nombre[: -len(sufijo)]
+    return nombre
+
+
+def _orden_le(etiquetas):
+    le = dict(etiquetas).get("le")
+    if le is None:
+        return 0.0
+    return float("inf") if le == "+Inf" else float(le)
+
+
+def formato_prometheus(series):
+    por_base = defaultdict(list)
+    for (nombre, etiquetas), valor in series.items():
+        por_base[_base(nombre)].append((nombre, etiquetas, valor))
+
+    lineas = []
+    for base in sorted(por_base):
+        tipo, ayuda = TIPOS.get(base, ("untyped", ""))
+        lineas.append(f"# HELP {base} {ayuda}")
+        lineas.append(f"# TYPE {base} {tipo}")
+        filas = sorted(
+            por_base[base],
+            key=lambda f: (f[0], [e for e in f[1] if e[0] != "le"], _orden_le(f[1])),
+        )
+        for nombre, etiquetas, valor in filas:
+            texto = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas)
+            lineas.append(f"{nombre}{{{texto}}} {valor:g}" if texto else f"{nombre} {valor:g}")
+    return "\n".join(lineas) + "\n"
+
+
+# ==========================================================
+# MIDDLEWARE
+# ==========================================================
+class MetricasMiddleware:
+    """Debe ir primero en MIDDLEWARE para medir el request completo."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefijos = tuple(settings.SERVER_TIMING_PREFIJOS)
+
+    def __call__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(medicion):
+                response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        total = time.perf_counter() - inicio
+
+        match = getattr(request, "resolver_match", None)
+        vista = (match.view_name if match else None) or "sin_ruta"
+        registrar_request(vista, request.method, response.status_code, total, medicion)
+
+        if request.path.startswith(self.prefijos):
+            response["Server-Timing"] = medicion.server_timing(total)
+
+        if total * 1000 >= settings.LENTOS_MS and random.random() < settings.LENTOS_MUESTREO:
+            logger_lentos.warning(
+                "Request lento: %s %s (%s) %s -> %.0f ms | %s",
+                request.method, request.get_full_path(), vista, response.status_code,
+                total * 1000, medicion.server_timing(total),
+            )
+
+        volcar()
+        return response
+
+
+# ==========================================================
+# BACKENDS MEDIDOS (plantillas y caché)
+# ==========================================================
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        medicion = _medicion.get()
+        if medicion is None:
+            return super().render(context, request)
+
+        inicio = time.perf_counter()
+        bd, cache = medicion.bd, medicion.cache
+        try:
+            return super().render(context, request)
+        finally:
+            # Las consultas perezosas y la caché usadas dentro del render
+            # ya se cuentan en db / cache
+            medicion.plantillas += (
+                time.perf_counter() - inicio - (medicion.bd - bd) - (medicion.cache - cache)
+            )
+
+
+class DjangoTemplatesMedidas(DjangoTemplates):
+    """
+    DjangoTemplates que suma el tiempo de render al request en curso.
+    Solo se mide la plantilla pedida (los {% include %} van dentro de ella).
+    """
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        plantilla = super().get_template(template_name)
+        return PlantillaMedida(plantilla.template, self)
+
+
+def _medido(nombre):
+    def metodo(self, *args, **kwargs):
+        return self._medir(nombre, *args, **kwargs)
+
+    metodo.__name__ = nombre
+    return metodo
+
+
+class _CacheMedida:
+    """Suma al request en curso el tiempo de cada operación de caché."""
+
+    def _medir(self, nombre, *args, **kwargs):
+        original = getattr(super(), nombre)
+        medicion = _medicion.get()
+        if medicion is None or medicion.en_cache:
+            # get_many/get_or_set de algunos backends llaman a get/add: se
+            # mide solo la operación externa
+            return original(*args, **kwargs)
+
+        medicion.en_cache = True
+        inicio = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            medicion.en_cache = False
+            medicion.operaciones_cache += 1
+            medicion.cache += time.perf_counter() - inicio
+
+    get = _medido("get")
+    get_many = _medido("get_many")
+    get_or_set = _medido("get_or_set")
+    has_key = _medido("has_key")
+    set = _medido("set")
+    set_many = _medido("set_many")
+    add = _medido("add")
+    touch = _medido("touch")
+    incr = _medido("incr")
+    decr = _medido("decr")
+    delete = _medido("delete")
+    delete_many = _medido("delete_many")
+
+
+class LocMemCacheMedida(_CacheMedida, LocMemCache):
+    pass
+
+
+class RedisCacheMedida(_CacheMedida, RedisCache):
+    pass
+
+
+# ==========================================================
+# VISTA /metrics
+# ==========================================================
+LOCALES = {"127.0.0.1", "::1"}
+
+
+def _autorizado(request):
+    token = settings.METRICAS_TOKEN
+    if token:
+        return request.headers.get("Authorization", "") == f"Bearer {token}"
+    if settings.METRICAS_CONFIAR_LOCAL and request.META.get("REMOTE_ADDR") in LOCALES:
+        return True
+    user = getattr(request, "user", None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+def metrics_view(request):
+    """Métricas de todos los workers en formato de texto de Prometheus."""
+    if not _autorizado(request):
+        return JsonResponse({"success": False, "message": "No autorizado."}, status=403)
+    return HttpResponse(
+        formato_prometheus(leer_todo()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
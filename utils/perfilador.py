@@ -0,0 +1,235 @@
+# utils/perfilador.py
+"""
+Perfilado bajo demanda de un request (staff / ADMIN_WEB).
+
+Para ver dónde se va el tiempo de una página lenta, un usuario staff
+(supervisores y ADMIN_WEB, ver autenticacion.models.sincronizar_grupo)
+repite el request con
+
+    ?_perfilar=1          o el header    X-Perfilar: 1
+
+`PerfiladorMiddleware` lo ejecuta bajo cProfile y registra cada consulta
+SQL con su duración y las líneas del proyecto que la originaron. El
+resultado queda en PERFILES_DIR como un anillo de a lo más PERFILES_MAX
+capturas (las más antiguas se borran):
+
+    <id>.prof   estadísticas de cProfile (pstats / snakeviz)
+    <id>.json   request, tiempos, funciones más costosas y log de SQL
+
+La respuesta lleva `X-Perfil-Id: <id>`. Las capturas se listan y
+descargan en Admin Web → Perfiles (autenticacion.views_pages).
+
+Para el resto de los requests el middleware solo revisa el parámetro y el
+header.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+
+from autenticacion.roles import has_role
+
+logger = logging.getLogger(__name__)
+
+PARAMETRO = "_perfilar"
+HEADER = "X-Perfilar"
+
+# Límites por captura (un request patológico no llena el disco)
+MAX_CONSULTAS = 1000
+MAX_SQL = 2000
+FUNCIONES_TOP = 40
+
+_RE_ID = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}$")
+
+_RAIZ = str(settings.BASE_DIR)
+_EXCLUIR = (os.path.join(_RAIZ, "env") + os.sep, __file__)
+
+
+def directorio():
+    ruta = settings.PERFILES_DIR
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+def id_valido(perfil_id):
+    return bool(_RE_ID.match(perfil_id or ""))
+
+
+def puede_perfilar(user):
+    return bool(
+        user and user.is_authenticated
+        and (user.is_staff or user.is_superuser or has_role(user, ["ADMIN_WEB"]))
+    )
+
+
+def _solicitado(request):
+    return request.GET.get(PARAMETRO) == "1" or request.headers.get(HEADER) == "1"
+
+
+def _origen():
+    """Últimas líneas del proyecto (fuera de env/ y de Django) en la pila."""
+    lineas = []
+    for frame in traceback.extract_stack()[:-3]:
+        if frame.filename.startswith(_RAIZ) and not frame.filename.startswith(_EXCLUIR):
+            lineas.append(
+                f"{os.path.relpath(frame.filename, _RAIZ)}:{frame.lineno} {frame.name}"
+            )
+    return lineas[-4:]
+
+
+# ==========================================================
+# CAPTURA
+# ==========================================================
+class _LogSQL:
+    """execute_wrapper que guarda cada consulta con su duración y origen."""
+
+    def __init__(self):
+        self.consultas = []
+        self.total = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.total += 1
+            self.segundos += duracion
+            if len(self.consultas) < MAX_CONSULTAS:
+                self.consultas.append({
+                    "ms": round(duracion * 1000, 3),
+                    "sql": sql[:MAX_SQL],
+                    "origen": _origen(),
+                })
+
+
+def _top_funciones(perfil):
+    salida = io.StringIO()
+    stats = pstats.Stats(perfil, stream=salida)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(FUNCIONES_TOP)
+    return salida.getvalue()
+
+
+def _guardar(perfil, log_sql, request, response, segundos):
+    ahora = datetime.now()
+    perfil_id = f"{ahora:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+    base = os.path.join(directorio(), perfil_id)
+
+    perfil.dump_stats(base + ".prof")
+    datos = {
+        "id": perfil_id,
+        "fecha": ahora.isoformat(timespec="seconds"),
+        "usuario": request.user.get_username(),
+        "metodo": request.method,
+        "ruta": request.get_full_path(),
+        "estado": response.status_code,
+        "ms": round(segundos * 1000, 1),
+        "sql_total": log_sql.total,
+        "sql_ms": round(log_sql.segundos * 1000, 1),
+        "consultas": log_sql.consultas,
+        "funciones": _top_funciones(perfil),
+    }
+    temporal = f"{base}.json.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(temporal, base + ".json")
+
+    _recortar()
+    return perfil_id
+
+
+def _recortar():
+    """Deja solo las PERFILES_MAX capturas más recientes."""
+    ids = sorted(
+        (nombre[:-5] for nombre in os.listdir(directorio()) if nombre.endswith(".json")),
+        reverse=True,
+    )
+    for viejo in ids[settings.PERFILES_MAX:]:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(directorio(), viejo + ext))
+            except FileNotFoundError:
+                pass
+
+
+# ==========================================================
+# LECTURA (página Admin Web)
+# ==========================================================
+def listar():
+    """Resumen de las capturas, de la más reciente a la más antigua."""
+    resumen = []
+    for nombre in sorted(os.listdir(directorio()), reverse=True):
+        if not nombre.endswith(".json"):
+            continue
+        datos = leer(nombre[:-5])
+        if datos:
+            datos.pop("consultas", None)
+            datos.pop("funciones", None)
+            resumen.append(datos)
+    return resumen
+
+
+def leer(perfil_id):
+    if not id_valido(perfil_id):
+        return None
+    try:
+        with open(os.path.join(directorio(), perfil_id + ".json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ruta_archivo(perfil_id, extension):
+    """Ruta del .prof/.json de la captura, o None si no existe."""
+    if not id_valido(perfil_id) or extension not in ("prof", "json"):
+        return None
+    ruta = os.path.join(directorio(), f"{perfil_id}.{extension}")
+    return ruta if os.path.exists(ruta) else None
+
+
+# ==========================================================
+# MIDDLEWARE
+# ==========================================================
+class PerfiladorMiddleware:
+    """Debe ir después de AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _solicitado(request) or not puede_perfilar(getattr(request, "user", None)):
+            return self.get_response(request)
+
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError as e:
+            # Otro perfilador activo en el mismo hilo (Python 3.12+)
+            logger.warning("No se pudo perfilar %s: %s", request.path, e)
+            return self.get_response(request)
+
+        log_sql = _LogSQL()
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(log_sql):
+                response = self.get_response(request)
+        finally:
+            perfil.disable()
+        segundos = time.perf_counter() - inicio
+
+        try:
+            response["X-Perfil-Id"] = _guardar(perfil, log_sql, request, response, segundos)
+        except OSError as e:
+            logger.warning("No se pudo guardar el perfil de %s: %s", request.path, e)
+        return response
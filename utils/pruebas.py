@@ -0,0 +1,46 @@
+# utils/pruebas.py
+"""
+Runner de `python manage.py test` (TEST_RUNNER en settings).
+
+Casi todos los modelos son managed=False: `migrate` no crea sus tablas en
+la base de pruebas. Después de crearla se agregan las que falten con
+utils.base_local.crear_tablas_faltantes, igual que generar_flota.
+
+Las pruebas corren sin Redis: caché en memoria (LocMemCacheMedida, la
+misma que CACHE_BACKEND=locmem) y channel layer en memoria.
+
+Uso (base de pruebas SQLite en memoria):
+    DB_ENGINE=sqlite python manage.py test
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from utils.base_local import crear_tablas_faltantes
+
+AJUSTES_PRUEBAS = {
+    "CACHES": {
+        "default": {
+            "BACKEND": "utils.metricas.LocMemCacheMedida",
+            "LOCATION": "pepsico-taller-pruebas",
+        }
+    },
+    "CHANNEL_LAYERS": {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
+    },
+}
+
+
+class Runner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._ajustes = override_settings(**AJUSTES_PRUEBAS)
+        self._ajustes.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._ajustes.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        bases = super().setup_databases(**kwargs)
+        crear_tablas_faltantes()
+        return bases
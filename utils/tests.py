@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from . import fragmentos, metricas, versiones
+
+
+# ==========================================================
+# CACHÉ DE FRAGMENTOS
+# ==========================================================
+class FragmentoTests(SimpleTestCase):
+    dependencias = [(versiones.OTS, 1)]
+
+    def setUp(self):
+        cache.clear()
+        fragmentos.reiniciar_contadores()
+        self.generados = 0
+
+    def generar(self):
+        self.generados += 1
+        return f"<tr>{self.generados}</tr>"
+
+    def pedir(self, ambito=1, dependencias=None):
+        return fragmentos.fragmento("tabla", ambito, dependencias or self.dependencias, self.generar)
+
+    def test_fallo_y_luego_acierto(self):
+        self.assertEqual(self.pedir(), "<tr>1</tr>")
+        self.assertEqual(self.pedir(), "<tr>1</tr>")
+
+        self.assertEqual(self.generados, 1)
+        self.assertEqual(fragmentos.contadores(), {"tabla": {"hit": 1, "miss": 1}})
+
+    def test_ambitos_separados(self):
+        self.pedir(ambito=1)
+        self.assertEqual(self.pedir(ambito=2, dependencias=[(versiones.OTS, 2)]), "<tr>2</tr>")
+
+    def test_version_nueva_invalida(self):
+        self.pedir()
+        versiones.incrementar(versiones.OTS, 1)
+
+        self.assertEqual(self.pedir(), "<tr>2</tr>")
+        self.assertEqual(fragmentos.contadores(), {"tabla": {"hit": 0, "miss": 2}})
+
+    def test_version_de_otro_ambito_no_invalida(self):
+        self.pedir()
+        versiones.incrementar(versiones.OTS, 2)
+        versiones.incrementar(versiones.SOLICITUDES, 1)
+
+        self.assertEqual(self.pedir(), "<tr>1</tr>")
+
+    def test_invalidar_todo(self):
+        self.pedir()
+        versiones.invalidar_todo()
+
+        self.assertEqual(self.pedir(), "<tr>2</tr>")
+
+    def test_sin_cache_genera_igual(self):
+        with mock.patch.object(fragmentos.cache, "get", side_effect=ConnectionError("caída")):
+            with self.assertLogs("utils.fragmentos", "WARNING"):
+                self.assertEqual(self.pedir(), "<tr>1</tr>")
+
+        self.assertEqual(fragmentos.contadores(), {"tabla": {"hit": 0, "miss": 1}})
+
+
+# ==========================================================
+# MÉTRICAS
+# ==========================================================
+class LeerTodoTests(SimpleTestCase):
+    """Suma de los archivos por proceso en METRICAS_DIR."""
+
+    MUERTO = 999999
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="pruebas-metricas-")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(METRICAS_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        for patcher in (
+            # Este proceso lleva 1 request; el resto viene de los archivos
+            mock.patch.object(metricas, "_instantanea", return_value={("requests_total", ()): 1}),
+            mock.patch.object(metricas, "_vivo", lambda pid: pid != self.MUERTO),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def escribir(self, archivo, series):
+        metricas._escribir(os.path.join(self.directorio, archivo), series)
+
+    def test_suma_vivos_y_consolida_terminados(self):
+        self.escribir(metricas.ARCHIVO_TERMINADOS, {("requests_total", ()): 10})
+        self.escribir(f"{self.MUERTO}.json", {
+            ("requests_total", ()): 2,
+            ("db_queries_total", (("vista", "a"),)): 7,
+        })
+        self.escribir("notas.json", {("requests_total", ()): 100})
+
+        esperado = {("requests_total", ()): 13, ("db_queries_total", (("vista", "a"),)): 7}
+        self.assertEqual(metricas.leer_todo(), esperado)
+
+        # El proceso terminado pasa a terminados.json: los contadores no
+        # retroceden ni se suman dos veces
+        archivos = set(os.listdir(self.directorio))
+        self.assertNotIn(f"{self.MUERTO}.json", archivos)
+        self.assertIn(f"{os.getpid()}.json", archivos)
+        self.assertEqual(
+            metricas._leer(os.path.join(self.directorio, metricas.ARCHIVO_TERMINADOS)),
+            {("requests_total", ()): 12, ("db_queries_total", (("vista", "a"),)): 7},
+        )
+        self.assertEqual(metricas.leer_todo(), esperado)
+
+    def test_archivo_corrupto_se_ignora(self):
+        with open(os.path.join(self.directorio, "123.json"), "w") as f:
+            f.write("{no es json")
+
+        with self.assertLogs("utils.metricas", "WARNING"):
+            self.assertEqual(metricas.leer_todo(), {("requests_total", ()): 1})
+
+    def test_volcado_legible(self):
+        metricas.volcar(forzar=True)
+        with open(os.path.join(self.directorio, f"{os.getpid()}.json")) as f:
+            self.assertEqual(json.load(f), [["requests_total", [], 1]])
+
+
+class FormatoPrometheusTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(metricas, "_series", defaultdict(float))
+        self.series = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def lineas(self):
+        texto = metricas.formato_prometheus(dict(self.series))
+        self.assertTrue(texto.endswith("\n"))
+        return texto.splitlines()
+
+    def test_histograma(self):
+        metricas._observar_latencia(0.07, vista="a", metodo="GET", estado=200)
+        lineas = self.lineas()
+
+        etiquetas = 'estado="200",metodo="GET",vista="a"'
+        self.assertEqual(lineas[:2], [
+            f"# HELP {metricas.LATENCIA} Latencia de los requests por vista.",
+            f"# TYPE {metricas.LATENCIA} histogram",
+        ])
+        # Buckets acumulados en orden de `le`, luego _count y _sum
+        self.assertEqual(lineas[2], f'{metricas.LATENCIA}_bucket{{{etiquetas},le="0.1"}} 1')
+        self.assertEqual(
+            [linea.split('le="')[1].split('"')[0] for linea in lineas if "_bucket" in linea],
+            ["0.1", "0.25", "0.5", "1.0", "2.5", "5.0", "10.0", "+Inf"],
+        )
+        self.assertEqual(lineas[-2:], [
+            f"{metricas.LATENCIA}_count{{{etiquetas}}} 1",
+            f"{metricas.LATENCIA}_sum{{{etiquetas}}} 0.07",
+        ])
+
+    def test_contadores_y_escape(self):
+        self.series[(metricas.CONSULTAS, metricas._etiquetas(vista='x"y\\z\n'))] = 3
+        self.series[("otra", ())] = 5
+
+        self.assertEqual(self.lineas(), [
+            f"# HELP {metricas.CONSULTAS} Consultas SQL ejecutadas por vista.",
+            f"# TYPE {metricas.CONSULTAS} counter",
+            f'{metricas.CONSULTAS}{{vista="x\\"y\\\\z\\n"}} 3',
+            "# HELP otra ",
+            "# TYPE otra untyped",
+            "otra 5",
+        ])
@@ -0,0 +1,241 @@
+# utils/versiones.py
+"""
+Versiones por recurso y recinto para GET condicionales (ETag / 304).
+
+Los paneles hacen polling cada pocos segundos y casi siempre reciben lo
+mismo. Cada recurso lleva un contador en la caché por ámbito:
+
+    version:ots:<recinto_id>       version:ots:rut:<rut_mecanico>
+    version:solicitudes:<recinto_id>
+    version:agenda:<recinto_id>:<fecha>   (ocupación de la agenda por día)
+    version:<recurso>:*            (global, se incrementa junto con el resto)
+
+Los save()/delete() de OrdenTrabajo, SolicitudIngresoVehiculo, Vehiculo y
+Empleado y las transiciones de la máquina de estados (`ot_estado_cambiado`)
+incrementan las versiones afectadas tras el COMMIT.
+
+Las vistas declaran de qué versiones depende su respuesta con
+`@condicional(dependencias)`: el ETag es un hash de esas versiones, del
+usuario y de la URL. Si el cliente envía el mismo ETag en If-None-Match la
+respuesta es 304 sin ejecutar la vista (ni consultas ni plantillas). El
+navegador revalida solo: `fetch` recibe el cuerpo que tenía en caché.
+
+Los QuerySet.update() no disparan señales: quien los haga debe llamar a
+`incrementar_despues`. Tras cargas masivas o cambios directos en MySQL,
+`invalidar_todo()` (lo llama `reconstruir_kpis`) cambia todos los ETags.
+
+Si la caché no responde, las vistas responden completo (sin ETag).
+"""
+import hashlib
+import logging
+import time
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from autenticacion.models import Empleado
+from ordenestrabajo import originales
+from ordenestrabajo.estados import ot_estado_cambiado
+from ordenestrabajo.models import OrdenTrabajo, SolicitudIngresoVehiculo
+from vehiculos.models import Vehiculo
+
+logger = logging.getLogger(__name__)
+
+OTS = "ots"
+SOLICITUDES = "solicitudes"
+VEHICULOS = "vehiculos"
+EMPLEADOS = "empleados"
+AGENDA = "agenda"
+
+GLOBAL = "*"
+_EPOCA = "version:epoca"
+
+VERSIONES_TTL = getattr(settings, "VERSIONES_TTL", 24 * 3600)
+
+
+def _clave(recurso, ambito):
+    return f"version:{recurso}:{ambito}"
+
+
+def ambito_mecanico(rut):
+    return f"rut:{rut}"
+
+
+def ambito_dia(recinto_id, fecha):
+    return f"{recinto_id}:{fecha.isoformat()}"
+
+
+def _inicial():
+    # Valor nuevo y distinto de cualquier anterior: si la clave expira o se
+    # vacía la caché, ningún ETag viejo vuelve a coincidir
+    return time.time_ns()
+
+
+# ==========================================================
+# LECTURA / INCREMENTO
+# ==========================================================
+def versiones(dependencias):
+    """
+    Lista con la versión de la época y de cada (recurso, ámbito), en ese
+    orden (un viaje a la caché). Inicializa las que falten.
+    """
+    claves = [_EPOCA] + [_clave(r, a) for r, a in dependencias]
+    valores = cache.get_many(claves)
+    faltan = {c: _inicial() for c in claves if c not in valores}
+    if faltan:
+        for clave, valor in faltan.items():
+            # add: si otro proceso la creó entre medio se usa la suya
+            if not cache.add(clave, valor, VERSIONES_TTL):
+                faltan[clave] = cache.get(clave, valor)
+        valores.update(faltan)
+    return [valores[c] for c in claves]
+
+
+def _incr(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, _inicial(), VERSIONES_TTL)
+
+
+def incrementar(recurso, *ambitos):
+    """Nueva versión de `recurso` en cada ámbito (y siempre en el global)."""
+    try:
+        for ambito in {GLOBAL, *(a for a in ambitos if a)}:
+            _incr(_clave(recurso, ambito))
+    except Exception as e:
+        logger.warning("No se pudo incrementar la versión de %s %s: %s", recurso, ambitos, e)
+
+
+def incrementar_despues(recurso, *ambitos):
+    """Como `incrementar`, tras el COMMIT (antes el cliente leería datos viejos)."""
+    transaction.on_commit(lambda: incrementar(recurso, *ambitos))
+
+
+def invalidar_todo():
+    """Cambia todos los ETags (cargas masivas, cambios hechos directo en la BD)."""
+    try:
+        _incr(_EPOCA)
+    except Exception as e:
+        logger.warning("No se pudo invalidar las versiones: %s", e)
+
+
+# ==========================================================
+# ETAG / DECORADOR
+# ==========================================================
+def etag(request, dependencias):
+    """ETag de la respuesta para el usuario, la URL y las versiones dadas."""
+    user = getattr(request, "user", None)
+    partes = [
+        str(user.pk) if user and user.is_authenticated else "-",
+        request.get_full_path(),
+        # Los rangos por defecto de los reportes dependen del día
+        date.today().isoformat(),
+        *(str(v) for v in versiones(dependencias)),
+    ]
+    return hashlib.sha1("|".join(partes).encode()).hexdigest()
+
+
+def globales(*recursos):
+    """Dependencias fijas: la versión global de cada recurso."""
+    deps = [(recurso, GLOBAL) for recurso in recursos]
+    return lambda request, *args, **kwargs: deps
+
+
+def condicional(dependencias):
+    """
+    GET condicional para vistas de polling.
+
+    `dependencias(request, *args, **kwargs)` devuelve la lista de
+    (recurso, ámbito) de los que depende la respuesta, o None para
+    responder sin ETag (p.ej. si no se pudo determinar el recinto).
+    Debe ir debajo de los decoradores de login/rol: un 304 no se entrega
+    a quien no puede ver la respuesta.
+    """
+    def _etag(request, *args, **kwargs):
+        try:
+            deps = dependencias(request, *args, **kwargs)
+            return etag(request, deps) if deps is not None else None
+        except Exception as e:
+            logger.warning("Sin ETag para %s: %s", request.path, e)
+            return None
+
+    def decorador(vista):
+        vista_condicional = condition(etag_func=_etag)(vista)
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            response = vista_condicional(request, *args, **kwargs)
+            # Solo en el navegador del usuario y siempre revalidado
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return envoltura
+
+    return decorador
+
+
+# ==========================================================
+# INVALIDACIÓN
+# ==========================================================
+def _huella_ot(instance):
+    return instance.recinto_id, instance.rut_id
+
+
+def _huella_original(instance):
+    original = originales.de(instance)
+    return (original["recinto_id"], original["rut_id"]) if original else None
+
+
+def _ot_cambiada(*huellas):
+    ambitos = set()
+    for huella in huellas:
+        if huella:
+            recinto_id, rut = huella
+            ambitos.add(recinto_id)
+            if rut:
+                ambitos.add(ambito_mecanico(rut))
+    incrementar_despues(OTS, *ambitos)
+
+
+@receiver(post_save, sender=OrdenTrabajo)
+def _ot_post_save(sender, instance, **kwargs):
+    _ot_cambiada(_huella_original(instance), _huella_ot(instance))
+
+
+@receiver(post_delete, sender=OrdenTrabajo)
+def _ot_post_delete(sender, instance, **kwargs):
+    _ot_cambiada(_huella_original(instance), _huella_ot(instance))
+
+
+@receiver(ot_estado_cambiado)
+def _ot_transicion(sender, recinto_id, rut=None, vehiculo_desde=None, vehiculo_hasta=None, **kwargs):
+    _ot_cambiada((recinto_id, rut))
+    if vehiculo_desde != vehiculo_hasta:
+        incrementar_despues(VEHICULOS)
+
+
+@receiver(post_save, sender=SolicitudIngresoVehiculo)
+@receiver(post_delete, sender=SolicitudIngresoVehiculo)
+def _solicitud_cambiada(sender, instance, **kwargs):
+    recinto_id = instance.taller.recinto_id if instance.taller_id else None
+    incrementar_despues(SOLICITUDES, recinto_id)
+
+
+@receiver(post_save, sender=Vehiculo)
+@receiver(post_delete, sender=Vehiculo)
+def _vehiculo_cambiado(sender, instance, **kwargs):
+    incrementar_despues(VEHICULOS)
+
+
+@receiver(post_save, sender=Empleado)
+@receiver(post_delete, sender=Empleado)
+def _empleado_cambiado(sender, instance, **kwargs):
+    incrementar_despues(EMPLEADOS)
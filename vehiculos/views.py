@@ -11,8 +11,11 @@ from django.contrib.auth.decorators import login_required
 from .models import Vehiculo
 from .forms import VehiculoForm
 from talleres.models import Taller  # sigue existiendo para otros usos
+from ordenestrabajo import punteros
 from ordenestrabajo.models import OrdenTrabajo
-from autenticacion.models import Empleado
+from ordenestrabajo.bitacora import bitacoras
+from autenticacion.middleware import get_empleado
+from documentos.servicios import aplanar_finalizadas, documentos_agrupados
 
 from autenticacion.roles import (
     chofer_or_supervisor,
@@ -28,13 +31,7 @@ from autenticacion.roles import (
 @chofer_or_supervisor
 def ingreso_vehiculos(request):
     """Página de ingreso de vehículos (solo CHOFER o SUPERVISOR)"""
-    user = request.user
-
-    try:
-        # antes: select_related('taller')
-        empleado = Empleado.objects.select_related('recinto').get(usuario=user.username)
-    except Empleado.DoesNotExist:
-        empleado = None
+    empleado = get_empleado(request)
 
     talleres = Taller.objects.all()
 
@@ -76,12 +73,7 @@ def ficha_vehiculo(request, patente: str = None):
     if not patente:
         patente = request.GET.get('patente', '').strip().upper()
 
-    user = request.user
-    try:
-        # antes: select_related('taller')
-        empleado = Empleado.objects.select_related('recinto').get(usuario=user.username)
-    except Empleado.DoesNotExist:
-        empleado = None
+    empleado = get_empleado(request)
 
     return render(request, 'ficha-vehiculo.html', {
         'patente': patente,
@@ -195,14 +187,11 @@ def api_ficha(request):
     # KPI
     kpi_ots = OrdenTrabajo.objects.filter(patente_id=patente).count()
 
-    # OT ACTUAL
-    estados_activos = ["Pendiente", "Recibida", "En Taller", "En Proceso", "Pausado"]
-
+    # OT ACTUAL (puntero vehiculo_ot_actual: lectura por PK)
     ot_actual = (
-        OrdenTrabajo.objects
-            .filter(patente_id=patente, estado__in=estados_activos)
+        punteros.ot_activa(patente)
             .select_related("recinto")
-            .order_by('-fecha_ingreso', '-hora_ingreso')
+            .defer("descripcion")
             .first()
     )
 
@@ -222,54 +211,8 @@ def api_ficha(request):
             'taller_nombre': taller_nombre,
         }
 
-    # DOCUMENTOS AGRUPADOS
-    from documentos.models import Documento
-
-    # Documentos OT actual
-    docs_ot_actual = []
-    if ot_actual:
-        docs_ot_actual = [
-            {
-                "id": d.id,
-                "titulo": d.titulo,
-                "tipo": d.tipo,
-                "archivo": d.archivo.url if d.archivo else "",
-                "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M")
-            }
-            for d in Documento.objects.filter(ot_id=ot_actual.ot_id).order_by("-creado_en")
-        ]
-
-    # Documentos de OTs finalizadas
-    ots_finalizadas_ids = list(
-        OrdenTrabajo.objects.filter(
-            patente_id=patente,
-            estado="Finalizado"
-        ).values_list("ot_id", flat=True)
-    )
-
-    docs_ots_finalizadas = [
-        {
-            "id": d.id,
-            "titulo": d.titulo,
-            "tipo": d.tipo,
-            "archivo": d.archivo.url if d.archivo else "",
-            "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M"),
-            "ot_id": d.ot_id
-        }
-        for d in Documento.objects.filter(ot_id__in=ots_finalizadas_ids).order_by("-creado_en")
-    ]
-
-    # Documentos sueltos (vehículo)
-    docs_vehiculo = [
-        {
-            "id": d.id,
-            "titulo": d.titulo,
-            "tipo": d.tipo,
-            "archivo": d.archivo.url if d.archivo else "",
-            "creado_en": d.creado_en.strftime("%Y-%m-%d %H:%M")
-        }
-        for d in Documento.objects.filter(patente_id=patente, ot__isnull=True).order_by("-creado_en")
-    ]
+    # DOCUMENTOS AGRUPADOS (una sola consulta; finalizadas en lista plana)
+    docs = documentos_agrupados(patente, ot_actual_id=ot_actual.ot_id if ot_actual else None)
 
     return JsonResponse({
         'success': True,
@@ -285,9 +228,9 @@ def api_ficha(request):
         'kpis': {'ots': kpi_ots},
         'ot_actual': ot_payload,
         'documentos': {
-            "actual": docs_ot_actual,
-            "finalizadas": docs_ots_finalizadas,
-            "vehiculo": docs_vehiculo
+            "actual": docs["actual"],
+            "finalizadas": aplanar_finalizadas(docs["finalizadas"]),
+            "vehiculo": docs["vehiculo"]
         }
     })
 
@@ -322,8 +265,12 @@ def api_ficha_ots(request):
     if filtro_taller:
         qs = qs.filter(recinto__nombre__icontains=filtro_taller)
 
+    ots = list(qs.order_by('-fecha_ingreso', '-hora_ingreso', '-ot_id'))
+    # Bitácora desde ot_eventos (una consulta); sin evento de creación, antepone descripcion
+    textos = bitacoras(ots)
+
     items = []
-    for ot in qs.order_by('-fecha_ingreso', '-hora_ingreso', '-ot_id'):
+    for ot in ots:
         items.append({
             'id': ot.ot_id,
             'fecha': ot.fecha_ingreso.isoformat(),
@@ -334,7 +281,7 @@ def api_ficha_ots(request):
             'estado': ot.estado,
             'rut': getattr(ot.rut, 'rut', None),
             'rut_creador': getattr(ot.rut_creador, 'rut', None),
-            'descripcion': ot.descripcion or "",
+            'descripcion': textos[ot.ot_id],
         })
 
     return JsonResponse({'success': True, 'items': items})